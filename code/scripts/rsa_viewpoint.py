@@ -53,18 +53,14 @@ gc.collect()
 
 # LOAD DEPENDENCIES ============================================================
 import os
-import re
 import sys
 import json
-import imageio
 import itertools
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
 from scipy.io import savemat
-from scipy.stats import spearmanr
-from scipy.spatial.distance import squareform
 
 # Set directories
 main_dir = "/Users/22095708/Documents/PhD/Project"
@@ -73,7 +69,14 @@ os.chdir(main_dir)
 
 # Add custom functions path
 sys.path.append("./shared/tools")
-from load_mat_flexible import load_mat_flexible
+from rdm_store import update_rdm_store, select_subjects
+from rsa import (
+    correlate_rdms_to_models,
+    correlate_time_time,
+    save_ttcorr,
+    combine_ttcorr,
+)
+from rdm_animation import render_rdm_animation
 
 # CONFIGURATION SETUP ==========================================================
 setting = {
@@ -90,8 +93,17 @@ setting = {
         "corr_metric": ["spearman"],
         "target_dim": ["identity"],
         "crossval_method": ["one_rotation_out"],
+        "kendall_max_pairs": 100000,  # None = exact Kendall's tau-b
         "analysis_version": None,  # Options: 'all_all', 'intact_occl'
     },
+    # RDM loading (threads reading .mat files concurrently)
+    "loading": {"n_workers": 8},
+    # RDM time-course animation
+    "animation": {
+        "format": "gif",  # Options: 'gif', 'mp4' (needs imageio-ffmpeg)
+        "export_png": False,  # Also save one PNG per timepoint
+        "n_jobs": -1,  # Worker processes rendering frames
+    },
     # Data selection
     "data_selection": {
         "group": ["infants"],  # Options: 'all', 'infants', 'adults'
@@ -121,6 +133,17 @@ else:
         samples_to_run
     ]
 
+# Labels of the correlation metric (CSV column, axis and colorbar)
+metric_labels = {
+    "spearman": ("SpearmanR", "Spearman correlation", "Spearman's rho"),
+    "pearson": ("PearsonR", "Pearson correlation", "Pearson's r"),
+    "kendall": ("KendallTau", "Kendall correlation", "Kendall's tau"),
+}
+corr_column, corr_ylabel, corr_symbol = metric_labels[
+    setting["analysis"]["corr_metric"][0]
+]
+max_pairs = setting["analysis"]["kendall_max_pairs"]
+
 # Define the reordering indices (Python uses 0-based indexing)
 animate_indices = [
     1,
@@ -163,134 +186,78 @@ original_labels = [
 
 # Reorder the labels
 reordered_labels = [original_labels[i] for i in new_order]
+
+# Subject RDMs are read through the RDM store: each .mat file is loaded
+# once, reordered and with time as the last axis, and the stacked group
+# array (with its running mean) is reused by every stage below
+rdm_dir = os.path.join(main_dir, project_name, "derivatives")
+rdm_store_dir = os.path.join(rdm_dir, "rdm_store")
+
+
+def get_group_rdms(group, subjects):
+    """Return the (subjects x cond x cond x time) RDMs and their mean."""
+    rdm_name = f"RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}"
+    files = {
+        s: os.path.join(rdm_dir, f"{group}_sub-{s:02d}_{rdm_name}.mat")
+        for s in subjects
+    }
+
+    # v7.3 files (e.g. the infant RDMs) are read in MATLAB axis order, so
+    # every group comes back as (cond x cond x time)
+    store = update_rdm_store(
+        rdm_store_dir,
+        f"{group}_{rdm_name}",
+        files,
+        order=new_order,
+        n_workers=setting["loading"]["n_workers"],
+    )
+    return select_subjects(store, subjects)
+
+
 # ------------------
 # I) Generate a .GIF file for Evolving Representational Space
 #
 # Step 1) Import RDMs and Plot Heatmaps
 
 if setting["pipelines"]["plot_RDMs"]:
-    RDM_avg = np.zeros(project_config["groups"][group_to_run]["RDM_size"])
-
-    for s in subjects_to_run:
-        subjectnr = f"{s:02d}"
-        RDM_path = os.path.join(
-            project_config["paths"]["variables_path"],
-            f"{group_to_run}_sub-{subjectnr}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}.mat",
-        )
-
-        RDM_ind = load_mat_flexible(RDM_path)["RDM"]
-        if setting["data_selection"]["group"][0] == "infants":
-            RDM_ind = np.transpose(RDM_ind, (1, 2, 0))
-        # Rearrange the RDM for all timepoints - Using numpy's advanced indexing to reorder rows and columns
-        RDM_rearranged = RDM_ind[np.ix_(new_order, new_order)]
-
-        n_timpeoints = RDM_ind.shape[2]
-        time_values = np.linspace(-100, 800, n_timpeoints)
-
-        RDM_avg = RDM_avg + RDM_ind
+    _, RDM_avg = get_group_rdms(group_to_run, subjects_to_run)
 
-    RDM_avg = RDM_avg / len(subjects_to_run)
-
-    for t in range(0, n_timpeoints):
-        RDM_timepoint = RDM_avg[:, :, t]
-        fig = plt.figure(figsize=(8, 6))
-        ax = plt.gca()
-
-        # Create the heatmap
-        im = ax.imshow(
-            RDM_timepoint,
-            aspect="equal",
-            origin="upper",
-            vmin=np.percentile(RDM_timepoint, 5),
-            vmax=np.percentile(RDM_timepoint, 95),
-            cmap="viridus",
-        )
-        #
-
-        # Add grid lines to separate animate/inanimate blocks
-        ax.axhline(
-            y=6.5, color="white", linewidth=2, linestyle="--", alpha=0.5
-        )
-        ax.axvline(
-            x=6.5, color="white", linewidth=2, linestyle="--", alpha=0.5
-        )
-
-        # Set tick positions and labels for rows
-        ax.set_yticks(range(len(reordered_labels)))
-        ax.set_yticklabels(reordered_labels, fontsize=9)
-
-        # Set tick positions and labels for columns
-        ax.set_xticks(range(len(reordered_labels)))
-        ax.set_xticklabels(
-            reordered_labels, fontsize=9, rotation=45, ha="right"
-        )
-        # ax.set_xticklabels([])
+    n_timpeoints = RDM_avg.shape[2]
+    time_values = np.linspace(-100, 800, n_timpeoints)
 
-        plt.colorbar(im, ax=ax, label="Pairwise Decoding Accuracy")
-        ax.set_title(f"Representational Space at t = {time_values[t]} ms")
+    # Step 2) Render the heatmaps straight into the animation
+    animation_name = f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}"
 
-        plt.tight_layout()
+    animation_path = os.path.join(
+        main_dir,
+        project_name,
+        "rsa",
+        f"{animation_name}.{setting['animation']['format']}",
+    )
 
-        # Save the figure
-        figfn = os.path.join(
+    # Optionally keep one PNG per timepoint as well
+    png_pattern = None
+    if setting["animation"]["export_png"]:
+        png_pattern = os.path.join(
             main_dir,
             project_name,
-            f"rsa/representational-space-timecourse/{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}(t={time_values[t]}ms).png",
+            "rsa/representational-space-timecourse",
+            f"{animation_name}(t={{time}}ms).png",
         )
-        plt.savefig(figfn, dpi=300, bbox_inches="tight")
-        plt.close(fig)  # Explicitly close the figure
-
-    # Step 2) Create GIF from Generated Images
-
-    # Directory where images are saved
-
-    img_dir = os.path.join(
-        main_dir, project_name, "rsa/representational-space-timecourse/"
-    )
-
-    # Pattern to match the image files for this subject
-    pattern = f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}"
-
-    # Get all PNG files for this subject
-    image_files = [
-        f
-        for f in os.listdir(img_dir)
-        if f.startswith(pattern) and f.endswith(".png")
-    ]
-
-    # Extract time values and sort files chronologically
-    def get_time_value(filename):
-        # Extract the time value from filename using regex
-        match = re.search(r"\(t=([-\d.]+)ms\)", filename)
-        if match:
-            return float(match.group(1))
-        return 0
-
-    # Sort files by time value
-    image_files.sort(key=get_time_value)
 
-    # Full paths to images
-    image_paths = [os.path.join(img_dir, f) for f in image_files]
-
-    # Read all images
-    images = []
-    for img_path in image_paths:
-        images.append(imageio.imread(img_path))
-
-    # Create GIF output path
-    gif_path = os.path.join(
-        main_dir,
-        project_name,
-        "rsa",
-        f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}.gif",
+    n_frames = render_rdm_animation(
+        RDM_avg,
+        time_values,
+        animation_path,
+        labels=reordered_labels,
+        block=len(animate_indices),
+        fps=10,
+        n_jobs=setting["animation"]["n_jobs"],
+        png_pattern=png_pattern,
     )
 
-    # Save as GIF
-    # duration is in seconds per frame (0.1 = 100ms per frame = 10 fps)
-    imageio.mimsave(gif_path, images, duration=0.1, loop=0)
-
-    print(f"GIF created successfully: {gif_path}")
-    print(f"Total frames: {len(images)}")
+    print(f"Animation created successfully: {animation_path}")
+    print(f"Total frames: {n_frames}")
 
 
 # ------------------
@@ -325,54 +292,101 @@ if setting["pipelines"]["corr2model"]:
     animacy_rdm[7:14, 0:7] = 1
     # (upper-left and bottom-right blocks remain zero)
 
-    # Overwrite model_rdm with animacy_rdm
-    model_rdm = animacy_rdm
-
-    # Initialize results
-    corr_all = []
-
-    # Loop over subjects
-    for subjectnr in subjects_to_run:
-        RDM_path = os.path.join(
-            main_dir,
-            project_name,
-            "derivatives",
-            f"{group_to_run}_sub-{subjectnr:02d}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}.mat",
-        )
-
-        ind_RDM = load_mat_flexible(RDM_path)["RDM"]
-        if setting["data_selection"]["group"][0] == "infants":
-            ind_RDM = np.transpose(ind_RDM, (1, 2, 0))
-        ind_RDM_rearranged = ind_RDM[np.ix_(new_order, new_order)]
-        n_timpeoints = ind_RDM_rearranged.shape[2]
-        time_values = np.linspace(-100, 800, n_timpeoints)
+    # Available model RDMs (in the reordered condition space)
+    available_models = {"animacy": animacy_rdm}
+    model_names = setting["analysis"]["model_RDMs"]
+    model_rdms = np.stack([available_models[m] for m in model_names])
+    metric = setting["analysis"]["corr_metric"][0]
 
-        ind_corr = []
+    # All subject RDMs as one (subjects x cond x cond x time) stack
+    ind_RDMs, _ = get_group_rdms(group_to_run, subjects_to_run)
+    n_timpeoints = ind_RDMs.shape[3]
+    time_values = np.linspace(-100, 800, n_timpeoints)
 
-        for t in range(n_timpeoints):
-            RDM1 = squareform(
-                ind_RDM_rearranged[:, :, t]
-            )  # flatten upper triangle
-            RDM2 = squareform(model_rdm)
-
-            # Spearman correlation
-            r, _ = spearmanr(RDM1, RDM2)
-            ind_corr.append(r)
-
-        corr_all.append(ind_corr)
+    # All subjects x models x time points in one go
+    corr_all_models = correlate_rdms_to_models(
+        ind_RDMs, model_rdms, method=metric, max_pairs=max_pairs
+    )
 
-        # Save per-subject correlation CSV
+    for m, model in enumerate(model_names):
+        # Loop over subjects
+        for s, subjectnr in enumerate(subjects_to_run):
+            ind_corr = corr_all_models[s, m]
+
+            # Save per-subject correlation CSV
+            csv_path = os.path.join(
+                main_dir,
+                project_name,
+                "derivatives",
+                f"{group_to_run}_sub-{subjectnr:02d}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}_corr2{model}({metric}).csv",
+            )
+            pd.DataFrame(ind_corr, columns=[corr_column]).to_csv(
+                csv_path, index=False
+            )
+
+            # Plot the correlation per-subject
+            fig, ax = plt.subplots(
+                figsize=(3.33, 2.08), constrained_layout=True
+            )
+
+            # Shade stimulus duration
+            ax.axvspan(
+                0, 150, color="#EBEBEB", alpha=0.8, label="Stimulus Duration"
+            )
+
+            # Plot average correlation
+            ax.plot(
+                time_values,
+                ind_corr,
+                label="Score",
+                color="#57BD7E",
+                linewidth=1,
+            )
+
+            # Plot rolling mean
+            rolling_mean = (
+                pd.Series(ind_corr).rolling(window=10, center=True).mean()
+            )
+            ax.plot(time_values, rolling_mean, color="#337476", linewidth=1.5)
+
+            # Set x-axis ticks (adjust as needed)
+            ax.set_xticks(range(-100, 900, 300))
+            ax.set_xlabel("Timepoints (ms)")
+            ax.set_ylabel(corr_ylabel)
+
+            # Add horizontal line at 0 (chance level)
+            chance_level = 0
+            ax.axhline(chance_level, color="#962C37", linestyle="--")
+
+            fig.tight_layout()
+
+            # Save the Figure
+            fig_path = os.path.join(
+                main_dir,
+                project_name,
+                "rsa/correlation-model-RDMs",
+                f"{group_to_run}_sub-{subjectnr:02d}_corr2{model}({metric}).png",
+            )
+            plt.savefig(fig_path)
+            plt.close()
+
+        # shape: nInfants x time/condition
+        corr_all = corr_all_models[:, m, :]
+
+        # Save the combined correlations file
         csv_path = os.path.join(
             main_dir,
             project_name,
             "derivatives",
-            f"{group_to_run}_sub-{subjectnr:02d}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}_corr2{setting['analysis']['model_RDMs'][0]}({setting['analysis']['corr_metric'][0]}).csv",
-        )
-        pd.DataFrame(ind_corr, columns=["SpearmanR"]).to_csv(
-            csv_path, index=False
+            f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_corr2{model}({metric}).csv",
         )
 
-        # Plot the correlation per-subject
+        pd.DataFrame(corr_all).to_csv(csv_path, index=False)
+
+        # Compute the average
+        corr_avg = np.mean(corr_all, 0)
+
+        # Plot the correlation of average of subjects
         fig, ax = plt.subplots(figsize=(3.33, 2.08), constrained_layout=True)
 
         # Shade stimulus duration
@@ -382,19 +396,19 @@ if setting["pipelines"]["corr2model"]:
 
         # Plot average correlation
         ax.plot(
-            time_values, ind_corr, label="Score", color="#57BD7E", linewidth=1
+            time_values, corr_avg, label="Score", color="#57BD7E", linewidth=1
         )
 
         # Plot rolling mean
         rolling_mean = (
-            pd.Series(ind_corr).rolling(window=10, center=True).mean()
+            pd.Series(corr_avg).rolling(window=10, center=True).mean()
         )
         ax.plot(time_values, rolling_mean, color="#337476", linewidth=1.5)
 
         # Set x-axis ticks (adjust as needed)
         ax.set_xticks(range(-100, 900, 300))
         ax.set_xlabel("Timepoints (ms)")
-        ax.set_ylabel("Spearman correlation")
+        ax.set_ylabel(corr_ylabel)
 
         # Add horizontal line at 0 (chance level)
         chance_level = 0
@@ -402,66 +416,16 @@ if setting["pipelines"]["corr2model"]:
 
         fig.tight_layout()
 
-        # Save the Figure
+        # Save results
         fig_path = os.path.join(
             main_dir,
             project_name,
             "rsa/correlation-model-RDMs",
-            f"{group_to_run}_sub-{subjectnr:02d}_corr2{setting['analysis']['model_RDMs'][0]}({setting['analysis']['corr_metric'][0]}).png",
+            f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_corr2{model}({metric}).png",
         )
         plt.savefig(fig_path)
         plt.close()
 
-    # Convert to NumPy array
-    corr_all = np.array(corr_all)  # shape: nInfants x time/condition
-
-    # Save the combined correlations file
-    csv_path = os.path.join(
-        main_dir,
-        project_name,
-        "derivatives",
-        f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_corr2{setting['analysis']['model_RDMs'][0]}({setting['analysis']['corr_metric'][0]}).csv",
-    )
-
-    pd.DataFrame(corr_all).to_csv(csv_path, index=False)
-
-    # Compute the average
-    corr_avg = np.mean(corr_all, 0)
-
-    # Plot the correlation of average of subjects
-    fig, ax = plt.subplots(figsize=(3.33, 2.08), constrained_layout=True)
-
-    # Shade stimulus duration
-    ax.axvspan(0, 150, color="#EBEBEB", alpha=0.8, label="Stimulus Duration")
-
-    # Plot average correlation
-    ax.plot(time_values, corr_avg, label="Score", color="#57BD7E", linewidth=1)
-
-    # Plot rolling mean
-    rolling_mean = pd.Series(corr_avg).rolling(window=10, center=True).mean()
-    ax.plot(time_values, rolling_mean, color="#337476", linewidth=1.5)
-
-    # Set x-axis ticks (adjust as needed)
-    ax.set_xticks(range(-100, 900, 300))
-    ax.set_xlabel("Timepoints (ms)")
-    ax.set_ylabel("Spearman correlation")
-
-    # Add horizontal line at 0 (chance level)
-    chance_level = 0
-    ax.axhline(chance_level, color="#962C37", linestyle="--")
-
-    fig.tight_layout()
-
-    # Save results
-    fig_path = os.path.join(
-        main_dir,
-        project_name,
-        "rsa/correlation-model-RDMs",
-        f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_corr2{setting['analysis']['model_RDMs'][0]}({setting['analysis']['corr_metric'][0]}).png",
-    )
-    plt.savefig(fig_path)
-    plt.close()
-
 
 # ------------------
 # III) Time-time Correlation to Adult RDMs
@@ -469,68 +433,38 @@ if setting["pipelines"]["corr2model"]:
 if setting["pipelines"]["time_time_correlation"]:
 
     # Generate Average Adult RDM
-    RDM_avg = np.zeros(project_config["groups"]["adults"]["RDM_size"])
-
-    for subjectnr in project_config["groups"]["adults"]["samples"]["all"]:
-        RDM_path = os.path.join(
-            main_dir,
-            project_name,
-            "derivatives",
-            f"adults_sub-{subjectnr:02d}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}.mat",
-        )
-
-        ind_RDM = load_mat_flexible(RDM_path)["RDM"]
-        ind_RDM_rearranged = ind_RDM[np.ix_(new_order, new_order)]
-
-        RDM_avg = RDM_avg + ind_RDM_rearranged
-
-    RDM_avg_adult = RDM_avg / len(
-        project_config["groups"]["adults"]["samples"]["all"]
+    _, RDM_avg_adult = get_group_rdms(
+        "adults", project_config["groups"]["adults"]["samples"]["all"]
     )
     adlt_n_timepoints = RDM_avg_adult.shape[2]
     adlt_time_values = np.linspace(-100, 800, adlt_n_timepoints)
 
-    # Loop over subjects
-    ttcorr_all = []
-
-    for subjectnr in subjects_to_run:
-        RDM_path = os.path.join(
+    def ttcorr_file(subjectnr):
+        """Path of a subject's time x time correlation matrix."""
+        return os.path.join(
             main_dir,
             project_name,
             "derivatives",
-            f"{group_to_run}_sub-{subjectnr:02d}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}.mat",
+            f"{group_to_run}_sub-{subjectnr:02d}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}_ttcorr2avg_adult({setting['analysis']['corr_metric'][0]}).npy",
         )
 
-        ind_RDM = load_mat_flexible(RDM_path)["RDM"]
-        if setting["data_selection"]["group"][0] == "infants":
-            ind_RDM = np.transpose(ind_RDM, (1, 2, 0))
-        ind_RDM_rearranged = ind_RDM[np.ix_(new_order, new_order)]
+    # Loop over subjects
+    ind_RDMs, _ = get_group_rdms(group_to_run, subjects_to_run)
 
+    for ind_RDM_rearranged, subjectnr in zip(ind_RDMs, subjects_to_run):
         inf_n_timpeoints = ind_RDM_rearranged.shape[2]
         inf_time_values = np.linspace(-100, 800, inf_n_timpeoints)
 
-        ttcorr_ind = np.zeros((adlt_n_timepoints, inf_n_timpeoints))
-
-        for adlt_time in range(adlt_n_timepoints):
-            for inf_time in range(inf_n_timpeoints):
-                RDM1 = squareform(
-                    ind_RDM_rearranged[:, :, inf_time]
-                )  # flatten upper triangle
-                RDM2 = squareform(RDM_avg_adult[:, :, adlt_time])
-
-                # Spearman correlation
-                ttcorr, _ = spearmanr(RDM1, RDM2)
-                ttcorr_ind[adlt_time, inf_time] = ttcorr
-
-        # Save per-subject correlation CSV
-        csv_path = os.path.join(
-            main_dir,
-            project_name,
-            "derivatives",
-            f"{group_to_run}_sub-{subjectnr:02d}_RDM_{setting['analysis']['target_dim'][0]}_{setting['analysis']['crossval_method'][0]}_ttcorr2avg_adult({setting['analysis']['corr_metric'][0]}).csv",
+        # Full adult x infant time matrix in one matrix multiply
+        ttcorr_ind = correlate_time_time(
+            RDM_avg_adult,
+            ind_RDM_rearranged,
+            method=setting["analysis"]["corr_metric"][0],
+            max_pairs=max_pairs,
         )
 
-        np.savetxt(csv_path, ttcorr_ind, delimiter=",")
+        # Save per-subject correlations (binary, no text round-trip)
+        save_ttcorr(ttcorr_file(subjectnr), ttcorr_ind)
 
         # Create a new figure explicitly
         fig = plt.figure(figsize=(8, 6))
@@ -556,7 +490,7 @@ if setting["pipelines"]["time_time_correlation"]:
 
         ax.set_xlabel("Time (ms) - infants")
         ax.set_ylabel("Time (ms) - adults")
-        plt.colorbar(im, ax=ax, label="Correlation (Spearman's rho)")
+        plt.colorbar(im, ax=ax, label=f"Correlation ({corr_symbol})")
         ax.set_title(f"RDM Correlation Infant-Adult (Subject {subjectnr})")
 
         plt.tight_layout()
@@ -571,50 +505,21 @@ if setting["pipelines"]["time_time_correlation"]:
         plt.savefig(fig_path)
         plt.close()
 
-    # Generate the Combined "ttcorr" File and Load it
-    def combine_ttcorr_csvs(input_dir, output_path):
-        pattern = re.compile(r"infants_sub-(\d{2}).*corr2avg.*\.csv")
-        all_matrices = []
-
-        for filename in sorted(os.listdir(input_dir)):
-            if pattern.match(filename):
-                print(f"Reading {filename} ...")
-                mat = np.loadtxt(
-                    os.path.join(input_dir, filename), delimiter=","
-                )
-                all_matrices.append(mat)
-
-        if not all_matrices:
-            print("❌ No matching CSV files found.")
-            return
-
-        print(f"✅ Loaded {len(all_matrices)} CSVs")
-
-        # Stack along new axis → shape: (n_subjects, 180, 225)
-        ttcorr_all = np.stack(all_matrices, axis=0)
-        print("Combined shape:", ttcorr_all.shape)
-
-        # Save only as .npy
-        np.save(output_path, ttcorr_all)
-        print(f"Saved combined 3D array to: {output_path}")
-
-        return ttcorr_all
-
-    # Save the combined correlations file
-    csv_path = os.path.join(
+    # Generate the Combined "ttcorr" File, Selecting Subjects by ID
+    combined_path = os.path.join(
         main_dir,
         project_name,
         "derivatives",
-        f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_ttcorr2avg_adlt({setting['analysis']['corr_metric'][0]}).csv",
+        f"{group_to_run}_{setting['data_selection']['sample'][0]}(n={len(subjects_to_run)})_ttcorr2avg_adlt({setting['analysis']['corr_metric'][0]}).npy",
     )
 
-    ttcorr_all = combine_ttcorr_csvs(
-        "/Users/22095708/Documents/PhD/Project/viewpoint/derivatives", csv_path
+    ttcorr_all = combine_ttcorr(
+        {s: ttcorr_file(s) for s in subjects_to_run},
+        subjects_to_run,
+        output_path=combined_path,
     )
 
     # Generate the Average of All
-    subjects_to_run_zero_based = [s - 1 for s in subjects_to_run]
-    ttcorr_all = ttcorr_all[subjects_to_run_zero_based, :, :]
     ttcorr_avg = np.mean(ttcorr_all, 0)
 
     # Create a new figure explicitly
@@ -641,7 +546,7 @@ if setting["pipelines"]["time_time_correlation"]:
 
     ax.set_xlabel("Time (ms) - infants")
     ax.set_ylabel("Time (ms) - adults")
-    plt.colorbar(im, ax=ax, label="Correlation (Spearman's rho)")
+    plt.colorbar(im, ax=ax, label=f"Correlation ({corr_symbol})")
     ax.set_title(
         f"RDM Correlation Infants : {samples_to_run} (n = {len(subjects_to_run)}) -Adult "
     )
@@ -0,0 +1,59 @@
+"""
+Shared fixtures for the tools tests.
+
+The tools directory (utilities/python-mne-tools-xdf-eeg-format) is
+imported as the ``shared.tools`` package, as in the project layout, so
+the modules' relative imports work when the tests are run straight from
+the repository.
+"""
+
+import sys
+import types
+import importlib.util
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+TOOLS_DIR = (
+    Path(__file__).resolve().parents[1]
+    / "utilities"
+    / "python-mne-tools-xdf-eeg-format"
+)
+
+if "shared.tools" not in sys.modules:
+    shared = sys.modules.setdefault("shared", types.ModuleType("shared"))
+    shared.__path__ = []
+    spec = importlib.util.spec_from_file_location(
+        "shared.tools",
+        TOOLS_DIR / "__init__.py",
+        submodule_search_locations=[str(TOOLS_DIR)],
+    )
+    tools = importlib.util.module_from_spec(spec)
+    sys.modules["shared.tools"] = tools
+    spec.loader.exec_module(tools)
+    shared.tools = tools
+
+
+@pytest.fixture
+def make_epochs():
+    """Build small (trials, channels, times) data with class effects."""
+
+    def _make(
+        n_classes=3,
+        n_groups=4,
+        n_per_cell=5,
+        n_channels=6,
+        n_times=5,
+        effect=0.5,
+        seed=0,
+    ):
+        rng = np.random.default_rng(seed)
+        y = np.repeat(np.arange(1, n_classes + 1), n_groups * n_per_cell)
+        groups = np.tile(np.repeat(np.arange(n_groups), n_per_cell), n_classes)
+        X = rng.normal(size=(len(y), n_channels, n_times))
+        patterns = rng.normal(size=(n_classes, n_channels, 1))
+        X += effect * patterns[y - 1]
+        return X, y, groups
+
+    return _make
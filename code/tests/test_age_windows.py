@@ -0,0 +1,47 @@
+"""Prefix-sum age windows against per-window t-tests."""
+
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+from scipy import stats
+
+from shared.tools.age_windows import sliding_age_windows, subject_ages
+
+
+def test_windows_match_ttest():
+    rng = np.random.default_rng(0)
+    ages = rng.uniform(170, 260, 40)
+    data = rng.normal(0.1, 0.05, size=(40, 15))
+
+    results = sliding_age_windows(data, ages, chance=0.05)
+    for w, centre in enumerate(results["centres"]):
+        in_window = np.abs(ages - centre) <= 7
+        np.testing.assert_array_equal(
+            np.sort(results["subjects"][w]), np.flatnonzero(in_window)
+        )
+        if in_window.sum() > 1:
+            expected = stats.ttest_1samp(data[in_window] - 0.05, 0).statistic
+            np.testing.assert_allclose(results["t"][w], expected)
+
+
+def test_permutation_pvalues_are_valid():
+    rng = np.random.default_rng(1)
+    ages = rng.uniform(170, 260, 30)
+    data = rng.normal(size=(30, 10))
+
+    results = sliding_age_windows(data, ages, n_permutations=99, batch_size=16)
+    valid = ~np.isnan(results["t"])
+    assert np.all(results["p_values"][valid] >= 0.01)
+    assert np.all(results["p_values"][valid] <= 1)
+    assert np.all(results["p_max"][valid] >= results["p_values"][valid])
+
+
+def test_subject_ages_rejects_unknown_ids():
+    notebook = pd.DataFrame({"Age_days_": [180, "n/a", 210]})
+    cfg = {"participants_info": [{"name": "infants", "labnotebook": notebook}]}
+    np.testing.assert_array_equal(subject_ages(cfg, [3, 1]), [210, 180])
+    for subjects, missing in [([1, 2], [2]), ([0, 3], [0]), ([4, 1], [4])]:
+        with pytest.raises(ValueError, match=re.escape(str(missing))):
+            subject_ages(cfg, subjects)
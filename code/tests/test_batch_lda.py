@@ -0,0 +1,132 @@
+"""Batched LDA engine against sklearn / MNE decoding."""
+
+import numpy as np
+import pytest
+from mne.decoding import (
+    GeneralizingEstimator,
+    SlidingEstimator,
+    cross_val_multiscore,
+)
+from sklearn.model_selection import GroupKFold, LeaveOneGroupOut
+
+from shared.tools.batch_lda import (
+    _time_major,
+    cross_val_batch_lda,
+    fit_batch_lda,
+    fit_batch_lda_without_group,
+    group_statistics,
+    score_predictions,
+)
+from shared.tools.decoding import get_classifier
+
+
+@pytest.mark.parametrize("shrinkage", [None, 0.3])
+def test_fit_matches_sklearn_decision(make_epochs, shrinkage):
+    X, y, _ = make_epochs()
+    Xt = _time_major(X)
+    model = fit_batch_lda(Xt, y, shrinkage=shrinkage)
+    decision = np.matmul(Xt, model["coef"]) + model["intercept"][:, None]
+
+    for t in range(X.shape[2]):
+        clf = get_classifier("lda", n_classes=3)
+        if shrinkage is not None:
+            clf[-1].set_params(shrinkage=shrinkage)
+        clf.fit(X[:, :, t], y)
+        np.testing.assert_allclose(
+            decision[t], clf.decision_function(X[:, :, t]), atol=1e-10
+        )
+
+
+def test_group_statistics_fold_matches_direct_fit(make_epochs):
+    X, y, groups = make_epochs()
+    Xt = _time_major(X)
+    stats = group_statistics(Xt, y, groups)
+
+    for g, group in enumerate(stats["groups"]):
+        train = groups != group
+        cached = fit_batch_lda_without_group(
+            stats, g, Xt[:, ~train], y[~train]
+        )
+        direct = fit_batch_lda(Xt[:, train], y[train])
+        np.testing.assert_allclose(cached["coef"], direct["coef"])
+        np.testing.assert_allclose(cached["intercept"], direct["intercept"])
+
+
+def test_group_statistics_keeps_one_scatter_per_class(make_epochs):
+    X, y, groups = make_epochs(n_groups=4)
+    # class 3 only in group 0 and unbalanced classes elsewhere
+    keep = (y != 3) | (groups == 0)
+    keep &= ~((y == 1) & (groups == 2) & (np.arange(len(y)) % 2 == 0))
+    X, y, groups = X[keep], y[keep], groups[keep]
+    Xt = _time_major(X)
+    stats = group_statistics(Xt, y, groups)
+    n_times, _, n_channels = Xt.shape
+    assert stats["total_scatter"].shape == (
+        3,
+        n_times,
+        n_channels,
+        n_channels,
+    )
+    assert "scatter" not in stats
+
+    for g, group in enumerate(stats["groups"]):
+        train = groups != group
+        cached = fit_batch_lda_without_group(
+            stats, g, Xt[:, ~train], y[~train]
+        )
+        direct = fit_batch_lda(Xt[:, train], y[train])
+        np.testing.assert_array_equal(cached["classes"], direct["classes"])
+        np.testing.assert_allclose(cached["coef"], direct["coef"])
+        np.testing.assert_allclose(cached["intercept"], direct["intercept"])
+
+
+@pytest.mark.parametrize("cv", [LeaveOneGroupOut(), GroupKFold(2)])
+def test_sliding_matches_cross_val_multiscore(make_epochs, cv):
+    X, y, groups = make_epochs()
+    expected = cross_val_multiscore(
+        SlidingEstimator(
+            get_classifier("lda", 3), scoring="balanced_accuracy"
+        ),
+        X,
+        y,
+        groups=groups,
+        cv=cv,
+    )
+    scores = cross_val_batch_lda(X, y, groups, cv)
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_generalizing_matches_cross_val_multiscore(make_epochs):
+    X, y, groups = make_epochs()
+    expected = cross_val_multiscore(
+        GeneralizingEstimator(
+            get_classifier("lda", 3), scoring="balanced_accuracy"
+        ),
+        X,
+        y,
+        groups=groups,
+        cv=LeaveOneGroupOut(),
+    )
+    scores = cross_val_batch_lda(
+        X, y, groups, LeaveOneGroupOut(), method="generalizing"
+    )
+    np.testing.assert_allclose(scores, expected)
+
+
+def test_class_missing_from_training_fold(make_epochs):
+    # Class 3 only has trials in group 0, so that fold trains on 1 and 2
+    X, y, groups = make_epochs()
+    keep = (y != 3) | (groups == 0)
+    X, y, groups = X[keep], y[keep], groups[keep]
+
+    scores = cross_val_batch_lda(X, y, groups, LeaveOneGroupOut())
+    assert np.all(np.isfinite(scores))
+
+    for fold, group in enumerate(np.unique(groups)):
+        train, test = groups != group, groups == group
+        n_classes = len(np.unique(y[train]))
+        for t in range(X.shape[2]):
+            clf = get_classifier("lda", n_classes)
+            clf.fit(X[train, :, t], y[train])
+            expected = score_predictions(y[test], clf.predict(X[test, :, t]))
+            assert scores[fold, t] == pytest.approx(expected)
@@ -0,0 +1,100 @@
+"""JZS Bayes factors against BayesFactor and direct integration."""
+
+import numpy as np
+import pytest
+from scipy import integrate, stats
+
+from shared.tools.bayes_factors import (
+    DEFAULT_RSCALE,
+    jzs_bayes_factor,
+    ttest_bayes_factor,
+)
+
+# Paired differences of R's sleep data (extra[1:10] - extra[11:20])
+SLEEP_DIFF = np.array(
+    [0.7, -1.6, -0.2, -1.2, -0.1, 3.4, 3.7, 0.8, 0.0, 2.0]
+) - np.array([1.9, 0.8, 1.1, 0.1, -0.1, 4.4, 5.5, 1.6, 4.6, 3.4])
+
+
+def _rouder_bf(t, n, r=DEFAULT_RSCALE):
+    """Two-sided JZS BF by integration over g (Rouder et al., 2009)."""
+    df = n - 1
+
+    def integrand(g):
+        scale = 1 + n * g * r**2
+        return (
+            scale**-0.5
+            * (1 + t**2 / (scale * df)) ** (-(df + 1) / 2)
+            * (2 * np.pi) ** -0.5
+            * g**-1.5
+            * np.exp(-1 / (2 * g))
+        )
+
+    marginal = integrate.quad(integrand, 0, np.inf)[0]
+    return marginal / (1 + t**2 / df) ** (-(df + 1) / 2)
+
+
+def _interval_bf(t, n, lower, upper, r=DEFAULT_RSCALE):
+    """Interval JZS BF by integration over delta."""
+
+    def integrand(delta):
+        return stats.nct.pdf(t, n - 1, delta * np.sqrt(n)) * stats.cauchy.pdf(
+            delta, scale=r
+        )
+
+    marginal = integrate.quad(integrand, lower, upper, limit=200)[0]
+    prior_mass = stats.cauchy.cdf(upper, scale=r) - stats.cauchy.cdf(
+        lower, scale=r
+    )
+    return marginal / prior_mass / stats.t.pdf(t, n - 1)
+
+
+def test_sleep_data_matches_bayesfactor():
+    # ttestBF(x = sleep$extra[1:10] - sleep$extra[11:20])
+    results = ttest_bayes_factor(SLEEP_DIFF[:, None])
+    assert results["bf"][0] == pytest.approx(17.25888, rel=1e-6)
+
+
+def test_sleep_data_directional_matches_bayesfactor():
+    # ttestBF(..., nullInterval = c(-Inf, 0))
+    results = ttest_bayes_factor(
+        SLEEP_DIFF[:, None], null_interval=(-np.inf, 0)
+    )
+    assert results["bf"][0] == pytest.approx(34.41694, rel=1e-5)
+
+    # The complement and the interval average to the two-sided BF
+    two_sided = ttest_bayes_factor(SLEEP_DIFF[:, None])["bf"][0]
+    assert 0.5 * (results["bf"][0] + results["bf_complement"][0]) == (
+        pytest.approx(two_sided)
+    )
+
+
+@pytest.mark.parametrize("n", [8, 20, 40])
+def test_two_sided_matches_rouder_integral(n):
+    t_values = np.array([-3.0, -1.0, 0.0, 0.5, 1.0, 2.0, 3.0, 5.0, 8.0])
+    expected = [_rouder_bf(t, n) for t in t_values]
+    np.testing.assert_allclose(
+        jzs_bayes_factor(t_values, n), expected, rtol=1e-8
+    )
+
+
+@pytest.mark.parametrize("r", [0.5, DEFAULT_RSCALE, 1.0])
+def test_directional_matches_interval_integral(r):
+    n = 15
+    t_values = np.array([-2.0, 0.0, 1.5, 3.0, 6.0])
+    expected = [_interval_bf(t, n, 0, np.inf, r) for t in t_values]
+    np.testing.assert_allclose(
+        jzs_bayes_factor(t_values, n, r, null_interval=(0, np.inf)),
+        expected,
+        rtol=1e-8,
+    )
+
+
+def test_time_axis_is_vectorized():
+    rng = np.random.default_rng(0)
+    data = rng.normal(0.1, 0.2, size=(12, 4, 3))
+    results = ttest_bayes_factor(data, null_interval=(0, np.inf))
+    assert results["bf"].shape == (4, 3)
+
+    single = ttest_bayes_factor(data[:, 2, 1], null_interval=(0, np.inf))
+    assert results["bf"][2, 1] == pytest.approx(single["bf"])
@@ -0,0 +1,113 @@
+"""Decoding parallelism plan and subject data extraction."""
+
+import mne
+import numpy as np
+import pandas as pd
+import pytest
+
+import shared.tools.decoding as decoding
+from shared.tools.decoding import (
+    build_decoding_context,
+    get_decoding_data,
+    plan_parallelism,
+    prepare_decoding_data,
+    run_temporal_decoding,
+)
+
+
+@pytest.mark.parametrize(
+    "n_folds, n_times, n_jobs, level",
+    [
+        (8, 181, -1, "folds"),
+        (2, 181, -1, "both"),
+        (3, 181, 8, "both"),
+        (2, 4, 8, "time"),
+        (1, 181, -1, "both"),
+        (4, 2, 8, "folds"),
+        (12, 5, 1, "folds"),
+    ],
+)
+def test_plan_never_oversubscribes(
+    monkeypatch, n_folds, n_times, n_jobs, level
+):
+    monkeypatch.setattr(decoding, "cpu_count", lambda: 8)
+    plan = plan_parallelism(n_folds, n_times, n_jobs=n_jobs)
+
+    assert plan["level"] == level
+    assert plan["cv_n_jobs"] * plan["time_n_jobs"] <= plan["n_cores"] <= 8
+    assert plan["cv_n_jobs"] <= n_folds
+    assert plan["time_n_jobs"] <= max(n_times, 1)
+
+
+def test_plan_rejects_unknown_level():
+    with pytest.raises(ValueError, match="Unknown parallel level"):
+        plan_parallelism(4, 10, n_jobs=2, level="trials")
+
+
+@pytest.mark.parametrize("level", ["folds", "time", "both"])
+def test_parallel_plans_give_serial_scores(make_epochs, level):
+    X, y, groups = make_epochs(n_groups=2, n_times=4)
+    cfg = {
+        "classifier": "lda",
+        "scoring": "balanced_accuracy",
+        "n_jobs": 1,
+        "temporal_decoding": {"method": "sliding", "verbose": False},
+    }
+    serial = run_temporal_decoding(X, y, groups, cfg, 3)
+    plan = plan_parallelism(2, 4, n_jobs=4, level=level)
+    parallel = run_temporal_decoding(X, y, groups, cfg, 3, plan=plan)
+    np.testing.assert_allclose(parallel, serial)
+
+
+def _subject(n_epochs=32, with_targets=True):
+    rng = np.random.default_rng(0)
+    info = mne.create_info(["EEG1", "EEG2", "EEG3"], 100.0, "eeg")
+    epochs = mne.EpochsArray(
+        rng.standard_normal((n_epochs, 3, 6)), info, verbose=False
+    )
+    behav = pd.DataFrame(
+        {
+            "stimnumber": rng.integers(1, 25, n_epochs),
+            "blocksequencenumber": np.repeat(np.arange(4), n_epochs // 4),
+        }
+    )
+    if with_targets:
+        behav["istarget"] = np.arange(n_epochs) % 5 == 0
+    return epochs, behav
+
+
+def test_context_drops_targets_once_and_caches_labels():
+    epochs, behav = _subject()
+    context = build_decoding_context(epochs, behav, dtype="float32")
+
+    keep = ~behav["istarget"].to_numpy()
+    np.testing.assert_array_equal(context["trials"], np.flatnonzero(keep))
+    assert context["X"].dtype == np.float32
+    np.testing.assert_allclose(
+        context["X"], epochs.get_data()[keep], rtol=1e-6
+    )
+
+    X, y, groups, n_classes = get_decoding_data(
+        context, "category", "one_rotation_out"
+    )
+    stim = behav["stimnumber"].to_numpy()[keep]
+    np.testing.assert_array_equal(y, np.ceil(stim / 8).astype(int))
+    np.testing.assert_array_equal(groups, stim % 8)
+    assert n_classes == len(np.unique(y))
+
+    # a second analysis reuses the data and the cached vectors
+    X2, y2, _, _ = get_decoding_data(context, "category", "one_block_out")
+    assert X2 is X and y2 is y
+    assert set(context["groups"]) == {"one_rotation_out", "one_block_out"}
+
+
+def test_context_without_targets_shares_epoch_data():
+    epochs, behav = _subject(with_targets=False)
+    context = build_decoding_context(epochs, behav)
+    assert np.shares_memory(context["X"], epochs.get_data(copy=False))
+
+    X, y, groups, _ = prepare_decoding_data(
+        epochs, behav, "identity", "one_block_out"
+    )
+    np.testing.assert_array_equal(y, behav["stimnumber"])
+    np.testing.assert_array_equal(groups, behav["blocksequencenumber"])
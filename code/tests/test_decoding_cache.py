@@ -0,0 +1,82 @@
+"""Decoding cache round-trip and invalidation."""
+
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from shared.tools.decoding_cache import (
+    cache_paths,
+    load_decoding_cache,
+    save_decoding_cache,
+)
+
+
+@pytest.fixture
+def sources(tmp_path):
+    epochs_file = tmp_path / "sub-01_task-test_epo.fif"
+    behav_file = tmp_path / "sub-01_task-test_events.tsv"
+    epochs_file.write_bytes(b"epochs" * 100)
+    behav_file.write_text("stimnumber\tistarget\n1\t0\n2\t1\n3\t0\n")
+
+    rng = np.random.default_rng(0)
+    context = {
+        "X": rng.standard_normal((2, 4, 5)).astype(np.float32),
+        "behav": pd.DataFrame(
+            {"stimnumber": [1, 3], "istarget": [False, False], "id": "a"}
+        ),
+        "trials": np.array([0, 2]),
+        "times": np.linspace(-0.1, 0.3, 5),
+        "labels": {},
+        "groups": {},
+    }
+    save_decoding_cache(context, epochs_file, behav_file)
+    return epochs_file, behav_file, context
+
+
+def _touch(path, offset_ns=10**9):
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + offset_ns))
+
+
+def test_round_trip(sources):
+    epochs_file, behav_file, context = sources
+    cached = load_decoding_cache(epochs_file, behav_file, "float32")
+
+    assert isinstance(cached["X"], np.memmap)
+    np.testing.assert_array_equal(cached["X"], context["X"])
+    np.testing.assert_array_equal(cached["trials"], context["trials"])
+    np.testing.assert_array_equal(cached["times"], context["times"])
+    # only numeric and boolean columns are kept
+    assert list(cached["behav"].columns) == ["stimnumber", "istarget"]
+    np.testing.assert_array_equal(cached["behav"]["stimnumber"], [1, 3])
+
+
+def test_dtype_mismatch_invalidates(sources):
+    epochs_file, behav_file, _ = sources
+    assert load_decoding_cache(epochs_file, behav_file) is None
+    assert load_decoding_cache(epochs_file, behav_file, "float64") is None
+
+
+@pytest.mark.parametrize("which", [0, 1])
+def test_changed_source_invalidates(sources, which):
+    path = sources[which]
+    data = bytearray(path.read_bytes())
+    data[0] ^= 1
+    path.write_bytes(bytes(data))
+    _touch(path)
+    assert load_decoding_cache(*sources[:2], "float32") is None
+
+
+def test_touched_but_identical_source_stays_valid(sources):
+    epochs_file, behav_file, _ = sources
+    _touch(epochs_file)
+    _touch(behav_file)
+    assert load_decoding_cache(epochs_file, behav_file, "float32") is not None
+
+
+def test_missing_key_invalidates(sources):
+    epochs_file, behav_file, _ = sources
+    cache_paths(epochs_file)["key"].unlink()
+    assert load_decoding_cache(epochs_file, behav_file, "float32") is None
@@ -0,0 +1,81 @@
+"""Cluster sign-flip permutation test against MNE."""
+
+import numpy as np
+import pytest
+from mne.stats import permutation_cluster_1samp_test
+
+from shared.tools.group_stats import cluster_permutation_test
+
+
+def _sorted_clusters(masks, pvalues, shape):
+    """Cluster masks and p-values in a comparable order."""
+    # MNE returns slices for 1D data
+    masks = [_as_mask(m, shape) for m in masks]
+    order = np.argsort([np.flatnonzero(m.ravel())[0] for m in masks])
+    return [masks[i] for i in order], np.asarray(pvalues)[order]
+
+
+def _as_mask(cluster, shape):
+    mask = np.zeros(shape, dtype=bool)
+    mask[cluster] = True
+    return mask
+
+
+@pytest.mark.parametrize("shape", [(40,), (12, 10)])
+def test_exact_test_matches_mne(shape):
+    # 2**8 sign flips are enumerated by both implementations
+    rng = np.random.default_rng(0)
+    n_subjects = 8
+    data = rng.normal(size=(n_subjects,) + shape)
+    effect = np.zeros(shape)
+    effect[tuple(slice(2, 8) for _ in shape)] = 1.2
+    data += effect
+
+    threshold = 2.0
+    results = cluster_permutation_test(
+        data, n_permutations=10000, threshold=threshold, tail=1
+    )
+    t_obs, clusters, pvalues, _ = permutation_cluster_1samp_test(
+        data,
+        threshold=threshold,
+        n_permutations=10000,
+        tail=1,
+        out_type="mask",
+        verbose=False,
+    )
+
+    np.testing.assert_allclose(results["t_obs"], t_obs)
+    ours, our_p = _sorted_clusters(
+        results["clusters"], results["cluster_pvalues"], shape
+    )
+    theirs, their_p = _sorted_clusters(clusters, pvalues, shape)
+    assert len(ours) == len(theirs)
+    for a, b in zip(ours, theirs):
+        np.testing.assert_array_equal(a, b)
+    # MNE's exact null counts the identity flip twice and leaves out one
+    # other flip, so p-values may differ by one permutation
+    np.testing.assert_allclose(our_p, their_p, atol=1 / 2**n_subjects)
+
+
+def test_chance_is_subtracted():
+    rng = np.random.default_rng(1)
+    data = rng.normal(size=(10, 30))
+    shifted = cluster_permutation_test(
+        data + 0.5, chance=0.5, n_permutations=200, threshold=1.5
+    )
+    plain = cluster_permutation_test(data, n_permutations=200, threshold=1.5)
+    np.testing.assert_allclose(shifted["t_obs"], plain["t_obs"])
+    np.testing.assert_allclose(shifted["null_max"], plain["null_max"])
+
+
+def test_batches_do_not_change_the_null():
+    rng = np.random.default_rng(2)
+    data = rng.normal(0.3, 1.0, size=(12, 25))
+    full = cluster_permutation_test(data, n_permutations=500, threshold=1.5)
+    batched = cluster_permutation_test(
+        data, n_permutations=500, threshold=1.5, batch_size=7
+    )
+    np.testing.assert_allclose(batched["null_max"], full["null_max"])
+    np.testing.assert_allclose(
+        batched["cluster_pvalues"], full["cluster_pvalues"]
+    )
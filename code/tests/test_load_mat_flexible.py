@@ -0,0 +1,106 @@
+"""MAT version detection and lazy v7.3 dataset indexing."""
+
+import h5py
+import numpy as np
+import pytest
+from scipy.io import savemat
+
+from shared.tools.load_mat_flexible import LazyMatDataset, get_mat_version
+
+RDM = np.arange(4 * 5 * 6, dtype=float).reshape(4, 5, 6)
+MASK = np.array([True, False, True, True, False])
+
+
+@pytest.fixture
+def dataset(tmp_path):
+    # MATLAB's column-major arrays appear to h5py with reversed axes
+    with h5py.File(tmp_path / "rdm.mat", "w") as f:
+        f["RDM"] = RDM.T
+        yield LazyMatDataset(f["RDM"])
+
+
+@pytest.mark.parametrize(
+    "key",
+    [
+        (),
+        Ellipsis,
+        1,
+        -1,
+        (slice(None), 2),
+        (slice(1, 4), slice(None), slice(0, 6, 2)),
+        (slice(None, None, -1), 0),
+        (Ellipsis, slice(4, 0, -2)),
+        [3, 0, 0, 2],
+        ([2, 0], slice(None), [5, 1]),
+        (slice(None), [1, 3], [0, 5]),
+        (0, [4, 1], 3),
+        (slice(None), MASK),
+        (Ellipsis, MASK[:, None] & (np.arange(6) % 2 == 0)),
+        np.array([True, False, True, False]),
+        [-1, 0, -3],
+        (slice(None), np.array([-2, -5])),
+        (Ellipsis, -1),
+        (1, -2, [-6, 2]),
+        np.array([], dtype=int),
+    ],
+)
+def test_indexing_matches_numpy(dataset, key):
+    np.testing.assert_array_equal(dataset[key], np.asarray(dataset)[key])
+    np.testing.assert_array_equal(np.asarray(dataset), RDM)
+
+
+def test_out_of_bounds_index_raises(dataset):
+    with pytest.raises(IndexError):
+        dataset[[0, 4]]
+    with pytest.raises(IndexError):
+        dataset[:, -6]
+
+
+def _mat_header(version, endian):
+    text = b"MATLAB 5.0 MAT-file, Platform: GLNXA64".ljust(116, b" ")
+    return text + b"\x00" * 8 + version + endian
+
+
+def _write_v73(path):
+    with h5py.File(path, "w", userblock_size=512) as f:
+        f["RDM"] = RDM.T
+    with open(path, "r+b") as f:
+        f.write(_mat_header(b"\x00\x02", b"IM"))
+
+
+@pytest.mark.parametrize("fmt", ["4", "5"])
+def test_mat_version_scipy_files(tmp_path, fmt):
+    path = tmp_path / "rdm.mat"
+    savemat(path, {"RDM": RDM[0]}, format=fmt)
+    assert get_mat_version(path) == "legacy"
+
+
+def test_mat_version_v73(tmp_path):
+    path = tmp_path / "rdm.mat"
+    _write_v73(path)
+    assert get_mat_version(path) == "hdf5"
+
+    with h5py.File(tmp_path / "plain.mat", "w") as f:
+        f["RDM"] = RDM
+    assert get_mat_version(tmp_path / "plain.mat") == "hdf5"
+
+
+@pytest.mark.parametrize(
+    "content, expected",
+    [
+        (_mat_header(b"\x01\x00", b"MI"), "legacy"),
+        (_mat_header(b"\x00\x01", b"IM"), "legacy"),
+        # v7.3 version field without the HDF5 signature behind it
+        (_mat_header(b"\x00\x02", b"IM") + b"\x00" * 400, "unknown"),
+        (_mat_header(b"\x00\x01", b"IM")[:100], "unknown"),
+        (b"not a mat file at all" * 10, "unknown"),
+    ],
+)
+def test_mat_version_headers(tmp_path, content, expected):
+    path = tmp_path / "rdm.mat"
+    path.write_bytes(content)
+    assert get_mat_version(path) == expected
+
+
+def test_mat_version_missing_file(tmp_path):
+    assert get_mat_version(tmp_path / "missing.mat") == "unknown"
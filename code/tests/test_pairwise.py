@@ -0,0 +1,81 @@
+"""Pairwise RDM engine against per-pair batched LDA decoding."""
+
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.model_selection import LeaveOneGroupOut
+
+from shared.tools.batch_lda import cross_val_batch_lda
+from shared.tools.pairwise import (
+    condition_pairs,
+    pairwise_conditions,
+    pairwise_labels,
+    pairwise_rdm,
+)
+from shared.tools.viewpoint_decoding_config import viewpoint_decoding_config
+
+
+def test_condition_pairs_square_and_hetero():
+    _, _, pairs = condition_pairs([1, 2, 3, 4])
+    assert len(pairs) == 6
+
+    rows, cols, pairs = condition_pairs([[1, 2, 3], [3, 4, 5]])
+    assert len(pairs) == 8
+    assert all(rows[i] != cols[j] for i, j in pairs)
+
+    rows, cols, pairs = condition_pairs([[1, 2], [3, 4, 1]])
+    assert len(pairs) == 5
+    assert all(rows[i] != cols[j] for i, j in pairs)
+
+
+def test_conditions_follow_the_target_class(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    cfg = viewpoint_decoding_config("viewpoint")
+    behav = pd.DataFrame({"stimnumber": np.arange(1, 113)})
+
+    # The default pw_mode covers every label of each target class
+    pw_mode = cfg["rdm"]["pw_mode"]
+    for target_class in ["identity", "stimulus"]:
+        conditions = pairwise_conditions(cfg, target_class, pw_mode)
+        labels = pairwise_labels(behav, target_class)
+        np.testing.assert_array_equal(conditions, np.unique(labels))
+
+    with pytest.raises(ValueError, match="not defined for target_class"):
+        pairwise_conditions(cfg, "stimulus", "animate_only")
+    with pytest.raises(ValueError, match="Unknown target_class"):
+        pairwise_conditions(cfg, "viewpoint", "all")
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_pairs_match_cross_val_batch_lda(make_epochs, n_jobs):
+    X, y, groups = make_epochs(n_classes=4)
+    results = pairwise_rdm(X, y, groups, [1, 2, 3, 4], n_jobs=n_jobs)
+
+    for (i, j), scores in zip(results["pairs"], results["scores"]):
+        a, b = results["rows"][i], results["cols"][j]
+        keep = np.isin(y, [a, b])
+        expected = cross_val_batch_lda(
+            X[keep], y[keep], groups[keep], LeaveOneGroupOut()
+        ).mean(axis=0)
+        np.testing.assert_allclose(scores, expected, atol=1e-12)
+        np.testing.assert_array_equal(results["rdm"][i, j], scores)
+        np.testing.assert_array_equal(results["rdm"][j, i], scores)
+
+
+def test_class_missing_from_training_fold(make_epochs):
+    # Condition 4 only has trials in group 0
+    X, y, groups = make_epochs(n_classes=4)
+    keep = (y != 4) | (groups == 0)
+    X, y, groups = X[keep], y[keep], groups[keep]
+
+    results = pairwise_rdm(X, y, groups, [1, 2, 3, 4])
+    assert np.all(np.isfinite(results["scores"]))
+    for (i, j), scores in zip(results["pairs"], results["scores"]):
+        if 4 in (results["rows"][i], results["cols"][j]):
+            continue
+        a, b = results["rows"][i], results["cols"][j]
+        pair = np.isin(y, [a, b])
+        expected = cross_val_batch_lda(
+            X[pair], y[pair], groups[pair], LeaveOneGroupOut()
+        ).mean(axis=0)
+        np.testing.assert_allclose(scores, expected, atol=1e-12)
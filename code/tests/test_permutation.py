@@ -0,0 +1,82 @@
+"""Label-permutation engine against refitting each shuffle."""
+
+import numpy as np
+import pytest
+from sklearn.model_selection import LeaveOneGroupOut
+
+from shared.tools.batch_lda import cross_val_batch_lda
+from shared.tools.permutation import (
+    permutation_null,
+    permutation_pvalues,
+    permute_labels,
+)
+
+
+def test_permute_labels_within_groups(make_epochs):
+    _, y, groups = make_epochs()
+    labels = permute_labels(y, groups, 20, seed=1)
+
+    np.testing.assert_array_equal(labels[0], y)
+    for group in np.unique(groups):
+        idx = groups == group
+        for row in labels:
+            np.testing.assert_array_equal(np.sort(row[idx]), np.sort(y[idx]))
+
+
+def test_null_matches_refits(make_epochs):
+    X, y, groups = make_epochs()
+    n_permutations = 5
+    observed, null = permutation_null(X, y, groups, n_permutations, seed=2)
+    labels = permute_labels(y, groups, n_permutations, seed=2)
+
+    expected = [
+        cross_val_batch_lda(X, row, groups, LeaveOneGroupOut()).mean(axis=0)
+        for row in labels
+    ]
+    np.testing.assert_allclose(observed, expected[0], atol=1e-12)
+    np.testing.assert_allclose(null, expected[1:], atol=1e-12)
+
+
+def _unbalanced(X, y, groups, missing):
+    """Drop trials so classes are unbalanced or absent from a group."""
+    rng = np.random.default_rng(4)
+    keep = ~((y == 1) & (rng.random(len(y)) < 0.5))
+    if missing:
+        # class 3 only in group 0: missing from the training set there
+        keep &= (y != 3) | (groups == 0)
+    return X[keep], y[keep], groups[keep]
+
+
+@pytest.mark.parametrize("scoring", ["balanced_accuracy", "accuracy"])
+@pytest.mark.parametrize("missing", [False, True])
+def test_unbalanced_classes_match_refits(make_epochs, missing, scoring):
+    X, y, groups = _unbalanced(*make_epochs(), missing)
+    observed, null = permutation_null(
+        X, y, groups, 4, scoring=scoring, seed=5, max_bytes=1
+    )
+    labels = permute_labels(y, groups, 4, seed=5)
+
+    expected = [
+        cross_val_batch_lda(X, row, groups, LeaveOneGroupOut(), scoring)
+        for row in labels
+    ]
+    np.testing.assert_allclose(observed, expected[0].mean(axis=0))
+    np.testing.assert_allclose(null, np.mean(expected[1:], axis=1))
+
+
+def test_null_matches_refits_in_small_batches(make_epochs):
+    X, y, groups = make_epochs()
+    full = permutation_null(X, y, groups, 6, seed=3)
+    batched = permutation_null(X, y, groups, 6, seed=3, max_bytes=1)
+    np.testing.assert_allclose(batched[0], full[0])
+    np.testing.assert_allclose(batched[1], full[1])
+
+
+def test_pvalues_count_observed():
+    observed = np.array([0.9, 0.1])
+    null = np.array([[0.5, 0.2], [0.95, 0.05], [0.1, 0.3]])
+    pvalues = permutation_pvalues(observed, null)
+
+    # The observed labeling counts as one of the permutations
+    np.testing.assert_allclose(pvalues["uncorrected"], [2 / 4, 3 / 4])
+    np.testing.assert_allclose(pvalues["max_stat"], [2 / 4, 4 / 4])
@@ -0,0 +1,82 @@
+"""Low-memory chunked epoching against filtering the full recording."""
+
+import importlib
+import sys
+
+import mne
+import numpy as np
+import pytest
+
+import shared.tools.resources as resources
+from shared.tools.preprocessing import epoch_in_chunks
+
+L_FREQ, H_FREQ = 0.1, 40.0
+
+
+@pytest.fixture
+def raw_file(tmp_path):
+    """Non-preloaded recording with a nonzero first sample, and events."""
+    sfreq = 256.0
+    rng = np.random.default_rng(0)
+    montage = mne.channels.make_standard_montage("biosemi64")
+    info = mne.create_info(montage.ch_names[:8], sfreq, "eeg")
+    data = np.cumsum(rng.normal(size=(8, int(80 * sfreq))), axis=1) * 1e-7
+    raw = mne.io.RawArray(data, info, first_samp=1234, verbose=False)
+    path = tmp_path / "sub-01_raw.fif"
+    raw.save(path, verbose=False)
+
+    onsets = np.arange(int(2 * sfreq), int(76 * sfreq), int(0.55 * sfreq))
+    events = np.column_stack(
+        [onsets + raw.first_samp, np.zeros_like(onsets), np.ones_like(onsets)]
+    )
+    return path, events
+
+
+@pytest.mark.parametrize("chunk_duration", [5.0, 20.0, 600.0])
+def test_chunked_epochs_match_full_raw(raw_file, chunk_duration):
+    path, events = raw_file
+
+    # Default path of run_preprocess: filter the whole recording
+    raw = mne.io.read_raw_fif(path, preload=True, verbose=False)
+    raw.set_eeg_reference(verbose=False)
+    raw.filter(l_freq=L_FREQ, h_freq=H_FREQ, verbose=False)
+    expected = mne.Epochs(
+        raw,
+        events,
+        tmin=-0.1,
+        tmax=0.8,
+        baseline=(-0.1, 0),
+        detrend=0,
+        proj=False,
+        preload=True,
+        verbose=False,
+    )
+
+    # low_memory path: the same recording opened without preloading
+    raw = mne.io.read_raw_fif(path, preload=False, verbose=False)
+    epochs = epoch_in_chunks(
+        raw,
+        events,
+        l_freq=L_FREQ,
+        h_freq=H_FREQ,
+        chunk_duration=chunk_duration,
+    )
+
+    np.testing.assert_array_equal(epochs.events, expected.events)
+    np.testing.assert_allclose(epochs.times, expected.times)
+    np.testing.assert_allclose(
+        epochs.get_data(), expected.get_data(), rtol=0, atol=1e-12
+    )
+
+
+def test_resources_without_resource_module(monkeypatch):
+    monkeypatch.setitem(sys.modules, "resource", None)
+    try:
+        module = importlib.reload(resources)
+        assert module.resource is None
+        assert module.peak_rss_mb() is None
+        assert module.reset_peak_rss() is None
+    finally:
+        monkeypatch.undo()
+        importlib.reload(resources)
+    assert resources.peak_rss_mb() > 0
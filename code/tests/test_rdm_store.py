@@ -0,0 +1,98 @@
+"""Subject RDM store against direct loading."""
+
+import os
+
+import numpy as np
+import pytest
+from scipy.io import savemat
+
+from shared.tools.rdm_store import (
+    load_rdms_bulk,
+    load_subject_rdm,
+    update_rdm_store,
+)
+
+
+def _write_rdms(tmp_path, n_subjects=3, n_conditions=4, n_times=5):
+    rng = np.random.default_rng(0)
+    rdms = rng.random((n_subjects, n_conditions, n_conditions, n_times))
+    files = {}
+    for s, rdm in enumerate(rdms, start=1):
+        files[s] = str(tmp_path / f"sub-{s:02d}_RDM.mat")
+        savemat(files[s], {"RDM": rdm})
+    return rdms, files
+
+
+def test_store_matches_files(tmp_path):
+    rdms, files = _write_rdms(tmp_path)
+    store = update_rdm_store(tmp_path, "test", files, verbose=False)
+    np.testing.assert_allclose(store["rdms"], rdms)
+    np.testing.assert_allclose(store["mean"], rdms.mean(axis=0))
+    np.testing.assert_allclose(store["var"], rdms.var(axis=0, ddof=1))
+
+
+def test_new_order_or_time_axis_rebuilds(tmp_path):
+    rdms, files = _write_rdms(tmp_path)
+    update_rdm_store(tmp_path, "test", files, verbose=False)
+
+    order = [3, 1, 0, 2]
+    store = update_rdm_store(
+        tmp_path, "test", files, order=order, verbose=False
+    )
+    np.testing.assert_allclose(store["rdms"], rdms[:, order][:, :, order])
+
+    store = update_rdm_store(
+        tmp_path, "test", files, order=order, time_axis=0, verbose=False
+    )
+    expected = np.moveaxis(rdms, 1, -1)[:, order][:, :, order]
+    np.testing.assert_allclose(store["rdms"], expected)
+    np.testing.assert_allclose(store["mean"], expected.mean(axis=0))
+
+
+def test_bulk_load_matches_single_files(tmp_path):
+    rdms, files = _write_rdms(tmp_path, n_subjects=12)
+    order = [2, 0, 3, 1]
+
+    stack, report = load_rdms_bulk(
+        list(files.values()), order, n_workers=4, verbose=False
+    )
+    for i, file_path in enumerate(files.values()):
+        np.testing.assert_array_equal(
+            stack[i], load_subject_rdm(file_path, order)
+        )
+    assert report["files"] == list(files.values())
+
+    # a glob pattern is loaded in sorted order
+    stack, _ = load_rdms_bulk(str(tmp_path / "sub-*_RDM.mat"), verbose=False)
+    np.testing.assert_allclose(stack, rdms)
+
+
+def test_bulk_load_rejects_mismatched_shapes(tmp_path):
+    _, files = _write_rdms(tmp_path)
+    savemat(files[3], {"RDM": np.zeros((5, 5, 5))})
+    with pytest.raises(ValueError, match="does not match"):
+        load_rdms_bulk(list(files.values()), verbose=False)
+    with pytest.raises(FileNotFoundError):
+        load_rdms_bulk(str(tmp_path / "none-*.mat"), verbose=False)
+
+
+def test_incremental_updates_match_direct_statistics(tmp_path):
+    rdms, files = _write_rdms(tmp_path, n_subjects=5)
+    for n in range(1, 6):
+        subset = {s: files[s] for s in range(1, n + 1)}
+        store = update_rdm_store(tmp_path, "test", subset, verbose=False)
+        np.testing.assert_allclose(store["mean"], rdms[:n].mean(axis=0))
+        if n > 1:
+            np.testing.assert_allclose(
+                store["var"], rdms[:n].var(axis=0, ddof=1)
+            )
+
+    # a changed file replaces its subject and the statistics are redone
+    rdms[1] = rdms[1] * 3
+    savemat(files[2], {"RDM": rdms[1]})
+    mtime = os.path.getmtime(files[2]) + 5
+    os.utime(files[2], (mtime, mtime))
+    store = update_rdm_store(tmp_path, "test", files, verbose=False)
+    np.testing.assert_allclose(store["rdms"], rdms)
+    np.testing.assert_allclose(store["mean"], rdms.mean(axis=0))
+    np.testing.assert_allclose(store["var"], rdms.var(axis=0, ddof=1))
@@ -0,0 +1,96 @@
+"""Consolidated results store round-trip."""
+
+import numpy as np
+import pytest
+
+from shared.tools.results_store import (
+    append_result,
+    has_result,
+    list_analyses,
+    read_results,
+    summarize_results,
+)
+
+TIMES = np.linspace(-0.1, 0.5, 7)
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "results.h5"
+    rng = np.random.default_rng(0)
+    rows = {s: rng.random(len(TIMES)) for s in [4, 1, 9]}
+    for subject, values in rows.items():
+        append_result(
+            path,
+            "infants",
+            "category_one_rotation_out",
+            subject,
+            values,
+            times=TIMES,
+            attrs={"chance": 0.5, "classifier": "lda"},
+        )
+    return path, rows
+
+
+def test_round_trip(store):
+    path, rows = store
+    results = read_results(path, "infants", "category_one_rotation_out")
+
+    np.testing.assert_array_equal(results["subjects"], [4, 1, 9])
+    np.testing.assert_array_equal(
+        results["data"], np.stack(list(rows.values()))
+    )
+    np.testing.assert_array_equal(results["times"], TIMES)
+    assert results["attrs"] == {"chance": 0.5, "classifier": "lda"}
+    assert has_result(path, "infants", "category_one_rotation_out", 1)
+    assert not has_result(path, "infants", "category_one_rotation_out", 2)
+    assert not has_result(path, "adults", "category_one_rotation_out", 1)
+    assert list_analyses(path) == {"infants": {"category_one_rotation_out": 3}}
+
+
+def test_rewrite_replaces_the_row(store):
+    path, rows = store
+    new = np.full(len(TIMES), 0.75)
+    append_result(path, "infants", "category_one_rotation_out", 1, new)
+
+    results = read_results(path, "infants", "category_one_rotation_out")
+    np.testing.assert_array_equal(results["subjects"], [4, 1, 9])
+    np.testing.assert_array_equal(results["data"][1], new)
+    np.testing.assert_array_equal(results["data"][0], rows[4])
+
+
+def test_select_subjects_and_times(store):
+    path, rows = store
+    results = read_results(
+        path,
+        "infants",
+        "category_one_rotation_out",
+        subjects=[9, 4],
+        times=slice(2, 5),
+    )
+    np.testing.assert_array_equal(results["subjects"], [9, 4])
+    np.testing.assert_array_equal(
+        results["data"], np.stack([rows[9], rows[4]])[:, 2:5]
+    )
+    np.testing.assert_array_equal(results["times"], TIMES[2:5])
+
+    summary = summarize_results(path, "infants", "category_one_rotation_out")
+    data = np.stack(list(rows.values()))
+    np.testing.assert_allclose(summary["mean"], data.mean(axis=0))
+    np.testing.assert_allclose(
+        summary["sem"], data.std(axis=0, ddof=1) / np.sqrt(3)
+    )
+
+
+def test_errors(store, tmp_path):
+    path, _ = store
+    with pytest.raises(KeyError, match=r"\[2\]"):
+        read_results(
+            path, "infants", "category_one_rotation_out", subjects=[1, 2]
+        )
+    with pytest.raises(ValueError, match="does not match"):
+        append_result(
+            path, "infants", "category_one_rotation_out", 5, np.zeros(3)
+        )
+    with pytest.raises(FileNotFoundError):
+        read_results(tmp_path / "missing.h5", "infants", "x")
@@ -0,0 +1,122 @@
+"""RSA correlation engine against scipy.stats."""
+
+import numpy as np
+import pytest
+from scipy import stats
+from scipy.spatial.distance import squareform
+
+from shared.tools.rsa import (
+    combine_ttcorr,
+    correlate_rdms_to_models,
+    correlate_time_time,
+    rdm_upper_triangle,
+)
+
+SCIPY_METHODS = {
+    "spearman": lambda a, b: stats.spearmanr(a, b)[0],
+    "pearson": lambda a, b: stats.pearsonr(a, b)[0],
+    "kendall": lambda a, b: stats.kendalltau(a, b)[0],
+}
+
+
+def _random_rdms(rng, n_rdms, n_conditions, n_times, n_levels=None):
+    """Symmetric RDMs with a zero diagonal (n_rdms, n, n, n_times)."""
+    n_pairs = n_conditions * (n_conditions - 1) // 2
+    values = rng.random((n_rdms, n_times, n_pairs))
+    if n_levels is not None:
+        # Ties, as in accuracy RDMs
+        values = np.round(values * n_levels)
+    rdms = np.stack([[squareform(v) for v in subject] for subject in values])
+    return np.moveaxis(rdms, 1, -1)
+
+
+def test_upper_triangle_matches_squareform():
+    rdms = _random_rdms(np.random.default_rng(0), 1, 6, 2)[0]
+    vectors = rdm_upper_triangle(rdms)
+    for t in range(2):
+        np.testing.assert_array_equal(
+            vectors[:, t], squareform(rdms[:, :, t], checks=False)
+        )
+
+
+@pytest.mark.parametrize("method", ["spearman", "pearson", "kendall"])
+def test_models_match_scipy(method):
+    rng = np.random.default_rng(1)
+    rdms = _random_rdms(rng, 3, 8, 4, n_levels=6)
+    models = _random_rdms(rng, 2, 8, 1, n_levels=3)[..., 0]
+
+    corr = correlate_rdms_to_models(rdms, models, method)
+    for s in range(3):
+        for m in range(2):
+            for t in range(4):
+                expected = SCIPY_METHODS[method](
+                    squareform(rdms[s, :, :, t], checks=False),
+                    squareform(models[m], checks=False),
+                )
+                assert corr[s, m, t] == pytest.approx(expected, abs=1e-12)
+
+
+@pytest.mark.parametrize("method", ["spearman", "pearson", "kendall"])
+def test_time_time_matches_scipy(method):
+    rng = np.random.default_rng(2)
+    reference = _random_rdms(rng, 1, 7, 3, n_levels=5)[0]
+    rdms = _random_rdms(rng, 2, 7, 4, n_levels=5)
+
+    ttcorr = correlate_time_time(reference, rdms, method, max_pairs=None)
+    for s in range(2):
+        for i in range(3):
+            for j in range(4):
+                expected = SCIPY_METHODS[method](
+                    squareform(reference[:, :, i], checks=False),
+                    squareform(rdms[s, :, :, j], checks=False),
+                )
+                assert ttcorr[s, i, j] == pytest.approx(expected, abs=1e-12)
+
+
+def test_kendall_subset_matches_time_time():
+    rng = np.random.default_rng(3)
+    rdms = _random_rdms(rng, 1, 9, 3, n_levels=6)[0]
+    model = _random_rdms(rng, 1, 9, 1, n_levels=3)[0]
+
+    corr = correlate_rdms_to_models(
+        rdms, model[..., 0], "kendall", max_pairs=200, seed=4
+    )
+    ttcorr = correlate_time_time(model, rdms, "kendall", max_pairs=200, seed=4)
+    np.testing.assert_allclose(corr[0, 0], ttcorr[0])
+
+
+def _write_ttcorr(tmp_path, subjects, shape=(4, 5)):
+    rng = np.random.default_rng(0)
+    files, arrays = {}, {}
+    for subject in subjects:
+        arrays[subject] = rng.random(shape)
+        files[subject] = tmp_path / f"sub-{subject:02d}_ttcorr.npy"
+        np.save(files[subject], arrays[subject])
+    return files, arrays
+
+
+def test_combine_ttcorr_selects_by_subject_id(tmp_path):
+    files, arrays = _write_ttcorr(tmp_path, [1, 2, 5, 7])
+    output = tmp_path / "combined.npy"
+    stack = combine_ttcorr(files, [7, 2, 5], output_path=output)
+    expected = np.stack([arrays[7], arrays[2], arrays[5]])
+    np.testing.assert_array_equal(stack, expected)
+    np.testing.assert_array_equal(np.load(output), expected)
+
+
+def test_combine_ttcorr_raises_on_missing_subject(tmp_path):
+    files, _ = _write_ttcorr(tmp_path, [1, 2, 5])
+    with pytest.raises(FileNotFoundError, match=r"\[3\]"):
+        combine_ttcorr(files, [1, 3, 5])
+
+    # listed but deleted from disk
+    files[5].unlink()
+    with pytest.raises(FileNotFoundError, match=r"\[5\]"):
+        combine_ttcorr(files, [1, 2, 5])
+
+
+def test_combine_ttcorr_raises_on_shape_mismatch(tmp_path):
+    files, _ = _write_ttcorr(tmp_path, [1, 2])
+    np.save(files[2], np.zeros((4, 6)))
+    with pytest.raises(ValueError, match="does not match"):
+        combine_ttcorr(files, [1, 2])
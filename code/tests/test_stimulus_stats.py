@@ -0,0 +1,80 @@
+"""Stimulus statistics and the saved entropy/luminance splits."""
+
+import json
+
+import imageio.v3 as iio
+import numpy as np
+import pytest
+
+from shared.tools.stimulus_stats import (
+    histogram_statistics,
+    load_stimulus_splits,
+    save_stimulus_splits,
+)
+from shared.tools.viewpoint_decoding_config import viewpoint_decoding_config
+
+
+def _write_images(stim_dir, n_images=6):
+    stim_dir.mkdir(parents=True)
+    rng = np.random.default_rng(0)
+    images = []
+    for i in range(n_images):
+        image = rng.integers(0, 32 * (i + 1), (16, 16), dtype=np.uint8)
+        iio.imwrite(stim_dir / f"stim_{i:03d}.png", image)
+        images.append(image)
+    return images
+
+
+def test_histogram_statistics_match_direct():
+    rng = np.random.default_rng(1)
+    image = rng.integers(0, 256, (20, 30))
+    stats = histogram_statistics(
+        np.bincount(image.ravel(), minlength=256)[None]
+    )
+
+    p = np.bincount(image.ravel(), minlength=256) / image.size
+    p = p[p > 0]
+    assert stats["entropy"][0] == pytest.approx(-(p * np.log2(p)).sum())
+    assert stats["luminance"][0] == pytest.approx(image.mean() / 255)
+    assert stats["rms_contrast"][0] == pytest.approx(image.std() / 255)
+
+
+def test_splits_are_saved_outside_the_stimuli(tmp_path):
+    stim_dir = tmp_path / "stimuli"
+    _write_images(stim_dir)
+    splits_file = tmp_path / "results" / "stimulus_splits.json"
+
+    splits = save_stimulus_splits(
+        stim_dir, splits_file, pattern="*.png", n_stimuli=6
+    )
+    assert load_stimulus_splits(splits_file) == splits
+    assert splits["luminance"] == {"low": [1, 2, 3], "high": [4, 5, 6]}
+    assert sorted(p.name for p in stim_dir.iterdir()) == [
+        f"stim_{i:03d}.png" for i in range(6)
+    ]
+    assert sorted(p.name for p in splits_file.parent.iterdir()) == [
+        "stimulus_histograms.json",
+        "stimulus_splits.json",
+    ]
+
+    with pytest.raises(ValueError, match="expected 7"):
+        save_stimulus_splits(
+            stim_dir, splits_file, pattern="*.png", n_stimuli=7
+        )
+
+
+def test_config_reads_the_splits_file(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    cfg = viewpoint_decoding_config("viewpoint")
+    stored = cfg["stimnum"]["entropy"]
+
+    splits = {"entropy": {"low": [1], "high": [2]}}
+    cfg["stimulus_splits_file"].write_text(json.dumps(splits))
+    cfg = viewpoint_decoding_config("viewpoint")
+    assert cfg["stimnum"]["entropy"] == splits["entropy"]
+    assert stored != splits["entropy"]
+
+    # A damaged splits file is an error, not a silent fallback
+    cfg["stimulus_splits_file"].write_text("{")
+    with pytest.raises(json.JSONDecodeError):
+        viewpoint_decoding_config("viewpoint")
@@ -0,0 +1,95 @@
+"""Trigger decoding and alignment against the original list-based code."""
+
+import mne
+import numpy as np
+import pytest
+
+from shared.tools.triggers import (
+    _align_trigger_onsets_loop,
+    align_trigger_onsets,
+    read_status_triggers,
+)
+
+
+def _session(n_events, dropped, sfreq=2048, seed=0):
+    """Expected onset times and the detected samples with drops."""
+    rng = np.random.default_rng(seed)
+    expected_times = np.cumsum(rng.uniform(0.35, 0.55, n_events))
+    true_samples = np.round(sfreq * (expected_times + 5.0)).astype(np.int64)
+    return expected_times, true_samples, np.delete(true_samples, dropped)
+
+
+@pytest.mark.parametrize(
+    "dropped",
+    [[5], [3, 17, 40], [10, 11, 12], [1, 2, 50, 51, 90]],
+)
+def test_alignment_matches_loop(dropped):
+    sfreq = 2048
+    expected_times, true_samples, detected = _session(100, dropped, sfreq)
+
+    aligned, inserted = align_trigger_onsets(
+        detected, expected_times, sfreq, verbose=False
+    )
+    expected = _align_trigger_onsets_loop(detected, expected_times, sfreq)
+
+    np.testing.assert_array_equal(aligned, expected)
+    np.testing.assert_array_equal(inserted, dropped)
+    assert np.all(np.abs(aligned - true_samples) <= 1)
+
+
+def test_random_sessions_match_loop():
+    sfreq = 1000
+    rng = np.random.default_rng(1)
+    for seed in range(20):
+        dropped = np.sort(rng.choice(np.arange(1, 400), 12, replace=False))
+        expected_times, _, detected = _session(500, dropped, sfreq, seed)
+        aligned, _ = align_trigger_onsets(
+            detected, expected_times, sfreq, verbose=False
+        )
+        np.testing.assert_array_equal(
+            aligned,
+            _align_trigger_onsets_loop(detected, expected_times, sfreq),
+        )
+
+
+def test_nothing_missing_and_too_many_missing():
+    expected_times, true_samples, _ = _session(50, [])
+    aligned, inserted = align_trigger_onsets(
+        true_samples, expected_times, 2048, verbose=False
+    )
+    np.testing.assert_array_equal(aligned, true_samples)
+    assert inserted.size == 0
+
+    with pytest.raises(ValueError, match="Too many missing"):
+        align_trigger_onsets(
+            true_samples[:10], expected_times, 2048, max_missing=5
+        )
+
+
+def _status_raw(status, sfreq=100.0):
+    """Raw recording with one EEG channel and a Status channel."""
+    info = mne.create_info(["EEG1", "Status"], sfreq, ["eeg", "stim"])
+    data = np.vstack([np.zeros_like(status), status])
+    return mne.io.RawArray(data, info, verbose=False)
+
+
+@pytest.mark.parametrize("chunk_duration", [1.0, 0.5, 0.37, 600.0])
+def test_status_edges_on_chunk_borders(chunk_duration):
+    # Rising edges between samples 99|100, 199|200 and 249|250 fall on
+    # the borders of 1 s and 0.5 s chunks
+    status = np.full(1000, 65536.0)
+    for onset, code in [(100, 13824), (200, 13824), (250, 7), (433, 13824)]:
+        status[onset : onset + 20] += code
+    raw = _status_raw(status)
+
+    triggers = read_status_triggers(raw, chunk_duration=chunk_duration)
+
+    # Original full-length computation in run_preprocess
+    d_status = np.diff(raw.get_data(picks=[1]))[0]
+    np.testing.assert_array_equal(
+        triggers["samples"][triggers["codes"] == 13824],
+        np.nonzero(d_status == 13824)[0],
+    )
+    np.testing.assert_array_equal(triggers["samples"], [99, 199, 249, 432])
+    np.testing.assert_array_equal(triggers["codes"], [13824, 13824, 7, 13824])
+    assert triggers["n_times"] == 1000
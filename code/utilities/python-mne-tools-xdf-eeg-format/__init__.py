@@ -13,9 +13,11 @@ Created: Tue Oct 14 18:12:30 2025
 from .preprocessing import run_preprocess
 from .preprocessing_config import preprocessing_config
 from .decoding import run_decoding
+from .pairwise import run_pairwise
+from .permutation import run_permutation
+from .stimulus_stats import save_stimulus_splits
 from .viewpoint_decoding_config import viewpoint_decoding_config
 
-
 __version__ = "1.0.0"
 __author__ = "Mahdiyeh Khanbagi"
 __all__ = [
@@ -23,4 +25,7 @@ __all__ = [
     "run_preprocess",
     "viewpoint_decoding_config",
     "run_decoding",
+    "run_pairwise",
+    "run_permutation",
+    "save_stimulus_splits",
 ]
@@ -0,0 +1,289 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Sliding Age-Window Analysis
+
+Group statistics of infant decoding curves in a fixed-width age window
+that is stepped across the sample, as in sliding_age_analysis_viewpoint.r
+(window of 14 days moved in 7-day steps).
+
+Subjects are sorted by age (Age_days_ from the LabNotebook), so every
+window is a contiguous run of subjects. Prefix sums of the decoding
+curves and of their squares are computed once; the mean, standard error
+and t-value of any window then take two subtractions per time point,
+however many subjects the window holds. Sign-flip permutation nulls reuse
+the same prefix arrays (squares do not change under sign flips), giving
+window x time null t-values for a whole batch of permutations at once.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import numpy as np
+import pandas as pd
+from pathlib import Path
+
+try:
+    from .results_store import read_results
+    from .bayes_factors import load_decoding_results
+except ImportError:
+    from results_store import read_results
+    from bayes_factors import load_decoding_results
+
+
+def subject_ages(cfg_preproc, subjects, participant_group="infants"):
+    """
+    Look up subjects' ages in days in the parsed LabNotebook.
+
+    Subject numbers follow the LabNotebook rows (sub-01 is the first
+    row), as in get_subject_list().
+
+    Parameters
+    ----------
+    cfg_preproc : dict
+        Output of preprocessing_config()
+    subjects : list of int
+        Subject IDs
+    participant_group : str, optional
+        Participant group. Default is 'infants'.
+
+    Returns
+    -------
+    ages : np.ndarray
+        Age in days of each subject (n_subjects,)
+    """
+    group_info = next(
+        (
+            g
+            for g in cfg_preproc["participants_info"]
+            if g["name"] == participant_group
+        ),
+        None,
+    )
+    if group_info is None or group_info.get("labnotebook") is None:
+        raise ValueError(f"No LabNotebook loaded for '{participant_group}'")
+
+    labnotebook = group_info["labnotebook"]
+    if "Age_days_" not in labnotebook.columns:
+        raise ValueError("LabNotebook has no 'Age_days_' column")
+
+    # Subject IDs are 1-based LabNotebook rows; IDs outside the notebook
+    # have no age
+    subjects = np.asarray(subjects)
+    known = (subjects >= 1) & (subjects <= len(labnotebook))
+    ages = np.full(len(subjects), np.nan)
+    ages[known] = pd.to_numeric(
+        labnotebook["Age_days_"], errors="coerce"
+    ).to_numpy()[subjects[known] - 1]
+    if np.isnan(ages).any():
+        missing = subjects[np.isnan(ages)].tolist()
+        raise ValueError(f"No age for subjects: {missing}")
+    return ages
+
+
+def window_bounds(ages, window_size=14, step_size=7):
+    """
+    Age windows over age-sorted subjects.
+
+    Window centres start one step above the youngest subject, as in the
+    R script; a window holds the subjects within window_size / 2 days of
+    its centre (inclusive).
+
+    Parameters
+    ----------
+    ages : np.ndarray
+        Ages in days, sorted ascending
+    window_size : float, optional
+        Window width in days. Default is 14.
+    step_size : float, optional
+        Step between window centres in days. Default is 7.
+
+    Returns
+    -------
+    centres : np.ndarray
+        Window centres in days (n_windows,)
+    start, stop : np.ndarray
+        Each window's subjects are ages[start:stop]
+    """
+    n_steps = int(np.round((ages[-1] - ages[0]) / step_size))
+    centres = ages[0] + step_size * np.arange(1, n_steps + 1)
+    start = np.searchsorted(ages, centres - window_size / 2, side="left")
+    stop = np.searchsorted(ages, centres + window_size / 2, side="right")
+    return centres, start, stop
+
+
+def _window_t(prefix, prefix_sq, start, stop):
+    """Window mean, SE and t-value from prefix sums (..., subjects+1, T)."""
+    n = (stop - start)[:, None].astype(float)
+    total = prefix[..., stop, :] - prefix[..., start, :]
+    total_sq = prefix_sq[stop] - prefix_sq[start]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = total / n
+        var = np.maximum(total_sq - n * mean**2, 0.0) / (n - 1)
+        se = np.sqrt(var / n)
+        t_values = mean / se
+    return mean, se, t_values
+
+
+def sliding_age_windows(
+    data,
+    ages,
+    chance=0.0,
+    window_size=14,
+    step_size=7,
+    n_permutations=0,
+    seed=0,
+    batch_size=256,
+):
+    """
+    Group statistics of decoding curves in sliding age windows.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Decoding curves (n_subjects, n_times)
+    ages : np.ndarray
+        Age in days of each subject (n_subjects,)
+    chance : float, optional
+        Null value subtracted from the data. Default is 0.
+    window_size : float, optional
+        Window width in days. Default is 14.
+    step_size : float, optional
+        Step between window centres in days. Default is 7.
+    n_permutations : int, optional
+        Number of sign-flip permutations for window-level nulls. Default
+        is 0 (no permutations).
+    seed : int, optional
+        Random seed of the sign flips. Default is 0.
+    batch_size : int, optional
+        Permutations per batch of prefix sums. Default is 256.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with keys:
+        - 'centres': window centres in days (n_windows,)
+        - 'n': number of subjects per window (n_windows,)
+        - 'subjects': indices into data of each window's subjects
+        - 'mean': mean minus chance (n_windows, n_times)
+        - 'se': standard error (n_windows, n_times)
+        - 't': t-values (n_windows, n_times)
+        - 'p_values': permutation p-values per window and time point
+          (None without permutations)
+        - 'p_max': p-values corrected by the maximum t over time points
+          within each window (None without permutations)
+        - 'null_max': maximum null t over time of each permutation and
+          window (n_permutations, n_windows), or None
+    """
+    data = np.asarray(data, dtype=float) - chance
+    ages = np.asarray(ages, dtype=float)
+    order = np.argsort(ages, kind="stable")
+    data, ages = data[order], ages[order]
+    n_subjects, n_times = data.shape
+
+    centres, start, stop = window_bounds(ages, window_size, step_size)
+
+    # Prefix sums over age-sorted subjects, with a leading zero row
+    prefix = np.zeros((n_subjects + 1, n_times))
+    prefix_sq = np.zeros((n_subjects + 1, n_times))
+    np.cumsum(data, axis=0, out=prefix[1:])
+    np.cumsum(data**2, axis=0, out=prefix_sq[1:])
+
+    mean, se, t_obs = _window_t(prefix, prefix_sq, start, stop)
+
+    p_values = p_max = null_max = None
+    if n_permutations > 0:
+        rng = np.random.default_rng(seed)
+        exceed = np.zeros(t_obs.shape)
+        null_max = np.empty((n_permutations, len(centres)))
+        for first in range(0, n_permutations, batch_size):
+            k = min(batch_size, n_permutations - first)
+            flips = rng.choice([-1.0, 1.0], size=(k, n_subjects, 1))
+            flipped = np.zeros((k, n_subjects + 1, n_times))
+            np.cumsum(flips * data, axis=1, out=flipped[:, 1:])
+
+            _, _, t_null = _window_t(flipped, prefix_sq, start, stop)
+            exceed += (t_null >= t_obs).sum(axis=0)
+            # fmax skips windows with too few subjects (all-NaN t)
+            null_max[first : first + k] = np.fmax.reduce(t_null, axis=2)
+
+        # The observed data count as one permutation
+        p_values = (exceed + 1) / (n_permutations + 1)
+        obs_max = (null_max[:, :, None] >= t_obs[None]).sum(axis=0)
+        p_max = (obs_max + 1) / (n_permutations + 1)
+        p_values[np.isnan(t_obs)] = np.nan
+        p_max[np.isnan(t_obs)] = np.nan
+
+    return {
+        "centres": centres,
+        "n": stop - start,
+        "subjects": [order[a:b] for a, b in zip(start, stop)],
+        "mean": mean,
+        "se": se,
+        "t": t_obs,
+        "p_values": p_values,
+        "p_max": p_max,
+        "null_max": null_max,
+    }
+
+
+def age_window_results(
+    cfg_preproc,
+    results,
+    analysis,
+    subjects=None,
+    participant_group="infants",
+    chance=None,
+    **kwargs,
+):
+    """
+    Run the sliding age-window analysis on run_decoding() results.
+
+    Parameters
+    ----------
+    cfg_preproc : dict
+        Output of preprocessing_config(), for the LabNotebook ages
+    results : str or pathlib.Path
+        The HDF5 results store (cfg['results_store']) or the directory of
+        per-subject CSVs (cfg['results_dir'])
+    analysis : str
+        Analysis name, e.g. 'category_one_rotation_out'
+    subjects : list of int, optional
+        Subject IDs to include. Default is None (all subjects in the
+        store); required for CSVs.
+    participant_group : str, optional
+        Participant group. Default is 'infants'.
+    chance : float, optional
+        Null value. If None, uses the stored chance level.
+    **kwargs
+        Passed to sliding_age_windows()
+
+    Returns
+    -------
+    window_results : dict
+        Output of sliding_age_windows(), with 'times', 'ages' and
+        'subject_ids' (subject IDs of each window) added
+    """
+    results = Path(results)
+    if results.is_dir():
+        if subjects is None:
+            raise ValueError("subjects are required to read CSV results")
+        stored = load_decoding_results(results, analysis, subjects)
+        chance_level = stored["chance_level"]
+    else:
+        stored = read_results(results, participant_group, analysis, subjects)
+        chance_level = stored["attrs"].get("chance_level", 0.0)
+    if chance is None:
+        chance = chance_level
+
+    ages = subject_ages(cfg_preproc, stored["subjects"], participant_group)
+    window_results = sliding_age_windows(
+        stored["data"], ages, chance, **kwargs
+    )
+    window_results["times"] = stored["times"]
+    window_results["ages"] = ages
+    window_results["subject_ids"] = [
+        stored["subjects"][idx] for idx in window_results["subjects"]
+    ]
+    return window_results
@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Group Statistics: JZS Bayes Factor t-Tests
+
+One-sample JZS Bayes factors (Rouder et al., 2009) for all time points of
+a group's decoding results at once, matching BayesFactor::ttestBF() in R
+(Cauchy prior on the standardised effect size delta, scale r).
+
+The Bayes factor of an interval I of delta against delta = 0 is
+
+    BF_I0 = int_I p(t | delta) p(delta) d(delta) / (P(I) p(t | 0))
+
+with p(t | delta) the noncentral t density (ncp = delta * sqrt(n)).
+Substituting delta = r * tan(theta) turns the Cauchy prior into a uniform
+density over theta, so BF_I0 is the mean likelihood ratio over the theta
+interval. It is evaluated with a fixed Gauss-Legendre rule, as one
+(nodes x time points) array, instead of one numerical integration per
+time point.
+
+Like rsa.py, the module can be imported directly from the tools
+directory by analysis scripts.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from scipy import stats
+
+try:
+    from .results_store import read_results
+except ImportError:
+    from results_store import read_results
+
+
+# BayesFactor's rscale = "medium"
+DEFAULT_RSCALE = np.sqrt(2) / 2
+
+
+def _quadrature(lower, upper, n_panels, n_nodes):
+    """Composite Gauss-Legendre nodes and weights on [lower, upper]."""
+    x, w = np.polynomial.legendre.leggauss(n_nodes)
+    edges = np.linspace(lower, upper, n_panels + 1)
+    half = np.diff(edges)[:, None] / 2
+    nodes = (edges[:-1, None] + half * (x + 1)).ravel()
+    weights = (half * w).ravel()
+    return nodes, weights
+
+
+def jzs_bayes_factor(
+    t_values,
+    n,
+    r=DEFAULT_RSCALE,
+    null_interval=None,
+    n_panels=32,
+    n_nodes=16,
+    chunk_size=4096,
+):
+    """
+    One-sample JZS Bayes factors of t-values.
+
+    Parameters
+    ----------
+    t_values : array-like
+        One-sample t-values, any shape (e.g. one per time point)
+    n : int
+        Number of subjects
+    r : float, optional
+        Scale of the Cauchy prior on delta. Default is sqrt(2)/2
+        (BayesFactor's "medium").
+    null_interval : tuple of float, optional
+        Interval (lower, upper) of delta tested against delta = 0, as
+        the nullInterval argument of ttestBF(). (0, np.inf) is the
+        directional test of effects above the null value. Default is
+        None (two-sided test).
+    n_panels : int, optional
+        Number of quadrature panels. Default is 32.
+    n_nodes : int, optional
+        Gauss-Legendre nodes per panel. Default is 16.
+    chunk_size : int, optional
+        t-values evaluated per (nodes x t-values) block, to bound memory
+        for time x time results. Default is 4096.
+
+    Returns
+    -------
+    bf : np.ndarray
+        Bayes factors (alternative over null), shaped like t_values
+    """
+    t_values = np.asarray(t_values, dtype=float)
+    df = n - 1
+    if null_interval is None:
+        null_interval = (-np.inf, np.inf)
+
+    # delta = r * tan(theta): the Cauchy prior is uniform in theta
+    lower, upper = np.arctan(np.asarray(null_interval, dtype=float) / r)
+    if upper <= lower:
+        raise ValueError(f"Empty null_interval: {null_interval}")
+    theta, weights = _quadrature(lower, upper, n_panels, n_nodes)
+
+    ncp = r * np.tan(theta)[:, None] * np.sqrt(n)
+    t_flat = t_values.ravel()
+    bf = np.empty(t_flat.shape)
+    for start in range(0, t_flat.size, chunk_size):
+        t_chunk = t_flat[start : start + chunk_size]
+        likelihood = stats.nct.pdf(t_chunk[None, :], df, ncp)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            bf[start : start + chunk_size] = (
+                weights @ likelihood / (upper - lower)
+            ) / stats.t.pdf(t_chunk, df)
+
+    return bf.reshape(t_values.shape)
+
+
+def ttest_bayes_factor(
+    data, chance=0.0, r=DEFAULT_RSCALE, null_interval=None, **kwargs
+):
+    """
+    One-sample JZS Bayes factor t-test at every time point.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Subject results (n_subjects, n_times) or
+        (n_subjects, n_times, n_times)
+    chance : float or np.ndarray, optional
+        Value under the null hypothesis (ttestBF's mu), e.g. the chance
+        level of a decoding analysis. Default is 0.
+    r : float, optional
+        Scale of the Cauchy prior on delta. Default is sqrt(2)/2.
+    null_interval : tuple of float, optional
+        Interval of the standardised effect size delta, e.g. (0, np.inf)
+        for accuracy above chance. Default is None (two-sided).
+    **kwargs
+        Quadrature settings passed to jzs_bayes_factor()
+
+    Returns
+    -------
+    results : dict
+        Dictionary with keys:
+        - 'bf': Bayes factors of the interval (or two-sided) alternative
+        - 'log10_bf': log10 of 'bf'
+        - 'bf_complement': Bayes factor of delta outside the interval
+          (None for two-sided tests), as the second row of ttestBF()
+        - 't': one-sample t-values
+        - 'mean': group mean
+        - 'sem': standard error of the mean
+        - 'n': number of subjects
+    """
+    data = np.asarray(data, dtype=float)
+    n = data.shape[0]
+    if n < 2:
+        raise ValueError("At least two subjects are needed")
+
+    mean = data.mean(axis=0)
+    sem = data.std(axis=0, ddof=1) / np.sqrt(n)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        t_values = (mean - chance) / sem
+
+    bf = jzs_bayes_factor(t_values, n, r, null_interval, **kwargs)
+
+    bf_complement = None
+    if null_interval is not None:
+        # The two-sided BF is the prior-weighted average of the BFs of
+        # the interval and its complement
+        lower, upper = np.asarray(null_interval, dtype=float)
+        prior_mass = stats.cauchy.cdf(upper / r) - stats.cauchy.cdf(lower / r)
+        bf_two_sided = jzs_bayes_factor(t_values, n, r, None, **kwargs)
+        bf_complement = (bf_two_sided - prior_mass * bf) / (1 - prior_mass)
+
+    return {
+        "bf": bf,
+        "log10_bf": np.log10(bf),
+        "bf_complement": bf_complement,
+        "t": t_values,
+        "mean": mean,
+        "sem": sem,
+        "n": n,
+    }
+
+
+def load_decoding_results(results_dir, analysis, subjects):
+    """
+    Stack the per-subject decoding CSVs written by run_decoding().
+
+    Parameters
+    ----------
+    results_dir : str or pathlib.Path
+        Directory with the sub-XX_<analysis>_results.csv files
+    analysis : str
+        Analysis name, e.g. 'category_one_rotation_out'
+    subjects : list of int
+        Subject IDs
+
+    Returns
+    -------
+    results : dict
+        Dictionary with keys 'data' (n_subjects, n_times), 'subjects',
+        'times' and 'chance_level'
+    """
+    results_dir = Path(results_dir)
+    frames = []
+    for subjectnr in subjects:
+        result_file = (
+            results_dir / f"sub-{subjectnr:02d}_{analysis}_results.csv"
+        )
+        if not result_file.exists():
+            raise FileNotFoundError(f"Results not found: {result_file}")
+        frames.append(pd.read_csv(result_file))
+
+    times = frames[0]["time"].to_numpy()
+    for subjectnr, frame in zip(subjects, frames):
+        if not np.allclose(frame["time"].to_numpy(), times):
+            raise ValueError(
+                f"Time points of sub-{subjectnr:02d} do not match"
+            )
+
+    return {
+        "data": np.stack([frame["accuracy"].to_numpy() for frame in frames]),
+        "subjects": np.asarray(subjects),
+        "times": times,
+        "chance_level": float(frames[0]["chance"].iloc[0]),
+    }
+
+
+def bayes_factor_results(
+    results,
+    group,
+    analysis,
+    subjects=None,
+    chance=None,
+    save_path=None,
+    **kwargs,
+):
+    """
+    Compute group Bayes factors of a decoding analysis from run_decoding().
+
+    Parameters
+    ----------
+    results : str or pathlib.Path
+        The HDF5 results store (cfg['results_store']) or the directory of
+        per-subject CSVs (cfg['results_dir'])
+    group : str
+        Participant group (used with the results store)
+    analysis : str
+        Analysis name, e.g. 'category_one_rotation_out'
+    subjects : list of int, optional
+        Subject IDs to include. Default is None (all subjects in the
+        store); required for CSVs.
+    chance : float, optional
+        Null value. If None, uses the stored chance level.
+    save_path : str or pathlib.Path, optional
+        CSV with time, mean, SEM and Bayes factors per time point.
+        Default is None (not saved).
+    **kwargs
+        Passed to ttest_bayes_factor(), e.g. r and null_interval
+
+    Returns
+    -------
+    bf_results : dict
+        Output of ttest_bayes_factor(), with 'times', 'subjects' and
+        'chance_level' added
+    """
+    results = Path(results)
+    if results.is_dir():
+        if subjects is None:
+            raise ValueError("subjects are required to read CSV results")
+        stored = load_decoding_results(results, analysis, subjects)
+        chance_level = stored["chance_level"]
+    else:
+        stored = read_results(results, group, analysis, subjects)
+        chance_level = stored["attrs"].get("chance_level", 0.0)
+    if chance is None:
+        chance = chance_level
+
+    bf_results = ttest_bayes_factor(stored["data"], chance, **kwargs)
+    bf_results["times"] = stored["times"]
+    bf_results["subjects"] = stored["subjects"]
+    bf_results["chance_level"] = chance
+
+    if save_path is not None:
+        pd.DataFrame(
+            {
+                "time": stored["times"],
+                "mAcc": bf_results["mean"],
+                "SEM": bf_results["sem"],
+                "t": bf_results["t"],
+                "BF": bf_results["bf"],
+                "logBF": bf_results["log10_bf"],
+            }
+        ).to_csv(save_path, index=False)
+        print(f"Saved Bayes factors: {save_path}")
+
+    return bf_results
@@ -9,11 +9,12 @@ Author: Mahdiyeh Khanbagi
 Created: 14/10/2025
 """
 
+import time
 import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
-import math
 import mne
+from joblib import cpu_count
 from sklearn.pipeline import make_pipeline
 from sklearn.preprocessing import StandardScaler
 from sklearn.linear_model import LogisticRegression
@@ -28,6 +29,9 @@ from mne.decoding import (
 
 from .preprocessing_config import preprocessing_config
 from .viewpoint_decoding_config import viewpoint_decoding_config
+from .batch_lda import cross_val_batch_lda
+from .decoding_cache import load_decoding_cache, save_decoding_cache
+from .results_store import append_result, has_result
 
 
 def get_classifier(classifier_type, n_classes=None):
@@ -71,48 +75,228 @@ def get_classifier(classifier_type, n_classes=None):
     return clf
 
 
-def prepare_decoding_data(epochs, behav_data, decode_type, cv_scheme):
+def plan_parallelism(n_folds, n_times, n_jobs=-1, level="auto"):
     """
-    Prepare data for decoding based on type and CV scheme.
+    Decide where to parallelize temporal decoding.
+
+    Cross-validation folds and time points can both be run in parallel.
+    Giving ``n_jobs`` to both levels spawns up to n_cores² workers, so the
+    available cores are split between them instead:
+
+    - 'folds': one worker per fold, time points run serially
+    - 'time': folds run serially, time points are split across all cores
+    - 'both': one worker per fold, the remaining cores split time points
+
+    With ``level='auto'`` folds are preferred whenever they can keep every
+    core busy, since each fold is a large independent job. Otherwise the
+    spare cores go to time points if there are enough of them.
+
+    Parameters
+    ----------
+    n_folds : int
+        Number of cross-validation folds
+    n_times : int
+        Number of time points
+    n_jobs : int, optional
+        Total number of cores to use (-1 = all). Default is -1.
+    level : str, optional
+        'auto', 'folds', 'time' or 'both'. Default is 'auto'.
+
+    Returns
+    -------
+    plan : dict
+        Dictionary with keys 'level', 'cv_n_jobs' (passed to
+        cross_val_multiscore), 'time_n_jobs' (passed to the temporal
+        estimator) and 'n_cores'
+    """
+    if n_jobs is None:
+        n_jobs = 1
+    n_cores = cpu_count() + 1 + n_jobs if n_jobs < 0 else n_jobs
+    n_cores = max(1, min(n_cores, cpu_count()))
+
+    if level == "auto":
+        if n_cores == 1 or n_folds >= n_cores:
+            level = "folds"
+        elif n_cores // n_folds >= 2 and n_times >= n_cores:
+            level = "both"
+        elif n_times >= n_folds:
+            level = "time"
+        else:
+            level = "folds"
+
+    if level == "folds":
+        cv_n_jobs, time_n_jobs = min(n_folds, n_cores), 1
+    elif level == "time":
+        cv_n_jobs, time_n_jobs = 1, min(n_times, n_cores)
+    elif level == "both":
+        cv_n_jobs = min(n_folds, n_cores)
+        time_n_jobs = max(1, n_cores // cv_n_jobs)
+    else:
+        raise ValueError(f"Unknown parallel level: {level}")
+
+    return {
+        "level": level,
+        "cv_n_jobs": cv_n_jobs,
+        "time_n_jobs": time_n_jobs,
+        "n_cores": n_cores,
+    }
+
+
+def subject_data_files(cfg_preproc, participant_group, subjectnr):
+    """
+    Get the epochs and behavioral files of a subject.
+
+    Parameters
+    ----------
+    cfg_preproc : dict
+        Preprocessing configuration
+    participant_group : str
+        Participant group ('adults' or 'infants')
+    subjectnr : str
+        Zero-padded subject number, e.g. '01'
+
+    Returns
+    -------
+    epochs_file : pathlib.Path
+        Preprocessed epochs (.fif)
+    behav_file : pathlib.Path
+        Behavioral events (.tsv)
+
+    Raises
+    ------
+    FileNotFoundError
+        If either file does not exist
+    """
+    epochs_file = (
+        cfg_preproc["preproc_dir"]
+        / participant_group
+        / f"sub-{subjectnr}"
+        / "mne"
+        / f"sub-{subjectnr}_mne_epo.fif"
+    )
+    behav_file = (
+        cfg_preproc["rawdata_dir"]
+        / participant_group
+        / f"sub-{subjectnr}"
+        / "eeg"
+        / f"sub-{subjectnr}_task-targets_events.tsv"
+    )
+
+    # Check if files exist
+    if not epochs_file.exists():
+        raise FileNotFoundError(f"Epochs file not found: {epochs_file}")
+    if not behav_file.exists():
+        raise FileNotFoundError(f"Behavioral file not found: {behav_file}")
+
+    return epochs_file, behav_file
+
+
+def load_decoding_context(epochs_file, behav_file, cfg_decode):
+    """
+    Load a subject's decoding context, from the cache if possible.
+
+    Parameters
+    ----------
+    epochs_file : pathlib.Path
+        Preprocessed epochs (.fif)
+    behav_file : pathlib.Path
+        Behavioral events (.tsv)
+    cfg_decode : dict
+        Decoding configuration (uses 'cache_data' and 'data_dtype')
+
+    Returns
+    -------
+    context : dict
+        Subject data, see build_decoding_context()
+    """
+    use_cache = cfg_decode.get("cache_data", False)
+    dtype = cfg_decode.get("data_dtype")
+    if use_cache:
+        context = load_decoding_cache(epochs_file, behav_file, dtype)
+        if context is not None:
+            print(f"Loaded cached decoding data for: {epochs_file}")
+            return context
+
+    print(f"Loading epochs from: {epochs_file}")
+    epochs = mne.read_epochs(str(epochs_file), preload=True)
+    behav_data = pd.read_csv(behav_file, delimiter="\t")
+
+    context = build_decoding_context(epochs, behav_data, dtype=dtype)
+    del epochs, behav_data
+
+    if use_cache:
+        paths = save_decoding_cache(context, epochs_file, behav_file)
+        print(f"Saved decoding cache: {paths['data']}")
+        context = load_decoding_cache(epochs_file, behav_file, dtype)
+    return context
+
+
+def build_decoding_context(epochs, behav_data, dtype=None):
+    """
+    Extract the decoding data of one subject once for all analyses.
+
+    Target trials are removed a single time and the remaining data are
+    shared (without copying) by every decode_type / cv_scheme
+    combination. Label and group vectors are derived on first use and
+    cached, so peak memory does not grow with the number of analyses.
 
     Parameters
     ----------
     epochs : mne.Epochs
-        Preprocessed epochs
+        Preprocessed epochs (preloaded)
     behav_data : pd.DataFrame
-        Behavioral data
-    decode_type : str
-        Type of decoding ('category', 'identity', 'size_2class', etc.)
-    cv_scheme : str
-        Cross-validation scheme ('one_rotation_out', 'one_block_out')
+        Behavioral data, one row per epoch
+    dtype : str or np.dtype, optional
+        Data type of the decoding array (e.g. 'float32'). If None, keeps
+        the dtype of the epochs (float64).
 
     Returns
     -------
-    X : np.ndarray
-        Data array (n_epochs, n_channels, n_times)
-    y : np.ndarray
-        Labels for decoding
-    groups : np.ndarray
-        Group labels for cross-validation
-    n_classes : int
-        Number of classes
+    context : dict
+        Dictionary with keys:
+        - 'X': data of non-target trials (n_trials, n_channels, n_times)
+        - 'behav': behavioral rows of the non-target trials
+        - 'trials': indices of the kept epochs (n_trials,)
+        - 'times': epoch time points (n_times,)
+        - 'labels', 'groups': caches filled by get_decoding_data()
     """
+    data = epochs.get_data(copy=False)
+
     # Filter out target trials if present
     if "istarget" in behav_data.columns:
-        idx = ~behav_data["istarget"].astype(bool)
-        behav_data = behav_data[idx].reset_index(drop=True)
-        X = epochs.get_data()[idx, :, :]
+        keep = ~behav_data["istarget"].to_numpy().astype(bool)
+        trials = np.flatnonzero(keep)
+        behav_data = behav_data[keep].reset_index(drop=True)
     else:
-        X = epochs.get_data()
+        trials = np.arange(len(data))
 
-    # Determine labels based on decode_type
+    # A single copy when trials are dropped or the dtype changes
+    if len(trials) < len(data):
+        X = data[trials]
+    else:
+        X = data
+    if dtype is not None:
+        X = X.astype(dtype, copy=False)
+
+    return {
+        "X": X,
+        "behav": behav_data,
+        "trials": trials,
+        "times": epochs.times.copy(),
+        "labels": {},
+        "groups": {},
+    }
+
+
+def _decoding_labels(behav_data, decode_type):
+    """Class labels of each trial for a decode_type."""
     if decode_type == "category":
         # Decode object category (group of 8 rotations)
-        y = np.array([math.ceil(x / 8) for x in behav_data["stimnumber"]])
+        return np.ceil(behav_data["stimnumber"].to_numpy() / 8).astype(int)
 
     elif decode_type == "identity":
         # Decode individual stimulus identity
-        y = np.array(behav_data["stimnumber"])
+        return behav_data["stimnumber"].to_numpy()
 
     elif decode_type == "size_2class":
         # Binary size classification
@@ -123,8 +307,8 @@ def prepare_decoding_data(epochs, behav_data, decode_type, cv_scheme):
             if len(unique_sizes) > 2:
                 median_size = np.median(y)
                 y = (y > median_size).astype(int)
-        else:
-            raise ValueError("'stimsize' column not found in behavioral data")
+            return y
+        raise ValueError("'stimsize' column not found in behavioral data")
 
     elif decode_type == "size_3class":
         # Three-class size classification
@@ -136,31 +320,101 @@ def prepare_decoding_data(epochs, behav_data, decode_type, cv_scheme):
                 # Bin into tertiles
                 tertiles = np.percentile(y, [33.33, 66.67])
                 y = np.digitize(y, tertiles)
-        else:
-            raise ValueError("'stimsize' column not found in behavioral data")
-    else:
-        raise ValueError(f"Unknown decode_type: {decode_type}")
+            return y
+        raise ValueError("'stimsize' column not found in behavioral data")
 
-    # Determine groups for cross-validation
+    raise ValueError(f"Unknown decode_type: {decode_type}")
+
+
+def _cv_groups(behav_data, cv_scheme):
+    """Cross-validation group of each trial for a cv_scheme."""
     if cv_scheme == "one_rotation_out":
         # Group by rotation (modulo 8 of stimulus number)
-        groups = np.array([x % 8 for x in behav_data["stimnumber"]])
+        return behav_data["stimnumber"].to_numpy() % 8
 
     elif cv_scheme == "one_block_out":
         # Group by block
         if "blocksequencenumber" in behav_data.columns:
-            groups = np.array(behav_data["blocksequencenumber"])
-        else:
-            raise ValueError("'blocksequencenumber' column not found")
-    else:
-        raise ValueError(f"Unknown cv_scheme: {cv_scheme}")
+            return behav_data["blocksequencenumber"].to_numpy()
+        raise ValueError("'blocksequencenumber' column not found")
+
+    raise ValueError(f"Unknown cv_scheme: {cv_scheme}")
+
 
+def get_decoding_data(context, decode_type, cv_scheme):
+    """
+    Get the data, labels and groups of one analysis from a context.
+
+    Parameters
+    ----------
+    context : dict
+        Subject data from build_decoding_context()
+    decode_type : str
+        Type of decoding ('category', 'identity', 'size_2class', etc.)
+    cv_scheme : str
+        Cross-validation scheme ('one_rotation_out', 'one_block_out')
+
+    Returns
+    -------
+    X : np.ndarray
+        Data array (n_epochs, n_channels, n_times), shared with the
+        context
+    y : np.ndarray
+        Labels for decoding
+    groups : np.ndarray
+        Group labels for cross-validation
+    n_classes : int
+        Number of classes
+    """
+    if decode_type not in context["labels"]:
+        context["labels"][decode_type] = _decoding_labels(
+            context["behav"], decode_type
+        )
+    if cv_scheme not in context["groups"]:
+        context["groups"][cv_scheme] = _cv_groups(context["behav"], cv_scheme)
+
+    y = context["labels"][decode_type]
+    groups = context["groups"][cv_scheme]
     n_classes = len(np.unique(y))
 
-    return X, y, groups, n_classes
+    return context["X"], y, groups, n_classes
 
 
-def run_temporal_decoding(X, y, groups, cfg, n_classes):
+def prepare_decoding_data(epochs, behav_data, decode_type, cv_scheme):
+    """
+    Prepare data for decoding based on type and CV scheme.
+
+    Convenience wrapper for a single analysis; use
+    build_decoding_context() and get_decoding_data() to run several
+    analyses on the same subject.
+
+    Parameters
+    ----------
+    epochs : mne.Epochs
+        Preprocessed epochs
+    behav_data : pd.DataFrame
+        Behavioral data
+    decode_type : str
+        Type of decoding ('category', 'identity', 'size_2class', etc.)
+    cv_scheme : str
+        Cross-validation scheme ('one_rotation_out', 'one_block_out')
+
+    Returns
+    -------
+    X : np.ndarray
+        Data array (n_epochs, n_channels, n_times)
+    y : np.ndarray
+        Labels for decoding
+    groups : np.ndarray
+        Group labels for cross-validation
+    n_classes : int
+        Number of classes
+    """
+    context = build_decoding_context(epochs, behav_data)
+    return get_decoding_data(context, decode_type, cv_scheme)
+
+
+def run_temporal_decoding(X, y, groups, cfg, n_classes, plan=None):
     """
     Run temporal decoding analysis.
 
@@ -176,12 +430,42 @@ def run_temporal_decoding(X, y, groups, cfg, n_classes):
         Configuration dictionary
     n_classes : int
         Number of classes
+    plan : dict, optional
+        Parallelism plan from plan_parallelism(). If None, it is derived
+        from ``cfg["n_jobs"]`` and ``cfg["parallel_level"]``.
 
     Returns
     -------
     scores : np.ndarray
         Cross-validated scores across time
     """
+    # Native batched LDA: all time points of a fold in one solve
+    if cfg["classifier"] == "batch_lda":
+        return cross_val_batch_lda(
+            X,
+            y,
+            groups,
+            cv=LeaveOneGroupOut(),
+            scoring=cfg["scoring"],
+            shrinkage=cfg.get("lda_shrinkage"),
+            method=cfg["temporal_decoding"]["method"],
+            band=cfg["temporal_decoding"].get("band"),
+        )
+
+    # Split the available cores between folds and time points
+    if plan is None:
+        plan = plan_parallelism(
+            n_folds=len(np.unique(groups)),
+            n_times=X.shape[-1],
+            n_jobs=cfg["n_jobs"],
+            level=cfg.get("parallel_level", "auto"),
+        )
+    print(
+        f"Parallel plan: {plan['level']} "
+        f"(folds n_jobs={plan['cv_n_jobs']}, "
+        f"time n_jobs={plan['time_n_jobs']})"
+    )
+
     # Get classifier
     clf = get_classifier(cfg["classifier"], n_classes)
 
@@ -189,14 +473,14 @@ def run_temporal_decoding(X, y, groups, cfg, n_classes):
     if cfg["temporal_decoding"]["method"] == "sliding":
         time_decoder = SlidingEstimator(
             clf,
-            n_jobs=cfg["n_jobs"],
+            n_jobs=plan["time_n_jobs"],
             scoring=cfg["scoring"],
             verbose=cfg["temporal_decoding"]["verbose"],
         )
     elif cfg["temporal_decoding"]["method"] == "generalizing":
         time_decoder = GeneralizingEstimator(
             clf,
-            n_jobs=cfg["n_jobs"],
+            n_jobs=plan["time_n_jobs"],
             scoring=cfg["scoring"],
             verbose=cfg["temporal_decoding"]["verbose"],
         )
@@ -212,12 +496,75 @@ def run_temporal_decoding(X, y, groups, cfg, n_classes):
         y,
         groups=groups,
         cv=LeaveOneGroupOut(),
-        n_jobs=cfg["n_jobs"],
+        n_jobs=plan["cv_n_jobs"],
     )
 
     return scores
 
 
+def benchmark_parallelism(cfg, datasets=None, n_jobs=-1, seed=0):
+    """
+    Time temporal decoding under different parallelism plans.
+
+    Compares the nested setting (``n_jobs`` at both levels) with the
+    'folds', 'time', 'both' and 'auto' plans on synthetic data.
+
+    Parameters
+    ----------
+    cfg : dict
+        Decoding configuration (classifier, scoring, temporal_decoding)
+    datasets : dict, optional
+        Maps a name to (n_trials, n_channels, n_times, n_folds).
+        Default is an adult-sized and an infant-sized dataset.
+    n_jobs : int, optional
+        Total number of cores to use (-1 = all). Default is -1.
+    seed : int, optional
+        Random seed. Default is 0.
+
+    Returns
+    -------
+    timings : pd.DataFrame
+        Run time (s) per dataset and plan
+    """
+    if datasets is None:
+        datasets = {
+            "adults": (2000, 64, 181, 8),
+            "infants": (400, 64, 181, 8),
+        }
+
+    rng = np.random.default_rng(seed)
+    rows = []
+
+    for name, (n_trials, n_channels, n_times, n_folds) in datasets.items():
+        X = rng.standard_normal((n_trials, n_channels, n_times))
+        y = rng.integers(0, 2, n_trials)
+        groups = np.arange(n_trials) % n_folds
+
+        plans = {
+            "nested": {
+                "level": "nested",
+                "cv_n_jobs": n_jobs,
+                "time_n_jobs": n_jobs,
+            }
+        }
+        for level in ["folds", "time", "both", "auto"]:
+            plans[level] = plan_parallelism(n_folds, n_times, n_jobs, level)
+
+        for label, plan in plans.items():
+            start = time.perf_counter()
+            run_temporal_decoding(X, y, groups, cfg, 2, plan=plan)
+            rows.append(
+                {
+                    "dataset": name,
+                    "plan": label,
+                    "level": plan["level"],
+                    "seconds": time.perf_counter() - start,
+                }
+            )
+
+    return pd.DataFrame(rows)
+
+
 def plot_decoding_results(
     times, scores, decode_type, chance_level, save_path=None
 ):
@@ -279,6 +626,7 @@ def run_decoding(
     decode_types=None,
     cv_schemes=None,
     overwrite=None,
+    n_jobs=None,
 ):
     """
     Run decoding analysis for a single subject.
@@ -297,6 +645,9 @@ def run_decoding(
         CV schemes to use. If None, uses 'one_rotation_out'.
     overwrite : bool, optional
         Whether to overwrite existing results
+    n_jobs : int, optional
+        Number of parallel jobs for this subject. If None, uses value
+        from config.
 
     Returns
     -------
@@ -310,6 +661,8 @@ def run_decoding(
     # Handle overwrite setting
     if overwrite is None:
         overwrite = cfg_decode["overwrite"]
+    if n_jobs is not None:
+        cfg_decode["n_jobs"] = n_jobs
 
     # Format subject number
     if isinstance(subjectnr, int):
@@ -319,50 +672,35 @@ def run_decoding(
     print(f"DECODING: Subject {subjectnr} ({participant_group})")
     print(f'{"="*70}')
 
-    # Define paths using config
-    epochs_file = (
-        cfg_preproc["preproc_dir"]
-        / participant_group
-        / f"sub-{subjectnr}"
-        / "mne"
-        / f"sub-{subjectnr}_mne_epo.fif"
-    )
-    behav_file = (
-        cfg_preproc["rawdata_dir"]
-        / participant_group
-        / f"sub-{subjectnr}"
-        / "eeg"
-        / f"sub-{subjectnr}_task-targets_events.tsv"
+    epochs_file, behav_file = subject_data_files(
+        cfg_preproc, participant_group, subjectnr
     )
 
-    # Check if files exist
-    if not epochs_file.exists():
-        raise FileNotFoundError(f"Epochs file not found: {epochs_file}")
-    if not behav_file.exists():
-        raise FileNotFoundError(f"Behavioral file not found: {behav_file}")
-
-    # Load data
-    print(f"Loading epochs from: {epochs_file}")
-    epochs = mne.read_epochs(str(epochs_file), preload=True)
-
-    print(f"Loading behavioral data from: {behav_file}")
-    behav_data = pd.read_csv(behav_file, delimiter="\t")
+    # Extract the subject's data once for all analyses, from the cache
+    # if the source files are unchanged
+    context = load_decoding_context(epochs_file, behav_file, cfg_decode)
 
-    # Plot epochs average if requested
-    if cfg_decode.get("plot_results", False) and cfg_decode.get(
+    # Plot epochs average if requested; the epochs are only read again
+    # if the figure is missing or is to be overwritten
+    fig_path = cfg_decode["figures_dir"] / f"sub-{subjectnr}_epochs.png"
+    plot_epochs = cfg_decode.get("plot_results", False) and cfg_decode.get(
         "savefile", False
-    ):
+    )
+    if plot_epochs and (overwrite or not fig_path.exists()):
+        epochs = mne.read_epochs(str(epochs_file), preload=True)
         avg = epochs.average()
+        del epochs
         fig = avg.plot_joint(show=False)
 
         # Default dpi if not in config
         dpi = cfg_decode.get("plotting", {}).get("dpi", 100)
 
-        fig_path = cfg_decode["figures_dir"] / f"sub-{subjectnr}_epochs.png"
         fig.savefig(fig_path, dpi=dpi)
         plt.close(fig)
         print(f"Saved epoch plot: {fig_path}")
 
+    times = context["times"]
+
     # Set default decode types and CV schemes
     if decode_types is None:
         decode_types = ["category"]
@@ -371,7 +709,7 @@ def run_decoding(
 
     # Storage for results
     results = {}
-    all_scores_df = pd.DataFrame({"time": epochs.times})
+    all_scores_df = pd.DataFrame({"time": times})
 
     # Run each decoding analysis
     for decode_type in decode_types:
@@ -384,14 +722,25 @@ def run_decoding(
                 cfg_decode["results_dir"]
                 / f"sub-{subjectnr}_{analysis_name}_results.csv"
             )
-            if result_file.exists() and not overwrite:
-                print(f"Results exist, skipping: {result_file}")
+            if cfg_decode.get("results_csv", True):
+                exists = result_file.exists()
+            else:
+                exists = cfg_decode.get("results_store") is not None and (
+                    has_result(
+                        cfg_decode["results_store"],
+                        participant_group,
+                        analysis_name,
+                        int(subjectnr),
+                    )
+                )
+            if exists and not overwrite:
+                print(f"Results exist, skipping: {analysis_name}")
                 continue
 
             # Prepare data
             try:
-                X, y, groups, n_classes = prepare_decoding_data(
-                    epochs, behav_data, decode_type, cv_scheme
+                X, y, groups, n_classes = get_decoding_data(
+                    context, decode_type, cv_scheme
                 )
                 print(
                     f"Data prepared: {X.shape[0]} trials, {n_classes} classes"
@@ -421,13 +770,13 @@ def run_decoding(
             all_scores_df[analysis_name] = mean_scores
 
             # Plot results
-            if cfg_decode["plotting"]["save_figs"]:
+            if cfg_decode["plot_results"]:
                 fig_path = (
                     cfg_decode["figures_dir"]
                     / f"sub-{subjectnr}_{analysis_name}_decoding.png"
                 )
                 plot_decoding_results(
-                    epochs.times,
+                    times,
                     mean_scores,
                     decode_type,
                     chance_level,
@@ -435,11 +784,29 @@ def run_decoding(
                 )
                 print(f"Saved figure: {fig_path}")
 
-            # Save individual results
-            if cfg_decode["save_results"]:
+            # Save individual results to the consolidated store
+            if cfg_decode["savefile"] and cfg_decode.get("results_store"):
+                append_result(
+                    cfg_decode["results_store"],
+                    participant_group,
+                    analysis_name,
+                    int(subjectnr),
+                    mean_scores,
+                    times=times,
+                    attrs={
+                        "chance_level": chance_level,
+                        "n_classes": n_classes,
+                        "classifier": cfg_decode["classifier"],
+                        "method": cfg_decode["temporal_decoding"]["method"],
+                    },
+                )
+                print(f"Saved results to: {cfg_decode['results_store']}")
+
+            # Save individual results as CSV
+            if cfg_decode["savefile"] and cfg_decode.get("results_csv", True):
                 result_df = pd.DataFrame(
                     {
-                        "time": epochs.times,
+                        "time": times,
                         "accuracy": mean_scores,
                         "chance": chance_level,
                     }
@@ -449,11 +816,11 @@ def run_decoding(
 
             print(f"✓ Completed: {analysis_name}")
             print(
-                f"  Peak accuracy: {mean_scores.max():.3f} at {epochs.times[mean_scores.argmax()]:.3f}s"
+                f"  Peak accuracy: {mean_scores.max():.3f} at {times[mean_scores.argmax()]:.3f}s"
             )
 
     # Save combined results
-    if cfg_decode["save_results"]:
+    if cfg_decode["savefile"] and cfg_decode.get("results_csv", True):
         combined_file = (
             cfg_decode["results_dir"] / f"sub-{subjectnr}_all_results.csv"
         )
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Decoding Data Cache
+
+Stores the decoding-ready data of each subject next to its epochs file so
+that repeated decoding runs do not re-parse the -epo.fif and events TSV.
+
+The data array is saved in its own dtype as a C-contiguous (trials x
+channels x times) .npy file that is opened memory-mapped, so parallel
+workers share the same pages. The behavioral columns are stored as a
+compact .npz label table. A JSON key records the modification time, size
+and SHA-1 hash of the source files and the data dtype; an entry is reused
+while the files are unchanged and the requested dtype matches.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import os
+import json
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+def file_fingerprint(path, chunk_size=2**20):
+    """
+    Get the modification time, size and SHA-1 hash of a file.
+
+    Parameters
+    ----------
+    path : pathlib.Path
+        File to fingerprint
+    chunk_size : int, optional
+        Bytes read at a time while hashing. Default is 1 MB.
+
+    Returns
+    -------
+    fingerprint : dict
+        Dictionary with keys 'mtime_ns', 'size' and 'sha1'
+    """
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            sha1.update(block)
+
+    stat = path.stat()
+    return {
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "sha1": sha1.hexdigest(),
+    }
+
+
+def _is_unchanged(path, fingerprint):
+    """Check a file against a stored fingerprint, hashing only if needed."""
+    if not path.exists():
+        return False
+
+    stat = path.stat()
+    if stat.st_size != fingerprint["size"]:
+        return False
+    if stat.st_mtime_ns == fingerprint["mtime_ns"]:
+        return True
+
+    # Touched but possibly identical: fall back to the content hash
+    return file_fingerprint(path)["sha1"] == fingerprint["sha1"]
+
+
+def cache_paths(epochs_file):
+    """
+    Get the cache file paths belonging to an epochs file.
+
+    Parameters
+    ----------
+    epochs_file : pathlib.Path
+        Path to the subject's -epo.fif file
+
+    Returns
+    -------
+    paths : dict
+        Dictionary with keys 'data' (.npy), 'labels' (.npz) and 'key'
+        (.json)
+    """
+    stem = epochs_file.name.replace("_epo.fif", "").replace("-epo.fif", "")
+    cache_dir = epochs_file.parent / "decoding_cache"
+    return {
+        "data": cache_dir / f"{stem}_decoding-data.npy",
+        "labels": cache_dir / f"{stem}_decoding-labels.npz",
+        "key": cache_dir / f"{stem}_decoding-key.json",
+    }
+
+
+def load_decoding_cache(epochs_file, behav_file, dtype=None):
+    """
+    Load a subject's cached decoding data if the sources are unchanged.
+
+    Parameters
+    ----------
+    epochs_file : pathlib.Path
+        Path to the subject's -epo.fif file
+    behav_file : pathlib.Path
+        Path to the subject's events TSV file
+    dtype : str or np.dtype, optional
+        Data type the entry must have. If None, float64 (the dtype of
+        the epochs).
+
+    Returns
+    -------
+    context : dict or None
+        Decoding context (see decoding.build_decoding_context) with a
+        read-only memory-mapped 'X', or None if there is no valid entry
+    """
+    paths = cache_paths(epochs_file)
+    if not all(p.exists() for p in paths.values()):
+        return None
+
+    with open(paths["key"]) as f:
+        key = json.load(f)
+
+    dtype = np.dtype(np.float64 if dtype is None else dtype)
+    if key["dtype"] != dtype.name:
+        return None
+
+    if not (
+        _is_unchanged(epochs_file, key["epochs"])
+        and _is_unchanged(behav_file, key["behav"])
+    ):
+        return None
+
+    X = np.load(paths["data"], mmap_mode="r")
+    with np.load(paths["labels"]) as labels:
+        behav = pd.DataFrame({name: labels[name] for name in key["columns"]})
+        trials = labels["__trials__"]
+        times = labels["__times__"]
+
+    return {
+        "X": X,
+        "behav": behav,
+        "trials": trials,
+        "times": times,
+        "labels": {},
+        "groups": {},
+    }
+
+
+def save_decoding_cache(context, epochs_file, behav_file):
+    """
+    Write a subject's decoding context to the cache.
+
+    The files are written under temporary names and renamed into place,
+    with the key last, so concurrent readers never see a partial entry.
+
+    Parameters
+    ----------
+    context : dict
+        Decoding context from decoding.build_decoding_context()
+    epochs_file : pathlib.Path
+        Path to the subject's -epo.fif file
+    behav_file : pathlib.Path
+        Path to the subject's events TSV file
+
+    Returns
+    -------
+    paths : dict
+        Paths of the written cache files (see cache_paths)
+    """
+    paths = cache_paths(epochs_file)
+    paths["data"].parent.mkdir(parents=True, exist_ok=True)
+
+    # Only numeric and boolean columns are needed for labels and groups
+    behav = context["behav"].select_dtypes(include=["number", "bool"])
+    columns = list(behav.columns)
+
+    key = {
+        "epochs": file_fingerprint(epochs_file),
+        "behav": file_fingerprint(behav_file),
+        "columns": columns,
+        "shape": list(context["X"].shape),
+        "dtype": context["X"].dtype.name,
+    }
+
+    tmp = {name: p.with_name(p.name + ".tmp") for name, p in paths.items()}
+
+    with open(tmp["data"], "wb") as f:
+        np.save(f, np.ascontiguousarray(context["X"]))
+    with open(tmp["labels"], "wb") as f:
+        np.savez(
+            f,
+            __trials__=context["trials"],
+            __times__=context["times"],
+            **{name: behav[name].to_numpy() for name in columns},
+        )
+    with open(tmp["key"], "w") as f:
+        json.dump(key, f, indent=2)
+
+    # Invalidate the old entry before replacing its files
+    paths["key"].unlink(missing_ok=True)
+    for name in ["data", "labels", "key"]:
+        os.replace(tmp[name], paths[name])
+
+    return paths
@@ -0,0 +1,223 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Group Statistics: Cluster-Based Sign-Flip Permutation Tests
+
+One-sample cluster permutation tests on subject-level results, either
+decoding curves (subjects x time) or time x time matrices such as
+temporal generalization or ttcorr results (subjects x time x time).
+
+Under the null hypothesis each subject's effect (e.g. accuracy minus
+chance) is symmetric around zero, so its sign can be flipped. The
+t-maps of a whole batch of permutations are obtained from one ±1
+(permutations x subjects) matrix product; the sum of squares does not
+change under sign flips and is computed once. Supra-threshold clusters
+of all permutations in the batch are labelled in a single call, with
+connectivity only inside each permutation's map, and cluster masses are
+summed with one bincount.
+
+Like rsa.py, the module can be imported directly from the tools
+directory by analysis scripts.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import numpy as np
+from scipy import ndimage
+from scipy.stats import t as t_dist
+
+try:
+    from .results_store import read_results
+except ImportError:
+    from results_store import read_results
+
+
+def _t_maps(flips, data, sum_sq):
+    """One-sample t-values of sign-flipped data, one row per flip."""
+    n = data.shape[0]
+    mean = (flips @ data) / n
+    var = (sum_sq - n * mean**2) / (n - 1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return mean / np.sqrt(var / n)
+
+
+def _cluster_masses(t_maps, shape, threshold, tail):
+    """
+    Label the clusters of a batch of t-maps and sum their t-values.
+
+    Returns the label array (batch, *shape), the mass of each label
+    (index 0 unused) and the map (batch row) each label belongs to.
+    """
+    n_maps = t_maps.shape[0]
+    t_maps = t_maps.reshape((n_maps,) + shape)
+
+    if tail == 1:
+        masks = [t_maps > threshold]
+    elif tail == -1:
+        masks = [t_maps < -threshold]
+    else:
+        masks = [t_maps > threshold, t_maps < -threshold]
+
+    # Face-connected neighbours within a map, none across maps
+    structure = np.zeros((3,) + (3,) * len(shape), dtype=bool)
+    structure[1] = ndimage.generate_binary_structure(len(shape), 1)
+
+    labels = np.zeros(t_maps.shape, dtype=np.int64)
+    n_labels = 0
+    for mask in masks:
+        lab, n = ndimage.label(mask, structure=structure)
+        labels[mask] = lab[mask] + n_labels
+        n_labels += n
+
+    flat = labels.reshape(n_maps, -1)
+    mass = np.bincount(
+        flat.ravel(), weights=t_maps.ravel(), minlength=n_labels + 1
+    )
+    owner = np.zeros(n_labels + 1, dtype=np.int64)
+    owner[flat.ravel()] = np.repeat(np.arange(n_maps), flat.shape[1])
+
+    return labels, mass, owner
+
+
+def cluster_permutation_test(
+    data,
+    chance=0.0,
+    n_permutations=10000,
+    threshold=None,
+    tail=1,
+    seed=0,
+    batch_size=None,
+    max_bytes=2**28,
+):
+    """
+    One-sample cluster-based sign-flip permutation test.
+
+    Parameters
+    ----------
+    data : np.ndarray
+        Subject results (n_subjects, n_times) or
+        (n_subjects, n_times, n_times); any trailing shape is accepted
+    chance : float or np.ndarray, optional
+        Value under the null hypothesis, subtracted from the data (e.g.
+        the chance level of a decoding analysis). Default is 0.
+    n_permutations : int, optional
+        Number of sign-flip permutations, including the observed data.
+        If 2**n_subjects is smaller, all sign flips are used. Default is
+        10000.
+    threshold : float, optional
+        Cluster-forming t threshold. If None, uses the t-value of
+        p < 0.05 (one-sided for tail=±1, two-sided for tail=0).
+    tail : int, optional
+        1 tests for effects above chance, -1 below, 0 both. Default is 1.
+    seed : int, optional
+        Random seed of the sign flips. Default is 0.
+    batch_size : int, optional
+        Permutations per batch. If None, chosen from ``max_bytes``.
+    max_bytes : int, optional
+        Memory limit of one batch of t-maps. Default is 256 MB.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with keys:
+        - 't_obs': observed t-map (n_times,) or (n_times, n_times)
+        - 'threshold': cluster-forming threshold
+        - 'clusters': boolean mask of each observed cluster
+        - 'cluster_mass': summed t-values of each observed cluster
+        - 'cluster_pvalues': corrected p-value of each cluster
+        - 'p_map': p-value of the cluster each point belongs to (1
+          outside clusters)
+        - 'null_max': largest absolute cluster mass of each permutation
+          (n_permutations,), the observed data first
+    """
+    data = np.asarray(data, dtype=float) - chance
+    n_subjects = data.shape[0]
+    shape = data.shape[1:]
+    flat = data.reshape(n_subjects, -1)
+    sum_sq = (flat**2).sum(axis=0)
+
+    if threshold is None:
+        p = 0.05 if tail != 0 else 0.025
+        threshold = t_dist.ppf(1 - p, n_subjects - 1)
+
+    # Sign flips: the identity first, then random (or all) flips
+    if 2**n_subjects <= n_permutations:
+        codes = np.arange(2**n_subjects)
+        bits = (codes[:, None] >> np.arange(n_subjects)) & 1
+        flips = 1.0 - 2.0 * bits
+    else:
+        rng = np.random.default_rng(seed)
+        flips = rng.choice([-1.0, 1.0], size=(n_permutations, n_subjects))
+        flips[0] = 1.0
+
+    if batch_size is None:
+        # t-maps, masks and labels of one batch
+        batch_size = max(1, int(max_bytes // (flat.shape[1] * 24)))
+
+    null_max = np.zeros(len(flips))
+    for start in range(0, len(flips), batch_size):
+        stop = min(start + batch_size, len(flips))
+        t_maps = _t_maps(flips[start:stop], flat, sum_sq)
+        labels, mass, owner = _cluster_masses(t_maps, shape, threshold, tail)
+        np.maximum.at(null_max[start:stop], owner[1:], np.abs(mass[1:]))
+
+        if start == 0:
+            t_obs = t_maps[0].reshape(shape)
+            obs_labels = labels[0]
+            obs_ids = np.unique(obs_labels[obs_labels > 0])
+            obs_mass = mass[obs_ids]
+
+    # The observed data are part of the null distribution
+    cluster_pvalues = np.array([np.mean(null_max >= abs(m)) for m in obs_mass])
+    clusters = [obs_labels == i for i in obs_ids]
+    p_map = np.ones(shape)
+    for mask, p in zip(clusters, cluster_pvalues):
+        p_map[mask] = p
+
+    return {
+        "t_obs": t_obs,
+        "threshold": threshold,
+        "clusters": clusters,
+        "cluster_mass": obs_mass,
+        "cluster_pvalues": cluster_pvalues,
+        "p_map": p_map,
+        "null_max": null_max,
+    }
+
+
+def cluster_test_results(
+    store_path, group, analysis, subjects=None, chance=None, **kwargs
+):
+    """
+    Run a cluster permutation test on an analysis of the results store.
+
+    Parameters
+    ----------
+    store_path : str or pathlib.Path
+        Path to the HDF5 results store
+    group : str
+        Participant group
+    analysis : str
+        Analysis name, e.g. 'category_one_rotation_out'
+    subjects : list of int, optional
+        Subject IDs to include. Default is None (all).
+    chance : float, optional
+        Null value. If None, uses the stored chance level (or 0).
+    **kwargs
+        Passed to cluster_permutation_test()
+
+    Returns
+    -------
+    results : dict
+        Output of cluster_permutation_test(), with 'times' and
+        'subjects' added
+    """
+    stored = read_results(store_path, group, analysis, subjects)
+    if chance is None:
+        chance = stored["attrs"].get("chance_level", 0.0)
+
+    results = cluster_permutation_test(stored["data"], chance, **kwargs)
+    results["times"] = stored["times"]
+    results["subjects"] = stored["subjects"]
+    return results
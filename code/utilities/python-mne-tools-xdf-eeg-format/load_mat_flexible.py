@@ -14,11 +14,15 @@ Dependencies:
     - h5py: For loading HDF5-based MATLAB files (v7.3+)
 """
 
+import time
+from pathlib import Path
+from collections.abc import Mapping
+import numpy as np
 import scipy.io
 import h5py
 
 
-def load_mat_flexible(file_path):
+def load_mat_flexible(file_path, lazy=False, variable_names=None):
     """
     Loads a MATLAB .mat file, automatically handling different format versions.
 
@@ -30,10 +34,16 @@ def load_mat_flexible(file_path):
     ----------
     file_path : str or pathlib.Path
         Path to the .mat file to be loaded.
+    lazy : bool, optional
+        If True, return a LazyMatFile whose variables are read from disk
+        only when indexed (v7.3+ files), in MATLAB axis order. Use it as
+        a context manager to close the file. Default is False.
+    variable_names : list of str, optional
+        Only load these variables. Default is None (all variables).
 
     Returns
     -------
-    dict
+    dict or LazyMatFile
         Dictionary containing the loaded MATLAB variables.
         Keys are variable names from the .mat file.
         Values are the corresponding data (arrays, structs, etc.).
@@ -54,32 +64,53 @@ def load_mat_flexible(file_path):
     >>> data = load_mat_flexible('modern_data.mat')
     >>> my_array = data['my_variable']
 
+    >>> # Read only a few time points of a large v7.3 RDM
+    >>> with load_mat_flexible('sub-01_RDM.mat', lazy=True) as mat:
+    ...     rdm = mat['RDM'][:, :, 10:20]
+
     Notes
     -----
     - MATLAB v7.3+ files are actually HDF5 files in disguise
-    - The function first attempts scipy.io for better compatibility
-      with older files, then falls back to h5py for newer formats
+    - The format is read from the file header (see get_mat_version) and
+      the matching reader is used directly; files with an unrecognised
+      header are tried with scipy.io first, then with h5py
     - Nested structures in HDF5 files are recursively loaded
+    - In eager mode, arrays from HDF5 files keep h5py's reversed axis
+      order (e.g. time x cond x cond for a cond x cond x time RDM);
+      lazy mode returns them in MATLAB order
     """
 
+    # Detect the format from the header instead of trial parsing
+    mat_format = get_mat_version(file_path)
+
     # ============================================
     # ATTEMPT 1: Try loading as legacy MAT file
     # ============================================
-    try:
-        # scipy.io.loadmat handles most MATLAB files created before v7.3
-        # This is faster and more straightforward for compatible files
-        data = scipy.io.loadmat(file_path)
-        return data
+    if mat_format != "hdf5":
+        try:
+            # scipy.io.loadmat handles most MATLAB files created before v7.3
+            # This is faster and more straightforward for compatible files
+            data = scipy.io.loadmat(file_path, variable_names=variable_names)
+            return LazyMatFile(data) if lazy else data
 
-    except NotImplementedError:
-        # NotImplementedError is raised by scipy when it encounters
-        # a v7.3 MAT file (which is HDF5-based)
-        # We'll handle this format in the next section
-        pass
+        except NotImplementedError:
+            # NotImplementedError is raised by scipy when it encounters
+            # a v7.3 MAT file (which is HDF5-based)
+            # We'll handle this format in the next section
+            pass
 
     # ============================================
     # ATTEMPT 2: Try loading as HDF5 (v7.3+)
     # ============================================
+    if lazy:
+        try:
+            return LazyMatFile(h5py.File(file_path, "r"))
+        except Exception as e:
+            raise TypeError(
+                f"Could not load {file_path}: {e}\n"
+                f"File may be corrupted or in an unsupported format."
+            )
+
     try:
         # Open the file using h5py for HDF5-based MAT files
         with h5py.File(file_path, "r") as f:
@@ -120,7 +151,9 @@ def load_mat_flexible(file_path):
             # Load all top-level keys from the HDF5 file
             for key in f.keys():
                 # Skip MATLAB metadata keys (start with '#')
-                if not key.startswith("#"):
+                if key.startswith("#"):
+                    continue
+                if variable_names is None or key in variable_names:
                     data[key] = recursively_load(f[key])
 
             return data
@@ -133,14 +166,190 @@ def load_mat_flexible(file_path):
         )
 
 
+# ============================================
+# Lazy access to HDF5-based (v7.3+) files
+# ============================================
+
+
+class LazyMatDataset:
+    """
+    Deferred handle to one MATLAB variable stored in an HDF5 dataset.
+
+    MATLAB writes arrays in column-major order, so h5py reports their
+    axes reversed (a cond x cond x time RDM appears as time x cond x
+    cond). The handle presents the MATLAB axis order: ``shape`` and
+    indexing follow MATLAB, and indexing reads only the requested
+    hyperslab from disk.
+
+    Parameters
+    ----------
+    dataset : h5py.Dataset
+        The underlying dataset
+    """
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+
+    @property
+    def shape(self):
+        return self.dataset.shape[::-1]
+
+    @property
+    def ndim(self):
+        return self.dataset.ndim
+
+    @property
+    def dtype(self):
+        return self.dataset.dtype
+
+    def __len__(self):
+        return self.shape[0]
+
+    def __repr__(self):
+        return f"<LazyMatDataset shape={self.shape} dtype={self.dtype}>"
+
+    def __array__(self, dtype=None, copy=None):
+        data = self[()]
+        return data if dtype is None else data.astype(dtype)
+
+    def __getitem__(self, key):
+        if not isinstance(key, tuple):
+            key = (key,)
+        if len(key) == 0 or (len(key) == 1 and key[0] is Ellipsis):
+            return np.transpose(self.dataset[()])
+
+        # Boolean masks select along as many axes as they have dimensions
+        expanded = []
+        for k in key:
+            if isinstance(k, (list, np.ndarray)):
+                k = np.asarray(k)
+                if k.dtype == bool:
+                    expanded.extend(np.nonzero(k))
+                    continue
+            expanded.append(k)
+        key = tuple(expanded)
+
+        # Expand the Ellipsis so there is one entry per axis
+        if any(k is Ellipsis for k in key):
+            i = next(i for i, k in enumerate(key) if k is Ellipsis)
+            fill = (slice(None),) * (self.ndim - len(key) + 1)
+            key = key[:i] + fill + key[i + 1 :]
+        if len(key) > self.ndim:
+            raise IndexError(
+                f"too many indices: array is {self.ndim}-dimensional, "
+                f"but {len(key)} were indexed"
+            )
+        key = key + (slice(None),) * (self.ndim - len(key))
+
+        # h5py only reads increasing slices efficiently, so every index
+        # is read as its bounding slice and the key is then applied to
+        # the block in memory, with numpy's own indexing rules
+        read = []
+        local = []
+        for k, size in zip(key, self.shape):
+            if isinstance(k, slice):
+                start, stop, step = k.indices(size)
+                if step > 0:
+                    read.append(slice(start, stop, step))
+                    local.append(slice(None))
+                    continue
+                k = np.arange(start, stop, step)
+                if k.size == 0:
+                    read.append(slice(0, 0))
+                else:
+                    read.append(slice(int(k[-1]), int(k[0]) + 1))
+                local.append(slice(None, None, step))
+                continue
+
+            index = np.asarray(k)
+            if index.dtype.kind not in "iu":
+                raise IndexError(f"Unsupported index for LazyMatDataset: {k}")
+            if np.any((index < -size) | (index >= size)):
+                raise IndexError(
+                    f"index {k} is out of bounds for axis with size {size}"
+                )
+            index = index % size
+            lo = int(index.min()) if index.size else 0
+            hi = int(index.max()) + 1 if index.size else 0
+            read.append(slice(lo, hi))
+            local.append(index - lo)
+
+        # Read in HDF5 (reversed) order and index in MATLAB order
+        data = np.transpose(self.dataset[tuple(read[::-1])])
+        return data[tuple(local)]
+
+
+class LazyMatFile(Mapping):
+    """
+    Mapping of MATLAB variable names to deferred dataset handles.
+
+    Use as a context manager so that the file is closed afterwards::
+
+        with load_mat_flexible("sub-01_RDM.mat", lazy=True) as mat:
+            first_timepoints = mat["RDM"][:, :, :10]
+
+    Structs (HDF5 groups) are returned as nested LazyMatFile mappings.
+    For legacy (< v7.3) files the variables are already in memory and
+    are returned as numpy arrays.
+
+    Parameters
+    ----------
+    node : h5py.File, h5py.Group or dict
+        Opened file, group or dictionary of loaded variables
+    owner : bool, optional
+        Whether closing this mapping closes the file. Default is True.
+    """
+
+    def __init__(self, node, owner=True):
+        self.node = node
+        self.owner = owner
+
+    def _keys(self):
+        return [k for k in self.node.keys() if not k.startswith(("#", "__"))]
+
+    def __getitem__(self, key):
+        if key not in self._keys():
+            raise KeyError(key)
+        item = self.node[key]
+        if isinstance(item, h5py.Dataset):
+            return LazyMatDataset(item)
+        if isinstance(item, h5py.Group):
+            return LazyMatFile(item, owner=False)
+        return item
+
+    def __iter__(self):
+        return iter(self._keys())
+
+    def __len__(self):
+        return len(self._keys())
+
+    def close(self):
+        if self.owner and isinstance(self.node, h5py.File):
+            self.node.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
 # ============================================
 # Optional: Convenience functions
 # ============================================
 
 
+# Signature at the start of an HDF5 superblock
+HDF5_SIGNATURE = b"\x89HDF\r\n\x1a\n"
+
+
 def get_mat_version(file_path):
     """
-    Attempts to determine the MATLAB file version.
+    Determines the MATLAB file version from the file header.
+
+    Only the 128-byte MAT header (and, for v7.3, the HDF5 signature that
+    follows MATLAB's 512-byte user block) is read; the file itself is
+    never parsed.
 
     Parameters
     ----------
@@ -153,17 +362,117 @@ def get_mat_version(file_path):
         'legacy' for <v7.3 files, 'hdf5' for v7.3+ files,
         'unknown' if version cannot be determined.
     """
+    try:
+        with open(file_path, "rb") as f:
+            header = f.read(128)
+
+            # Plain HDF5 file without a MAT header
+            if header[:8] == HDF5_SIGNATURE:
+                return "hdf5"
+
+            if not header.startswith(b"MATLAB"):
+                return "legacy" if _is_mat4_header(header) else "unknown"
+            if len(header) < 128:
+                return "unknown"
+
+            # Version field (0x0100 = v5-v7.2, 0x0200 = v7.3), stored in
+            # the byte order given by the endian indicator
+            version = header[124:126]
+            major = version[1] if header[126:128] == b"IM" else version[0]
+
+            if major == 1:
+                return "legacy"
+            if major == 2:
+                f.seek(512)
+                if f.read(8) == HDF5_SIGNATURE:
+                    return "hdf5"
+            return "unknown"
+
+    except OSError:
+        return "unknown"
+
+
+def _is_mat4_header(header):
+    """Check for a Level 4 MAT file (no text header, numeric type flag)."""
+    if len(header) < 4:
+        return False
+    for byteorder in ["little", "big"]:
+        mopt = int.from_bytes(header[:4], byteorder)
+        # MOPT = M*1000 + O*100 + P*10 + T with O always 0
+        if mopt < 5000 and (mopt // 100) % 10 == 0 and (mopt // 10) % 10 < 6:
+            if mopt % 10 < 3:
+                return True
+    return False
+
+
+def _get_mat_version_by_parsing(file_path):
+    """Parse-based version detection, used as benchmark reference."""
     try:
         scipy.io.loadmat(file_path)
         return "legacy"
-    except NotImplementedError:
+    except (NotImplementedError, ValueError):
         try:
             with h5py.File(file_path, "r"):
                 return "hdf5"
-        except:
+        except Exception:
             return "unknown"
 
 
+def benchmark_format_detection(
+    directory, pattern="*.mat", variable_names=None
+):
+    """
+    Compare header-based and parse-based loading on a directory of files.
+
+    Parameters
+    ----------
+    directory : str or pathlib.Path
+        Directory with (mixed-format) .mat files, e.g. the derivatives
+    pattern : str, optional
+        Glob pattern of the files to include. Default is '*.mat'.
+    variable_names : list of str, optional
+        Variables to load selectively (e.g. ['RDM']). Default is None.
+
+    Returns
+    -------
+    timings : dict
+        Number of files per format and the total run time (s) of
+        parse-based and header-based version detection, and of full and
+        selective loading
+    """
+    files = sorted(Path(directory).glob(pattern))
+
+    start = time.perf_counter()
+    parsed = [_get_mat_version_by_parsing(f) for f in files]
+    t_parse = time.perf_counter() - start
+
+    start = time.perf_counter()
+    sniffed = [get_mat_version(f) for f in files]
+    t_header = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for f in files:
+        load_mat_flexible(f)
+    t_load = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for f in files:
+        load_mat_flexible(f, variable_names=variable_names)
+    t_selective = time.perf_counter() - start
+
+    return {
+        "n_files": len(files),
+        "n_legacy": sniffed.count("legacy"),
+        "n_hdf5": sniffed.count("hdf5"),
+        "n_unknown": sniffed.count("unknown"),
+        "consistent": parsed == sniffed,
+        "detect_parse_s": t_parse,
+        "detect_header_s": t_header,
+        "load_all_s": t_load,
+        "load_selective_s": t_selective,
+    }
+
+
 # ============================================
 # Module testing (only runs when executed directly)
 # ============================================
@@ -175,6 +484,13 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         # If a file path is provided as command line argument
         file_path = sys.argv[1]
+
+        # A directory runs the format-detection benchmark instead
+        if Path(file_path).is_dir():
+            for name, value in benchmark_format_detection(file_path).items():
+                print(f"{name}: {value}")
+            sys.exit()
+
         print(f"Loading: {file_path}")
 
         try:
@@ -189,6 +505,7 @@ if __name__ == "__main__":
             print(f"Error: {e}")
     else:
         print("Usage: python load_mat_flexible.py <path_to_mat_file>")
+        print("       python load_mat_flexible.py <directory>  (benchmark)")
         print("\nThis module is typically imported and used as:")
         print("  from load_mat_flexible import load_mat_flexible")
         print("  data = load_mat_flexible('your_file.mat')")
@@ -23,17 +23,29 @@ os.chdir(PROJECT_ROOT)
 
 print(f"Added to Python path: {PROJECT_ROOT}")
 
+import math
+import time
 import logging
+import traceback
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
 import pandas as pd
 import mne
+from threadpoolctl import threadpool_limits
 
 # Import your configuration and pipeline functions
 from shared.tools import (
     preprocessing_config,
     viewpoint_decoding_config,
 )
-from shared.tools import run_preprocess, run_decoding
+from shared.tools import (
+    run_preprocess,
+    run_decoding,
+    run_pairwise,
+    run_permutation,
+    save_stimulus_splits,
+)
 
 
 # =======================================================================
@@ -50,6 +62,7 @@ class PipelineConfig:
         # Pipeline control - Set to True to run, False to skip
         self.tools_to_run = {
             "preprocessing": False,  # Preprocessing with MNE
+            "stimulus_splits": False,  # Entropy/luminance stimulus splits
             "decoding": True,  # Decoding analysis
             "permutation": False,  # Permutation testing
             "rsa": False,  # RDM generation
@@ -72,11 +85,11 @@ class PipelineConfig:
 
         # RSA configuration
         self.rdm_config = {
-            "target_class": ["category", "identity"],
+            "target_class": ["identity"],  # 'identity' or 'stimulus'
             "crossval_method": self._get_active_versions(),
             "pw_permutation": False,
             "save_rdm": True,
-            "rdm_size": 14,
+            "pw_mode": "all",  # Key of cfg['pw_mode'][target_class]
         }
 
         # Permutation configuration
@@ -86,6 +99,14 @@ class PipelineConfig:
             "plot_results": True,
         }
 
+        # Subject scheduling - subjects run in parallel worker processes,
+        # each limited to its own BLAS/joblib thread budget
+        self.parallel_config = {
+            "n_workers": 1,  # Subjects processed at once (1 = sequential)
+            # e.g. 4; None = cores / n_workers (no limit when sequential)
+            "threads_per_worker": None,
+        }
+
     def _get_active_versions(self):
         """Get list of active cross-validation versions."""
         return [k for k, v in self.versions_to_run.items() if v]
@@ -94,6 +115,15 @@ class PipelineConfig:
         """Get list of active participant groups."""
         return [k for k, v in self.groups_to_run.items() if v]
 
+    def get_threads_per_worker(self):
+        """Get the thread budget of each subject worker (None = no limit)."""
+        threads = self.parallel_config["threads_per_worker"]
+        n_workers = self.parallel_config["n_workers"]
+        if threads is None and n_workers > 1:
+            # Share the cores between workers instead of oversubscribing
+            threads = max(1, (os.cpu_count() or 1) // n_workers)
+        return threads
+
     def get_active_tools(self):
         """Get list of tools to run."""
         return [k for k, v in self.tools_to_run.items() if v]
@@ -212,9 +242,185 @@ def display_configuration(config, logger):
         logger.info(f'Decoding types: {", ".join(config.decodings_to_run)}')
         logger.info(f'CV methods: {", ".join(config._get_active_versions())}')
 
+    # Scheduling
+    logger.info(
+        f'Workers: {config.parallel_config["n_workers"]}, '
+        f"threads per worker: {config.get_threads_per_worker()}"
+    )
+
     logger.info("=" * 70 + "\n")
 
 
+# =======================================================================
+# SUBJECT SCHEDULER
+# =======================================================================
+_THREAD_ENV_VARS = (
+    "OMP_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "VECLIB_MAXIMUM_THREADS",
+    "NUMEXPR_NUM_THREADS",
+)
+
+
+def _init_worker(threads_per_worker):
+    """Apply the thread budget to libraries initialised in a worker."""
+    if threads_per_worker is not None:
+        for var in _THREAD_ENV_VARS:
+            os.environ[var] = str(threads_per_worker)
+
+
+def _run_subject(task, project_name, group_name, subjectnr, kwargs, threads):
+    """Run one subject, isolating failures and timing the run."""
+    record = {
+        "group": group_name,
+        "subject": subjectnr,
+        "status": "success",
+        "wall_time": 0.0,
+        "result": None,
+        "error": None,
+    }
+
+    start = time.perf_counter()
+    try:
+        # Cap BLAS/OpenMP pools already loaded in this process
+        with threadpool_limits(limits=threads):
+            record["result"] = task(
+                project_name, subjectnr, participant_group=group_name, **kwargs
+            )
+    except Exception:
+        record["status"] = "failed"
+        record["error"] = traceback.format_exc()
+    record["wall_time"] = time.perf_counter() - start
+
+    return record
+
+
+def run_subjects(task, jobs, config, logger, tag):
+    """
+    Run a per-subject task across a pool of worker processes.
+
+    Parameters
+    ----------
+    task : callable
+        Pipeline function called as
+        ``task(project_name, subjectnr, participant_group=..., **kwargs)``
+    jobs : list of tuple
+        (group_name, subjectnr, kwargs) for every subject to run
+    config : PipelineConfig
+        Pipeline configuration (uses ``parallel_config``)
+    logger : logging.Logger
+        Logger instance
+    tag : str
+        Log prefix, e.g. 'PREPROC'
+
+    Returns
+    -------
+    records : list of dict
+        One record per subject with keys 'group', 'subject', 'status',
+        'wall_time', 'result' and 'error', in the order of ``jobs``
+    """
+    n_workers = max(1, min(config.parallel_config["n_workers"], len(jobs)))
+    threads = config.get_threads_per_worker()
+    logger.info(
+        f"[{tag}] Scheduling {len(jobs)} subjects on {n_workers} worker(s), "
+        f"threads per worker: {threads if threads else 'unlimited'}"
+    )
+
+    def log_record(record):
+        if record["status"] == "success":
+            logger.info(
+                f"[{tag}] ✓ Subject {record['subject']:02d} "
+                f"({record['group']}) completed in {record['wall_time']:.1f}s"
+            )
+        else:
+            logger.error(
+                f"[{tag}] ✗ Subject {record['subject']:02d} "
+                f"({record['group']}) failed:\n{record['error']}"
+            )
+
+    records = [None] * len(jobs)
+
+    if n_workers == 1:
+        # Sequential, in-process (easier to debug)
+        for i, (group_name, subjectnr, kwargs) in enumerate(jobs):
+            logger.info(f"[{tag}] Processing subject {subjectnr:02d}...")
+            records[i] = _run_subject(
+                task,
+                config.project_name,
+                group_name,
+                subjectnr,
+                kwargs,
+                threads,
+            )
+            log_record(records[i])
+        return records
+
+    # 'spawn' avoids forking a process that already holds BLAS/joblib threads
+    with ProcessPoolExecutor(
+        max_workers=n_workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(threads,),
+    ) as executor:
+        futures = {
+            executor.submit(
+                _run_subject,
+                task,
+                config.project_name,
+                group_name,
+                subjectnr,
+                kwargs,
+                threads,
+            ): i
+            for i, (group_name, subjectnr, kwargs) in enumerate(jobs)
+        }
+
+        for future in as_completed(futures):
+            i = futures[future]
+            group_name, subjectnr, _ = jobs[i]
+            try:
+                records[i] = future.result()
+            except Exception:
+                # The worker process itself died (e.g. out of memory)
+                records[i] = {
+                    "group": group_name,
+                    "subject": subjectnr,
+                    "status": "failed",
+                    "wall_time": float("nan"),
+                    "result": None,
+                    "error": traceback.format_exc(),
+                }
+            log_record(records[i])
+
+    return records
+
+
+def log_subject_summary(records, logger, tag):
+    """Log per-subject status and wall time, plus overall counts."""
+    logger.info(f"\n[{tag}] Subject summary")
+    logger.info(
+        f"[{tag}] {'group':<10}{'subject':>8}{'status':>10}{'time (s)':>10}"
+    )
+    for record in records:
+        logger.info(
+            f"[{tag}] {record['group']:<10}{record['subject']:>8d}"
+            f"{record['status']:>10}{record['wall_time']:>10.1f}"
+        )
+
+    success_count = sum(r["status"] == "success" for r in records)
+    fail_count = len(records) - success_count
+    total_time = sum(
+        r["wall_time"] for r in records if not math.isnan(r["wall_time"])
+    )
+    logger.info(
+        f"[{tag}] {success_count} success, {fail_count} failed, "
+        f"{total_time:.1f}s subject time"
+    )
+
+    return success_count, fail_count
+
+
 # =======================================================================
 # PIPELINE EXECUTION FUNCTIONS
 # =======================================================================
@@ -230,43 +436,47 @@ def run_preprocessing_pipeline(config, logger):
     # Filter to active groups only
     active_groups = config.get_active_groups()
 
-    success_count = 0
-    fail_count = 0
-
+    jobs = []
     for group_name in active_groups:
-        logger.info(f"\n[PREPROC] Processing group: {group_name}")
-
         # Get subject list for this group
         subject_list = get_subject_list(cfg, config, group_name)
-        logger.info(f"[PREPROC] Subjects to process: {subject_list}")
-
-        for subjectnr in subject_list:
-            logger.info(f"[PREPROC] Processing subject {subjectnr:02d}...")
+        logger.info(
+            f"[PREPROC] Subjects to process ({group_name}): {subject_list}"
+        )
+        jobs += [(group_name, s, {"overwrite": 1}) for s in subject_list]
 
-            try:
-                # Call preprocessing function
-                run_preprocess(
-                    config.project_name,
-                    subjectnr,
-                    participant_group=group_name,
-                    overwrite=1,
-                )
-
-                logger.info(f"[PREPROC] ✓ Subject {subjectnr:02d} completed")
-                success_count += 1
-
-            except Exception as e:
-                logger.error(
-                    f"[PREPROC] ✗ Subject {subjectnr:02d} failed: {str(e)}"
-                )
-                fail_count += 1
-                continue
+    start = time.perf_counter()
+    records = run_subjects(run_preprocess, jobs, config, logger, "PREPROC")
+    success_count, fail_count = log_subject_summary(records, logger, "PREPROC")
 
     logger.info(
-        f"\n[PREPROC] Preprocessing completed: {success_count} success, {fail_count} failed"
+        f"\n[PREPROC] Preprocessing completed: {success_count} success, "
+        f"{fail_count} failed ({time.perf_counter() - start:.1f}s wall time)"
     )
 
 
+def run_stimulus_splits_pipeline(config, logger):
+    """Compute the entropy/luminance splits read by the decoding config."""
+    logger.info("\n" + "=" * 70)
+    logger.info("STARTING STIMULUS SPLITS")
+    logger.info("=" * 70)
+
+    cfg = viewpoint_decoding_config(config.project_name)
+    splits = save_stimulus_splits(
+        cfg["stim_dir"],
+        cfg["stimulus_splits_file"],
+        n_stimuli=cfg["total_nstimuli"],
+    )
+
+    for feature, split in splits.items():
+        logger.info(
+            f"[SPLITS] {feature}: {len(split['low'])} low, "
+            f"{len(split['high'])} high"
+        )
+    logger.info(f'[SPLITS] Saved to: {cfg["stimulus_splits_file"]}')
+    return splits
+
+
 def run_decoding_pipeline(config, logger):
     """Execute decoding pipeline for all subjects."""
     logger.info("\n" + "=" * 70)
@@ -279,44 +489,33 @@ def run_decoding_pipeline(config, logger):
     active_groups = config.get_active_groups()
     active_versions = config._get_active_versions()
 
-    results = {}
-    success_count = 0
-    fail_count = 0
+    # Each worker gets its own joblib budget instead of all cores
+    decode_kwargs = {
+        "decode_types": config.decodings_to_run,
+        "cv_schemes": active_versions,
+        "overwrite": True,
+        "n_jobs": config.get_threads_per_worker(),
+    }
 
+    jobs = []
     for group_name in active_groups:
-        logger.info(f"\n[DECODE] Processing group: {group_name}")
-
         subject_list = get_subject_list(cfg, config, group_name)
+        logger.info(
+            f"[DECODE] Subjects to process ({group_name}): {subject_list}"
+        )
+        jobs += [(group_name, s, decode_kwargs) for s in subject_list]
 
-        for subjectnr in subject_list:
-            logger.info(
-                f"[DECODE] Processing subject {subjectnr:02d}/{len(subject_list)}..."
-            )
+    start = time.perf_counter()
+    records = run_subjects(run_decoding, jobs, config, logger, "DECODE")
+    success_count, fail_count = log_subject_summary(records, logger, "DECODE")
 
-            try:
-                # Run decoding
-                results[subjectnr] = run_decoding(
-                    config.project_name,
-                    subjectnr,
-                    participant_group=group_name,
-                    decode_types=config.decodings_to_run,
-                    cv_schemes=active_versions,
-                    overwrite=True,
-                )
-
-                logger.info(f"[DECODE] ✓ Subject {subjectnr:02d} completed")
-                success_count += 1
-
-            except Exception as e:
-                logger.error(
-                    f"[DECODE] ✗ Subject {subjectnr:02d} failed: {str(e)}"
-                )
-                logger.exception(e)  # Print full traceback
-                fail_count += 1
-                continue
+    results = {
+        r["subject"]: r["result"] for r in records if r["status"] == "success"
+    }
 
     logger.info(
-        f"\n[DECODE] Decoding completed: {success_count} success, {fail_count} failed"
+        f"\n[DECODE] Decoding completed: {success_count} success, "
+        f"{fail_count} failed ({time.perf_counter() - start:.1f}s wall time)"
     )
     return results
 
@@ -330,7 +529,37 @@ def run_permutation_pipeline(config, logger):
     logger.info(
         f'[PERM] Number of permutations: {config.permutation_config["k"]}'
     )
-    logger.info("[PERM] Permutation testing not yet implemented")
+
+    cfg = viewpoint_decoding_config(config.project_name)
+    active_groups = config.get_active_groups()
+
+    perm_kwargs = {
+        "decode_types": config.decodings_to_run,
+        "cv_schemes": config._get_active_versions(),
+        "n_permutations": config.permutation_config["k"],
+        "save_null": config.permutation_config["save_null"],
+        "plot_results": config.permutation_config["plot_results"],
+    }
+
+    jobs = []
+    for group_name in active_groups:
+        subject_list = get_subject_list(cfg, config, group_name)
+        logger.info(
+            f"[PERM] Subjects to process ({group_name}): {subject_list}"
+        )
+        jobs += [(group_name, s, perm_kwargs) for s in subject_list]
+
+    start = time.perf_counter()
+    records = run_subjects(run_permutation, jobs, config, logger, "PERM")
+    success_count, fail_count = log_subject_summary(records, logger, "PERM")
+
+    logger.info(
+        f"\n[PERM] Permutation testing completed: {success_count} success, "
+        f"{fail_count} failed ({time.perf_counter() - start:.1f}s wall time)"
+    )
+    return {
+        r["subject"]: r["result"] for r in records if r["status"] == "success"
+    }
 
 
 def run_rsa_pipeline(config, logger):
@@ -339,42 +568,49 @@ def run_rsa_pipeline(config, logger):
     logger.info("STARTING RSA PIPELINE")
     logger.info("=" * 70)
 
-    cfg = preprocessing_config(config.project_name)
+    cfg = viewpoint_decoding_config(config.project_name)
     active_groups = config.get_active_groups()
-
-    pw_results = {}
-    rdm_results = {}
-    null_distributions = {}
-
-    success_count = 0
-    fail_count = 0
-
+    rdm_config = config.rdm_config
+
+    if rdm_config["pw_permutation"]:
+        logger.info("[RSA] Pairwise permutation testing not yet implemented")
+
+    # Pairs are decoded in worker processes within each subject
+    rsa_kwargs = {
+        "target_classes": rdm_config["target_class"],
+        "cv_schemes": rdm_config["crossval_method"],
+        "pw_mode": rdm_config["pw_mode"],
+        "save_rdm": rdm_config["save_rdm"],
+        "overwrite": True,
+        "n_jobs": config.get_threads_per_worker(),
+    }
+
+    jobs = []
     for group_name in active_groups:
-        logger.info(f"\n[RSA] Processing group: {group_name}")
-
         subject_list = get_subject_list(cfg, config, group_name)
+        logger.info(
+            f"[RSA] Subjects to process ({group_name}): {subject_list}"
+        )
+        jobs += [(group_name, s, rsa_kwargs) for s in subject_list]
 
-        for subjectnr in subject_list:
-            logger.info(
-                f"[RSA] Processing subject {subjectnr:02d}/{len(subject_list)}..."
-            )
-
-            try:
-                # Placeholder
-                logger.info("[RSA] RDM computation not yet implemented")
-
-                logger.info(f"[RSA] ✓ Subject {subjectnr:02d} completed")
-                success_count += 1
+    start = time.perf_counter()
+    records = run_subjects(run_pairwise, jobs, config, logger, "RSA")
+    success_count, fail_count = log_subject_summary(records, logger, "RSA")
 
-            except Exception as e:
-                logger.error(
-                    f"[RSA] ✗ Subject {subjectnr:02d} failed: {str(e)}"
-                )
-                fail_count += 1
-                continue
+    pw_results = {}
+    rdm_results = {}
+    null_distributions = {}
+    for record in records:
+        if record["status"] != "success":
+            continue
+        for analysis_name, res in record["result"].items():
+            key = (record["group"], record["subject"], analysis_name)
+            pw_results[key] = res["pw_mean"]
+            rdm_results[key] = res["rdm"]
 
     logger.info(
-        f"\n[RSA] RSA completed: {success_count} success, {fail_count} failed"
+        f"\n[RSA] RSA completed: {success_count} success, {fail_count} "
+        f"failed ({time.perf_counter() - start:.1f}s wall time)"
     )
 
     return pw_results, rdm_results, null_distributions
@@ -401,6 +637,10 @@ def main():
         if config.tools_to_run["preprocessing"]:
             run_preprocessing_pipeline(config, logger)
 
+        # Stimulus splits, before any decoding reads them
+        if config.tools_to_run["stimulus_splits"]:
+            run_stimulus_splits_pipeline(config, logger)
+
         # II. Decoding
         if config.tools_to_run["decoding"]:
             results = run_decoding_pipeline(config, logger)
@@ -0,0 +1,553 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Pairwise Decoding Engine for RDMs
+
+Python port of func/run_pairwise.m. Every pair of conditions (e.g. the
+91 pairs of 14 object identities, or the 6216 pairs of 112 stimuli) is
+decoded at every time point with leave-one-group-out cross-validation,
+and the accuracies form a condition x condition x time RDM.
+
+Instead of refitting a two-class LDA from the raw trials of each pair,
+the per-class sufficient statistics (trial counts, sums and scatter
+matrices, see batch_lda.group_statistics) are computed once per fold.
+Each pair's classifier is then built from the two cached class means
+and covariances, so the cost of a pair no longer depends on the number
+of trials. The pairs are dispatched across one process pool for all
+folds; the fold statistics are passed to the workers through shared
+memory.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import os
+import warnings
+import multiprocessing
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from scipy.io import savemat
+
+from .preprocessing_config import preprocessing_config
+from .viewpoint_decoding_config import viewpoint_decoding_config
+from .batch_lda import (
+    _time_major,
+    _solve_lda,
+    group_statistics,
+    predict_batch_lda,
+    score_predictions,
+)
+from .decoding import (
+    _cv_groups,
+    subject_data_files,
+    load_decoding_context,
+    plot_decoding_results,
+)
+from .results_store import append_result
+
+# Trial data and shared fold statistics, set in each worker by
+# _init_pair_worker
+_FOLD = {}
+
+
+def pairwise_labels(behav_data, target_class):
+    """
+    Condition of each trial for pairwise decoding.
+
+    Parameters
+    ----------
+    behav_data : pd.DataFrame
+        Behavioral data, one row per trial
+    target_class : str
+        'identity' (14 objects, numbered in stimulus order) or
+        'stimulus' (112 stimuli)
+
+    Returns
+    -------
+    labels : np.ndarray
+        Condition numbers (1-based) of each trial
+    """
+    stimnum = behav_data["stimnumber"].to_numpy()
+
+    if target_class == "identity":
+        return np.ceil(stimnum / 8).astype(int)
+    elif target_class == "stimulus":
+        return stimnum.astype(int)
+
+    raise ValueError(f"Unknown target_class for pairwise: {target_class}")
+
+
+def pairwise_conditions(cfg_decode, target_class, pw_mode):
+    """
+    Conditions of a pw_mode for one target class.
+
+    Parameters
+    ----------
+    cfg_decode : dict
+        Decoding configuration (uses 'pw_mode')
+    target_class : str
+        'identity' or 'stimulus'
+    pw_mode : str
+        Key of cfg['pw_mode'][target_class], e.g. 'all'
+
+    Returns
+    -------
+    conditions : list
+        Condition numbers, see condition_pairs()
+    """
+    if target_class not in cfg_decode["pw_mode"]:
+        raise ValueError(f"Unknown target_class for pairwise: {target_class}")
+
+    modes = cfg_decode["pw_mode"][target_class]
+    if pw_mode not in modes:
+        raise ValueError(
+            f"pw_mode '{pw_mode}' is not defined for target_class "
+            f"'{target_class}' (available: {sorted(modes)})"
+        )
+    return modes[pw_mode]
+
+
+def condition_pairs(conditions):
+    """
+    List the condition pairs of an RDM.
+
+    Parameters
+    ----------
+    conditions : list
+        Condition labels (square RDM, upper triangle only), or two lists
+        (rows, columns) whose cross pairs are compared, as in the
+        'hetero' pw_mode
+
+    Returns
+    -------
+    rows : np.ndarray
+        Conditions on the RDM rows
+    cols : np.ndarray
+        Conditions on the RDM columns
+    pairs : np.ndarray
+        (row index, column index) of every pair to decode (n_pairs, 2)
+    """
+    if len(conditions) == 2 and all(np.ndim(c) == 1 for c in conditions):
+        rows, cols = (np.asarray(c) for c in conditions)
+        ii, jj = np.meshgrid(
+            np.arange(len(rows)), np.arange(len(cols)), indexing="ij"
+        )
+        ii, jj = ii.ravel(), jj.ravel()
+        keep = rows[ii] != cols[jj]
+        pairs = np.column_stack([ii[keep], jj[keep]])
+    else:
+        rows = cols = np.asarray(conditions).ravel()
+        pairs = np.column_stack(np.triu_indices(len(rows), k=1))
+    return rows, cols, pairs
+
+
+def _fold_statistics(Xt, y, groups, classes, totals, group):
+    """Training class means and covariances with one group held out."""
+    in_group = groups == group
+    held = group_statistics(
+        Xt[:, in_group], y[in_group], groups[in_group], classes
+    )
+
+    counts = totals["total_counts"] - held["total_counts"]
+    sums = totals["total_sums"] - held["total_sums"]
+    scatter = totals["total_scatter"] - held["total_scatter"]
+
+    # (n_classes, n_times, n_channels) and the biased class covariances
+    # (n_classes, n_times, n_channels, n_channels); classes without
+    # training trials are left at zero and their pairs are skipped
+    trained = counts > 0
+    means = np.zeros(sums.shape)
+    cov = np.zeros(scatter.shape)
+    means[trained] = sums[trained] / counts[trained, None, None]
+    cov[trained] = (
+        scatter[trained]
+        - sums[trained, :, :, None] * means[trained, :, None, :]
+    ) / counts[trained, None, None, None]
+
+    return {"counts": counts, "means": means, "cov": cov}
+
+
+def _shared_buffers(shapes):
+    """Allocate zeroed float arrays that worker processes can read."""
+    buffers = {
+        name: (multiprocessing.RawArray("d", int(np.prod(shape))), shape)
+        for name, shape in shapes.items()
+    }
+    return buffers, _buffer_views(buffers)
+
+
+def _buffer_views(buffers):
+    """Numpy views of shared buffers from _shared_buffers()."""
+    return {
+        name: np.frombuffer(raw, dtype=float).reshape(shape)
+        for name, (raw, shape) in buffers.items()
+    }
+
+
+def _init_pair_worker(data, buffers):
+    """Make the trial data and the shared fold statistics available."""
+    _FOLD.clear()
+    _FOLD.update(data)
+    _FOLD.update(_buffer_views(buffers))
+
+
+def _score_pairs(class_pairs, group):
+    """Decode a chunk of class pairs with the statistics of one fold."""
+    if _FOLD.get("group") != group:
+        in_group = _FOLD["groups"] == group
+        _FOLD["group"] = group
+        _FOLD["Xt_test"] = _FOLD["Xt"][:, in_group]
+        _FOLD["y_test"] = _FOLD["y"][in_group]
+
+    classes = _FOLD["classes"]
+    n_times = _FOLD["means"].shape[1]
+    scores = np.full((len(class_pairs), n_times), np.nan)
+
+    for p, (a, b) in enumerate(class_pairs):
+        if _FOLD["counts"][a] == 0 or _FOLD["counts"][b] == 0:
+            continue
+        test = np.isin(_FOLD["y_test"], classes[[a, b]])
+        if not test.any():
+            continue
+
+        # Two-class LDA from the cached statistics: uniform priors, so
+        # the pooled covariance is the average of the class covariances
+        means = np.transpose(_FOLD["means"][[a, b]], (1, 0, 2))
+        cov = 0.5 * (_FOLD["cov"][a] + _FOLD["cov"][b])
+        model = _solve_lda(means, cov, classes[[a, b]], _FOLD["shrinkage"])
+
+        y_pred = predict_batch_lda(model, _FOLD["Xt_test"][:, test])
+        scores[p] = score_predictions(
+            _FOLD["y_test"][test], y_pred, _FOLD["scoring"]
+        )
+
+    return scores
+
+
+def pairwise_rdm(
+    X,
+    y,
+    groups,
+    conditions,
+    scoring="balanced_accuracy",
+    shrinkage=None,
+    n_jobs=1,
+):
+    """
+    Decode all condition pairs across time and build the RDM.
+
+    Each pair is scored with leave-one-group-out cross-validation on the
+    trials of its two conditions, equivalent to
+    cross_val_batch_lda() on that subset, and the fold scores are
+    averaged. Folds in which a condition has no training trials, or the
+    held-out group has no trials of the pair, are skipped; a pair with
+    no valid fold is NaN (e.g. stimulus pairs under 'one_rotation_out').
+
+    The fold statistics take n_conditions x n_times x n_channels²
+    floats of shared memory, e.g. ~85 MB for 14 conditions, 181 time
+    points and 64 channels.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Data array (n_trials, n_channels, n_times)
+    y : np.ndarray
+        Condition of each trial (n_trials,)
+    groups : np.ndarray
+        Cross-validation group of each trial (n_trials,)
+    conditions : list
+        Conditions of the RDM, or two lists (rows, columns), see
+        condition_pairs()
+    scoring : str, optional
+        'balanced_accuracy' or 'accuracy'. Default is
+        'balanced_accuracy'.
+    shrinkage : float or None, optional
+        Covariance shrinkage intensity. Default is None.
+    n_jobs : int, optional
+        Number of worker processes decoding pairs (-1 = all cores).
+        Default is 1.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with keys:
+        - 'rdm': pairwise accuracies (n_rows, n_cols, n_times),
+          mirrored for square RDMs; the diagonal is 0 as in MATLAB
+        - 'rows', 'cols': conditions on the RDM axes
+        - 'pairs': (row index, column index) of each pair (n_pairs, 2)
+        - 'scores': accuracy of each pair (n_pairs, n_times)
+        - 'pw_mean': average over the pairs (n_times,)
+    """
+    rows, cols, pairs = condition_pairs(conditions)
+    classes = np.union1d(rows, cols)
+
+    # Only the trials of the RDM's conditions are needed
+    y = np.asarray(y)
+    groups = np.asarray(groups)
+    keep = np.isin(y, classes)
+    Xt = _time_major(X[keep])
+    y, groups = y[keep], groups[keep]
+
+    class_pairs = np.column_stack(
+        [
+            np.searchsorted(classes, rows[pairs[:, 0]]),
+            np.searchsorted(classes, cols[pairs[:, 1]]),
+        ]
+    )
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+    n_jobs = max(1, min(n_jobs, len(class_pairs)))
+    chunks = np.array_split(class_pairs, min(len(class_pairs), n_jobs * 4))
+
+    # Totals over all groups; each fold subtracts its held-out group
+    totals = group_statistics(Xt, y, np.zeros(len(y)), classes)
+
+    n_times = Xt.shape[0]
+    score_sum = np.zeros((len(pairs), n_times))
+    n_folds = np.zeros((len(pairs), 1))
+
+    # One set of fold statistics in shared memory, refilled per fold
+    n_classes, n_channels = len(classes), Xt.shape[2]
+    buffers, shared = _shared_buffers(
+        {
+            "counts": (n_classes,),
+            "means": (n_classes, n_times, n_channels),
+            "cov": (n_classes, n_times, n_channels, n_channels),
+        }
+    )
+    data = {
+        "Xt": Xt,
+        "y": y,
+        "groups": groups,
+        "classes": classes,
+        "scoring": scoring,
+        "shrinkage": shrinkage,
+    }
+
+    executor = None
+    if n_jobs == 1:
+        _init_pair_worker(data, buffers)
+    else:
+        # Forked workers receive the trial data without pickling
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context(
+            "fork" if "fork" in methods else None
+        )
+        executor = ProcessPoolExecutor(
+            max_workers=n_jobs,
+            mp_context=context,
+            initializer=_init_pair_worker,
+            initargs=(data, buffers),
+        )
+
+    try:
+        for group in np.unique(groups):
+            fold = _fold_statistics(Xt, y, groups, classes, totals, group)
+            for name, view in shared.items():
+                view[...] = fold[name]
+
+            if executor is None:
+                fold_scores = [_score_pairs(chunk, group) for chunk in chunks]
+            else:
+                fold_scores = list(
+                    executor.map(_score_pairs, chunks, [group] * len(chunks))
+                )
+
+            fold_scores = np.concatenate(fold_scores)
+            valid = ~np.isnan(fold_scores[:, :1])
+            score_sum += np.where(valid, fold_scores, 0.0)
+            n_folds += valid
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    with np.errstate(invalid="ignore"):
+        scores = score_sum / n_folds
+    scores[n_folds[:, 0] == 0] = np.nan
+
+    # Pairs without any valid fold stay NaN and are left out of the mean
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        pw_mean = np.nanmean(scores, axis=0)
+
+    rdm = np.zeros((len(rows), len(cols), n_times))
+    rdm[pairs[:, 0], pairs[:, 1]] = scores
+    if np.array_equal(rows, cols):
+        rdm[pairs[:, 1], pairs[:, 0]] = scores
+
+    return {
+        "rdm": rdm,
+        "rows": rows,
+        "cols": cols,
+        "pairs": pairs,
+        "scores": scores,
+        "pw_mean": pw_mean,
+    }
+
+
+def run_pairwise(
+    project_name,
+    subjectnr,
+    participant_group="adults",
+    target_classes=None,
+    cv_schemes=None,
+    pw_mode=None,
+    save_rdm=None,
+    overwrite=None,
+    n_jobs=None,
+):
+    """
+    Run pairwise decoding and save the RDMs of a single subject.
+
+    Parameters
+    ----------
+    project_name : str
+        Name of the project
+    subjectnr : int or str
+        Subject number
+    participant_group : str, optional
+        Participant group ('adults' or 'infants')
+    target_classes : list of str, optional
+        'identity' and/or 'stimulus'. If None, uses the config.
+    cv_schemes : list of str, optional
+        CV schemes to use. If None, uses 'one_rotation_out'.
+    pw_mode : str, optional
+        Key of cfg['pw_mode'][target_class] selecting the conditions of
+        every target class. If None, uses the config.
+    save_rdm : bool, optional
+        Whether to save the RDMs as .mat files. If None, uses the config.
+    overwrite : bool, optional
+        Whether to overwrite existing RDMs
+    n_jobs : int, optional
+        Number of worker processes decoding pairs. If None, uses value
+        from config.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with the pairwise_rdm() output of each analysis
+    """
+    cfg_preproc = preprocessing_config(project_name)
+    cfg_decode = viewpoint_decoding_config(project_name)
+    cfg_rdm = cfg_decode["rdm"]
+
+    if overwrite is None:
+        overwrite = cfg_decode["overwrite"]
+    if n_jobs is None:
+        n_jobs = cfg_decode["n_jobs"]
+    if target_classes is None:
+        target_classes = cfg_rdm["target_class"]
+    if cv_schemes is None:
+        cv_schemes = ["one_rotation_out"]
+    if pw_mode is None:
+        pw_mode = cfg_rdm["pw_mode"]
+    if save_rdm is None:
+        save_rdm = cfg_rdm["save_rdm"]
+
+    # Check every analysis before any data is loaded
+    conditions = {
+        target_class: pairwise_conditions(cfg_decode, target_class, pw_mode)
+        for target_class in target_classes
+    }
+
+    if isinstance(subjectnr, int):
+        subjectnr = f"{subjectnr:02d}"
+
+    print(f'\n{"="*70}')
+    print(f"PAIRWISE DECODING: Subject {subjectnr} ({participant_group})")
+    print(f'{"="*70}')
+
+    # One data load for all analyses (shares the decoding cache)
+    epochs_file, behav_file = subject_data_files(
+        cfg_preproc, participant_group, subjectnr
+    )
+    context = load_decoding_context(epochs_file, behav_file, cfg_decode)
+    times = context["times"]
+
+    rdm_dir = cfg_rdm["rdm_dir"]
+    rdm_dir.mkdir(parents=True, exist_ok=True)
+
+    results = {}
+    for target_class in target_classes:
+        y = pairwise_labels(context["behav"], target_class)
+
+        for cv_scheme in cv_schemes:
+            analysis_name = f"pw_{target_class}_{cv_scheme}_{pw_mode}"
+            print(f"\n--- Running: {analysis_name} ---")
+
+            # File name read by scripts/rsa_viewpoint.py for 'all'
+            suffix = "" if pw_mode == "all" else f"_{pw_mode}"
+            rdm_file = (
+                rdm_dir
+                / f"{participant_group}_sub-{subjectnr}_RDM_{target_class}_{cv_scheme}{suffix}.mat"
+            )
+            if rdm_file.exists() and not overwrite:
+                print(f"RDM exists, skipping: {rdm_file}")
+                continue
+
+            if cv_scheme not in context["groups"]:
+                context["groups"][cv_scheme] = _cv_groups(
+                    context["behav"], cv_scheme
+                )
+
+            res = pairwise_rdm(
+                context["X"],
+                y,
+                context["groups"][cv_scheme],
+                conditions[target_class],
+                scoring=cfg_decode["scoring"],
+                shrinkage=cfg_decode.get("lda_shrinkage"),
+                n_jobs=n_jobs,
+            )
+            results[analysis_name] = res
+            print(
+                f"Decoded {len(res['pairs'])} pairs, RDM shape "
+                f"{res['rdm'].shape}"
+            )
+
+            if save_rdm:
+                savemat(rdm_file, {"RDM": res["rdm"]})
+                print(f"Saved RDM: {rdm_file}")
+
+            # Average pairwise decoding
+            if cfg_decode["savefile"] and cfg_decode.get("results_store"):
+                append_result(
+                    cfg_decode["results_store"],
+                    participant_group,
+                    analysis_name,
+                    int(subjectnr),
+                    res["pw_mean"],
+                    times=times,
+                    attrs={"chance_level": 0.5, "pw_mode": pw_mode},
+                )
+            if cfg_decode["savefile"] and cfg_decode.get("results_csv", True):
+                result_file = (
+                    cfg_decode["results_dir"]
+                    / f"sub-{subjectnr}_{analysis_name}_results.csv"
+                )
+                pd.DataFrame(
+                    {"time": times, "accuracy": res["pw_mean"], "chance": 0.5}
+                ).to_csv(result_file, index=False)
+                print(f"Saved results: {result_file}")
+
+            if cfg_decode["plot_results"]:
+                fig_path = (
+                    cfg_decode["figures_dir"]
+                    / f"sub-{subjectnr}_{analysis_name}_decoding.png"
+                )
+                plot_decoding_results(
+                    times,
+                    res["pw_mean"],
+                    f"pairwise_{target_class}",
+                    0.5,
+                    save_path=fig_path,
+                )
+                print(f"Saved figure: {fig_path}")
+
+    print(f'\n{"="*70}')
+    print(f"PAIRWISE DECODING COMPLETED: Subject {subjectnr}")
+    print(f'{"="*70}\n')
+
+    return results
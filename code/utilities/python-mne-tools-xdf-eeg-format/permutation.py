@@ -0,0 +1,463 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Label-Permutation Engine for Temporal Decoding
+
+Builds the null distribution of cross-validated LDA decoding accuracy
+by shuffling the class labels within exchangeability blocks (the
+cross-validation groups), as cosmo_randomize_targets does in
+func/apply_decoding.m.
+
+Rather than refitting the decoder for every shuffle, the observed labels
+and all permuted labels are stacked into one sparse one-hot indicator
+matrix, so the class sums of every permutation and fold come out of one
+sparse matrix multiply. Because labels are only exchanged within
+groups, the class counts of every training and test set are the same
+for all permutations. With balanced classes the within-class scatter of
+a permutation is the (label-independent) total scatter minus its
+between-class scatter; otherwise each trial's scatter is weighted by its
+class under the permutation. The discriminants of a batch of
+permutations are then obtained with one batched solve and scored in
+vectorized form.
+
+The class covariances are averaged with equal weights (uniform priors)
+and classes without training trials are left out, so the observed
+accuracy is identical to batch_lda.cross_val_batch_lda.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from scipy import sparse
+
+from .preprocessing_config import preprocessing_config
+from .viewpoint_decoding_config import viewpoint_decoding_config
+from .batch_lda import _solve_lda
+from .decoding import (
+    subject_data_files,
+    load_decoding_context,
+    get_decoding_data,
+)
+
+
+def permute_labels(y, groups, n_permutations, seed=0):
+    """
+    Shuffle labels within exchangeability blocks.
+
+    Parameters
+    ----------
+    y : np.ndarray
+        Class labels (n_trials,)
+    groups : np.ndarray
+        Exchangeability block of each trial (n_trials,)
+    n_permutations : int
+        Number of shuffles
+    seed : int, optional
+        Random seed. Default is 0.
+
+    Returns
+    -------
+    labels : np.ndarray
+        Observed labels followed by the shuffles
+        (n_permutations + 1, n_trials)
+    """
+    rng = np.random.default_rng(seed)
+    labels = np.tile(y, (n_permutations + 1, 1))
+
+    for group in np.unique(groups):
+        idx = np.flatnonzero(groups == group)
+        order = np.argsort(rng.random((n_permutations, idx.size)), axis=1)
+        labels[1:, idx] = y[idx][order]
+
+    return labels
+
+
+def _balanced_accuracy(correct, true_index, n_classes):
+    """Mean recall over the classes present, per permutation and time."""
+    # correct: (n_perm, n_times, n_test); true_index: (n_perm, n_test)
+    recalls = []
+    for k in range(n_classes):
+        mask = (true_index == k).astype(float)
+        n_k = mask[0].sum()
+        if n_k == 0:
+            continue
+        recalls.append(np.einsum("ptn,pn->pt", correct, mask) / n_k)
+    return np.mean(recalls, axis=0)
+
+
+def permutation_null(
+    X,
+    y,
+    groups,
+    n_permutations=100,
+    scoring="balanced_accuracy",
+    shrinkage=None,
+    seed=0,
+    max_bytes=2**28,
+):
+    """
+    Observed and permuted leave-one-group-out LDA decoding accuracy.
+
+    Parameters
+    ----------
+    X : np.ndarray
+        Data array (n_trials, n_channels, n_times)
+    y : np.ndarray
+        Class labels (n_trials,)
+    groups : np.ndarray
+        Cross-validation groups, also used as exchangeability blocks
+    n_permutations : int, optional
+        Number of label shuffles. Default is 100.
+    scoring : str, optional
+        'balanced_accuracy' or 'accuracy'. Default is
+        'balanced_accuracy'.
+    shrinkage : float or None, optional
+        Covariance shrinkage intensity. Default is None.
+    seed : int, optional
+        Random seed of the shuffles. Default is 0.
+    max_bytes : int, optional
+        Memory limit for the covariances of one batch of permutations.
+        Default is 256 MB.
+
+    Returns
+    -------
+    observed : np.ndarray
+        Fold-averaged accuracy with the true labels (n_times,)
+    null : np.ndarray
+        Fold-averaged accuracy of every shuffle
+        (n_permutations, n_times)
+    """
+    if scoring not in ("balanced_accuracy", "accuracy"):
+        raise ValueError(f"Unsupported scoring for permutations: {scoring}")
+
+    y = np.asarray(y)
+    groups = np.asarray(groups)
+    n_trials, n_channels, n_times = X.shape
+    classes = np.unique(y)
+    n_classes = len(classes)
+    n_labelings = n_permutations + 1
+
+    # Class index of every trial under every labeling
+    labels = np.searchsorted(
+        classes, permute_labels(y, groups, n_permutations, seed)
+    )
+
+    # Sparse one-hot indicator (n_trials, n_labelings * n_classes)
+    columns = labels + n_classes * np.arange(n_labelings)[:, None]
+    indicator = sparse.csr_matrix(
+        (
+            np.ones(labels.size),
+            (np.tile(np.arange(n_trials), n_labelings), columns.ravel()),
+        ),
+        shape=(n_trials, n_labelings * n_classes),
+    )
+
+    # Data in (n_trials, n_times * n_channels) layout
+    flat = np.ascontiguousarray(np.transpose(X, (0, 2, 1))).reshape(
+        n_trials, -1
+    )
+    Xt = flat.reshape(n_trials, n_times, n_channels).transpose(1, 0, 2)
+
+    # Class sums of all labelings at once
+    total_sums = np.asarray(indicator.T @ flat)
+    total_scatter = np.matmul(np.transpose(Xt, (0, 2, 1)), Xt)
+
+    # Covariances (n_times x n_channels²) and decision values
+    # (n_times x n_test x n_classes) of one batch of labelings
+    group_labels, group_sizes = np.unique(groups, return_counts=True)
+    per_labeling = (
+        n_times * (n_channels**2 + group_sizes.max() * n_classes) * 8
+    )
+    batch = max(1, int(max_bytes // per_labeling))
+
+    scores = np.zeros((n_labelings, n_times))
+
+    for group in group_labels:
+        test = np.flatnonzero(groups == group)
+        held_sums = np.asarray(indicator[test].T @ flat[test])
+        held_scatter = np.matmul(
+            np.transpose(Xt[:, test], (0, 2, 1)), Xt[:, test]
+        )
+
+        # Class counts are identical for every labeling
+        counts = np.bincount(labels[0], minlength=n_classes) - np.bincount(
+            labels[0, test], minlength=n_classes
+        )
+
+        # Classes without training trials are left out of the model, and
+        # the class covariances are averaged with equal weights (uniform
+        # priors), as in batch_lda.fit_batch_lda_without_group
+        trained = np.flatnonzero(counts > 0)
+        weights = 1.0 / (len(trained) * counts[trained])
+        balanced = np.all(counts[trained] == counts[trained[0]])
+
+        # (n_labelings, n_trained, n_times, n_channels)
+        sums = (total_sums - held_sums).reshape(
+            n_labelings, n_classes, n_times, n_channels
+        )[:, trained]
+        means = sums / counts[trained, None, None]
+
+        if balanced:
+            # Equal weights: the pooled scatter is the same for every
+            # labeling
+            scatter = (total_scatter - held_scatter) * weights[0]
+        else:
+            # Each training trial's scatter is weighted by its class
+            # under the labeling
+            class_weights = np.zeros(n_classes)
+            class_weights[trained] = weights
+            train = np.flatnonzero(groups != group)
+            Xtrain = Xt[:, train]
+            XtrainT = np.transpose(Xtrain, (0, 2, 1))
+
+        Xtest = Xt[:, test]
+        for start in range(0, n_labelings, batch):
+            stop = min(start + batch, n_labelings)
+            b_sums = sums[start:stop]
+            b_means = means[start:stop]
+
+            # Weighted within-class covariance: weighted scatter minus the
+            # weighted class-mean outer products,
+            # (batch, n_times, n_channels, n_channels)
+            cov = -np.einsum(
+                "pktc,pktd->ptcd", b_sums * weights[:, None, None], b_means
+            )
+            if balanced:
+                cov += scatter[None]
+            else:
+                for p, labeling in enumerate(labels[start:stop]):
+                    trial_weights = class_weights[labeling[train]]
+                    cov[p] += np.matmul(
+                        XtrainT * trial_weights[None, None], Xtrain
+                    )
+
+            model = _solve_lda(
+                np.transpose(b_means, (0, 2, 1, 3)).reshape(
+                    -1, len(trained), n_channels
+                ),
+                cov.reshape(-1, n_channels, n_channels),
+                classes[trained],
+                shrinkage,
+            )
+            coef = model["coef"].reshape(
+                stop - start, n_times, n_channels, len(trained)
+            )
+            intercept = model["intercept"].reshape(
+                stop - start, n_times, 1, len(trained)
+            )
+
+            # (batch, n_times, n_test, n_trained)
+            decision = np.matmul(Xtest[None], coef) + intercept
+            predicted = trained[np.argmax(decision, axis=-1)]
+            true_index = labels[start:stop, test]
+            correct = (predicted == true_index[:, None, :]).astype(float)
+
+            if scoring == "accuracy":
+                scores[start:stop] += correct.mean(axis=-1)
+            else:
+                scores[start:stop] += _balanced_accuracy(
+                    correct, true_index, n_classes
+                )
+
+    scores /= len(group_labels)
+    return scores[0], scores[1:]
+
+
+def permutation_pvalues(observed, null):
+    """
+    Permutation p-values at every time point.
+
+    Parameters
+    ----------
+    observed : np.ndarray
+        Observed accuracy (n_times,)
+    null : np.ndarray
+        Null accuracies (n_permutations, n_times)
+
+    Returns
+    -------
+    pvals : dict
+        Dictionary with keys:
+        - 'uncorrected': p-value of each time point against its own null
+        - 'max_stat': p-value against the null maximum over time
+          (family-wise error corrected across time)
+    """
+    n_permutations = null.shape[0]
+    exceed = (null >= observed[None, :]).sum(axis=0)
+    exceed_max = (null.max(axis=1)[:, None] >= observed[None, :]).sum(axis=0)
+    return {
+        "uncorrected": (exceed + 1) / (n_permutations + 1),
+        "max_stat": (exceed_max + 1) / (n_permutations + 1),
+    }
+
+
+def plot_permutation_results(
+    times, observed, pvals, chance_level, decode_type, save_path
+):
+    """Plot observed accuracy and mark the significant time points."""
+    sig = pvals < 0.05
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    ax.plot(times, observed, label="Observed", linewidth=2)
+    ax.axhline(chance_level, color="k", linestyle="--", label="Chance")
+    ax.plot(
+        times[sig],
+        np.full(sig.sum(), chance_level * 0.95),
+        marker="*",
+        markersize=10,
+        linestyle="none",
+        label="Significant (p<0.05)",
+    )
+
+    ax.set_xlabel("Time (s)", fontsize=12)
+    ax.set_ylabel("Accuracy", fontsize=12)
+    ax.set_title(
+        f'Corrected Results: {decode_type.replace("_", " ").title()}',
+        fontsize=14,
+    )
+    ax.legend(fontsize=10)
+    plt.tight_layout()
+
+    fig.savefig(save_path, dpi=300, bbox_inches="tight")
+    plt.close(fig)
+
+
+def run_permutation(
+    project_name,
+    subjectnr,
+    participant_group="adults",
+    decode_types=None,
+    cv_schemes=None,
+    n_permutations=None,
+    save_null=None,
+    plot_results=None,
+    seed=0,
+):
+    """
+    Run permutation testing for a single subject.
+
+    Parameters
+    ----------
+    project_name : str
+        Name of the project
+    subjectnr : int or str
+        Subject number
+    participant_group : str, optional
+        Participant group ('adults' or 'infants')
+    decode_types : list of str, optional
+        Types of decoding to test. If None, uses 'category'.
+    cv_schemes : list of str, optional
+        CV schemes to use. If None, uses 'one_rotation_out'.
+    n_permutations : int, optional
+        Number of label shuffles. If None, uses the config.
+    save_null : bool, optional
+        Whether to save the null distributions. If None, uses the config.
+    plot_results : bool, optional
+        Whether to plot the corrected results. If None, uses the config.
+    seed : int, optional
+        Random seed of the shuffles. Default is 0.
+
+    Returns
+    -------
+    results : dict
+        Dictionary with 'observed', 'null' and 'pvals' for each analysis
+    """
+    cfg_preproc = preprocessing_config(project_name)
+    cfg_decode = viewpoint_decoding_config(project_name)
+    cfg_perm = cfg_decode["permutation"]
+
+    if decode_types is None:
+        decode_types = ["category"]
+    if cv_schemes is None:
+        cv_schemes = ["one_rotation_out"]
+    if n_permutations is None:
+        n_permutations = cfg_perm["n_permutations"]
+    if save_null is None:
+        save_null = cfg_perm["save_null"]
+    if plot_results is None:
+        plot_results = cfg_decode["plot_results"]
+
+    if isinstance(subjectnr, int):
+        subjectnr = f"{subjectnr:02d}"
+
+    print(f'\n{"="*70}')
+    print(f"PERMUTATION TESTING: Subject {subjectnr} ({participant_group})")
+    print(f'{"="*70}')
+
+    epochs_file, behav_file = subject_data_files(
+        cfg_preproc, participant_group, subjectnr
+    )
+    context = load_decoding_context(epochs_file, behav_file, cfg_decode)
+    times = context["times"]
+
+    results = {}
+    for decode_type in decode_types:
+        for cv_scheme in cv_schemes:
+            analysis_name = f"{decode_type}_{cv_scheme}"
+            print(
+                f"\n--- Running {n_permutations} permutations: "
+                f"{analysis_name} ---"
+            )
+
+            X, y, groups, n_classes = get_decoding_data(
+                context, decode_type, cv_scheme
+            )
+            observed, null = permutation_null(
+                X,
+                y,
+                groups,
+                n_permutations=n_permutations,
+                scoring=cfg_decode["scoring"],
+                shrinkage=cfg_decode.get("lda_shrinkage"),
+                seed=seed,
+            )
+            pvals = permutation_pvalues(observed, null)
+            results[analysis_name] = {
+                "observed": observed,
+                "null": null,
+                "pvals": pvals,
+            }
+
+            if save_null:
+                null_file = (
+                    cfg_decode["results_dir"]
+                    / f"sub-{subjectnr}_{analysis_name}_null.npy"
+                )
+                np.save(null_file, null)
+                pd.DataFrame(
+                    {
+                        "time": times,
+                        "accuracy": observed,
+                        "p_uncorrected": pvals["uncorrected"],
+                        "p_max_stat": pvals["max_stat"],
+                    }
+                ).to_csv(
+                    cfg_decode["results_dir"]
+                    / f"sub-{subjectnr}_{analysis_name}_permutation.csv",
+                    index=False,
+                )
+                print(f"Saved null distribution: {null_file}")
+
+            if plot_results:
+                fig_path = (
+                    cfg_decode["figures_dir"]
+                    / f"sub-{subjectnr}_{analysis_name}_corrected.png"
+                )
+                plot_permutation_results(
+                    times,
+                    observed,
+                    pvals["max_stat"],
+                    1.0 / n_classes,
+                    decode_type,
+                    fig_path,
+                )
+                print(f"Saved figure: {fig_path}")
+
+    print(f'\n{"="*70}')
+    print(f"PERMUTATION TESTING COMPLETED: Subject {subjectnr}")
+    print(f'{"="*70}\n')
+
+    return results
@@ -14,10 +14,108 @@ import pandas as pd
 import numpy as np
 import mne
 from .preprocessing_config import preprocessing_config
+from .triggers import align_trigger_onsets, read_status_triggers
+from .resources import peak_rss_mb, reset_peak_rss
+
+
+def epoch_in_chunks(
+    raw,
+    events,
+    l_freq,
+    h_freq,
+    tmin=-0.1,
+    tmax=0.8,
+    baseline=(-0.1, 0),
+    chunk_duration=60.0,
+):
+    """
+    Re-reference, filter and epoch a non-preloaded recording in chunks.
+
+    Events are grouped into chunks of ``chunk_duration`` seconds. For each
+    chunk, only the samples spanning its epochs plus the filter length on
+    either side are read from disk, average-referenced and band-pass
+    filtered, and the epochs are cut before the next chunk is loaded, so
+    at most one padded chunk of continuous data is held in memory.
+    Because the padding covers the full FIR filter, the epochs match
+    filtering the continuous recording in one go.
+
+    Parameters
+    ----------
+    raw : mne.io.Raw
+        Recording opened with ``preload=False``, already restricted to the
+        channels to keep
+    events : np.ndarray
+        Events array (n_events, 3) with absolute sample indices
+    l_freq : float
+        High-pass cutoff (Hz)
+    h_freq : float
+        Low-pass cutoff (Hz)
+    tmin : float, optional
+        Epoch start (s). Default is -0.1.
+    tmax : float, optional
+        Epoch end (s). Default is 0.8.
+    baseline : tuple, optional
+        Baseline window (s). Default is (-0.1, 0).
+    chunk_duration : float, optional
+        Span of events (s) processed at a time. Default is 60.
+
+    Returns
+    -------
+    epochs : mne.EpochsArray
+        Epochs for all events
+    """
+    sfreq = raw.info["sfreq"]
+    pad = len(
+        mne.filter.create_filter(None, sfreq, l_freq, h_freq, verbose=False)
+    )
+    first = int(np.floor(tmin * sfreq)) - pad
+    last = int(np.ceil(tmax * sfreq)) + pad + 1
+
+    # Chunk index of every event
+    chunk_id = (events[:, 0] - events[0, 0]) // int(chunk_duration * sfreq)
+    bounds = np.flatnonzero(np.diff(chunk_id)) + 1
+    event_chunks = np.split(events, bounds)
+
+    epochs_list = []
+    for chunk_events in event_chunks:
+        onsets = chunk_events[:, 0] - raw.first_samp
+        start = max(0, onsets[0] + first)
+        stop = min(raw.n_times, onsets[-1] + last)
+
+        chunk_raw = mne.io.RawArray(
+            raw.get_data(start=start, stop=stop),
+            raw.info,
+            first_samp=raw.first_samp + start,
+            verbose=False,
+        )
+        chunk_raw.set_eeg_reference(verbose=False)
+        chunk_raw.filter(l_freq=l_freq, h_freq=h_freq, verbose=False)
+
+        epochs_list.append(
+            mne.Epochs(
+                chunk_raw,
+                chunk_events,
+                event_id={str(e): e for e in chunk_events[:, 2]},
+                tmin=tmin,
+                tmax=tmax,
+                baseline=baseline,
+                detrend=0,
+                proj=False,
+                preload=True,
+                verbose=False,
+            )
+        )
+        del chunk_raw
+
+    return mne.concatenate_epochs(epochs_list, add_offset=False)
 
 
 def run_preprocess(
-    project_name, subjectnr, participant_group="adults", overwrite=None
+    project_name,
+    subjectnr,
+    participant_group="adults",
+    overwrite=None,
+    low_memory=None,
 ):
     """
     Preprocess EEG data for a single subject.
@@ -33,6 +131,15 @@ def run_preprocess(
     overwrite : int or None, optional
         Whether to overwrite existing files (0=no, 1=yes).
         If None, uses value from config.
+    low_memory : int or None, optional
+        Read the recording lazily and filter/epoch it in chunks
+        (0=no, 1=yes). If None, uses value from config.
+
+    Returns
+    -------
+    peak_rss : float or None
+        Peak resident memory (MB) while preprocessing this subject, or
+        None if the subject was skipped
     """
 
     # Load configuration
@@ -41,6 +148,8 @@ def run_preprocess(
     # Use config overwrite setting if not specified
     if overwrite is None:
         overwrite = cfg["overwrite"]
+    if low_memory is None:
+        low_memory = cfg["low_memory"]
 
     # Get participant group info
     group_info = next(
@@ -151,7 +260,11 @@ def run_preprocess(
     # =====================================================================
     # Load EEG file
     # =====================================================================
-    raw = mne.io.read_raw_bdf(str(raw_filename), preload=True)
+    reset_peak_rss()
+
+    # In low-memory mode nothing is loaded yet; the Status channel and the
+    # EEG chunks are read from disk on demand
+    raw = mne.io.read_raw_bdf(str(raw_filename), preload=not low_memory)
     sfreq = raw.info["sfreq"]
 
     # =====================================================================
@@ -165,21 +278,21 @@ def run_preprocess(
 
     print(f"[DEBUG] Behavioural columns: {list(T.columns)}")
 
-    # Find the STATUS channel and read the values from it
-    stim_channel = raw.ch_names.index("Status")
-    stim_data = raw.get_data(picks=stim_channel)
+    # Decode the STATUS channel once: every rising edge and its code
+    triggers = read_status_triggers(raw)
 
-    # Find rising edges == 1324
-    stim_onset_sample = [
-        x for x in np.nonzero(np.diff(stim_data)[0] == 13824)[0]
-    ]
+    # Find rising edges == 13824
+    stim_onset_sample = triggers["samples"][triggers["codes"] == 13824]
 
     # Sanity-check
     print(
         f"[DEBUG] Detected {len(stim_onset_sample)} stim_onset_sample entries"
     )
-    a, b = np.unique(np.diff(stim_data)[0], return_counts=1)
-    a, b = np.unique(np.diff(stim_onset_sample), return_counts=1)
+    codes, counts = np.unique(triggers["codes"], return_counts=True)
+    print(
+        "[DEBUG] Trigger codes:",
+        dict(zip(codes.tolist(), counts.tolist())),
+    )
 
     # =====================================================================
     # Fix missing triggers
@@ -190,22 +303,10 @@ def run_preprocess(
         print(f"Triggers: {len(stim_onset_sample)}, Expected: {len(T)}")
         assert missingtriggers < 100, "Too many missing triggers"
 
-        a = [int(x) / sfreq for x in stim_onset_sample]
-        b = [x for x in T["time_stimon"]]
-
-        for j in range(1, len(a)):
-            da = a[j] - a[j - 1]
-            db = b[j] - b[j - 1]
-            if da - db > 0.11:
-                print(
-                    f"Inserting pos:{j} +{a[j-1]+db:.3f}s",
-                    f"data:{da:.3f}s_diff({a[j-1]:.3f}s,{a[j]:.3f}s)",
-                    f"expected:{db:.3f}s_diff({b[j-1]:.3f}s,{b[j]:.3f}s)",
-                )
-                a.insert(j, a[j - 1] + db)
-                stim_onset_sample.insert(
-                    j, int(round(sfreq * (a[j - 1] + db)))
-                )
+        stim_onset_sample, inserted_trials = align_trigger_onsets(
+            stim_onset_sample, T["time_stimon"], sfreq
+        )
+        print(f"Reconstructed trials: {inserted_trials.tolist()}")
 
     if len(stim_onset_sample) > len(T):
         print(f"Found not enough events! {len(stim_onset_sample)} vs {len(T)}")
@@ -268,23 +369,37 @@ def run_preprocess(
     )
     print(raw.info.ch_names)
     raw.set_montage(montage)
-    raw.set_eeg_reference()
 
-    # Apply filters from config
     print(f'Applying bandpass filter: {cfg["HighPass"]}-{cfg["LowPass"]} Hz')
-    raw.filter(l_freq=cfg["HighPass"], h_freq=cfg["LowPass"])
-
-    # Epoch
-    epochs = mne.Epochs(
-        raw,
-        events,
-        tmin=-0.1,
-        tmax=0.8,
-        baseline=(-0.1, 0),
-        detrend=0,
-        proj=False,
-        preload=True,
-    )
+    if low_memory:
+        # Reference, filter and epoch only padded windows around events
+        epochs = epoch_in_chunks(
+            raw,
+            events,
+            l_freq=cfg["HighPass"],
+            h_freq=cfg["LowPass"],
+            tmin=-0.1,
+            tmax=0.8,
+            baseline=(-0.1, 0),
+            chunk_duration=cfg["chunk_duration"],
+        )
+    else:
+        raw.set_eeg_reference()
+
+        # Apply filters from config
+        raw.filter(l_freq=cfg["HighPass"], h_freq=cfg["LowPass"])
+
+        # Epoch
+        epochs = mne.Epochs(
+            raw,
+            events,
+            tmin=-0.1,
+            tmax=0.8,
+            baseline=(-0.1, 0),
+            detrend=0,
+            proj=False,
+            preload=True,
+        )
 
     # Resample using config parameter
     if cfg["downsample"] > 0:
@@ -294,8 +409,13 @@ def run_preprocess(
     print(epochs)
     epochs.save(str(outfn), overwrite=True)
 
+    peak_rss = peak_rss_mb()
+    if peak_rss is not None:
+        print(f"[PREPROC] Peak RSS sub-{subjectnr}: {peak_rss:.0f} MB")
     print("Done!")
 
+    return peak_rss
+
 
 # =========================================================================
 # Example usage
@@ -67,6 +67,10 @@ def preprocessing_config(project_name):
     )
     cfg["downsample"] = 200  # Target sampling rate (Hz); 0 = no downsampling
     cfg["clean_rawdata"] = 0  # Use EEGLAB Clean Rawdata plugin (0=off, 1=on)
+    # Lazy BDF reading, chunked filter/epoch (0=off, 1=on)
+    cfg["low_memory"] = 0
+    # Span of events per chunk in low-memory mode (s)
+    cfg["chunk_duration"] = 60
 
     # ===================================================================
     # PARTICIPANT INFORMATION
@@ -79,7 +83,7 @@ def preprocessing_config(project_name):
 
     # --- Infant Group ---
     # Only load LabNotebook if it exists and has the required columns
-    if not notebook_path.is_file():
+    if notebook_path.is_file():
         try:
             # Import participant data
             data_table = pd.read_csv(notebook_path)
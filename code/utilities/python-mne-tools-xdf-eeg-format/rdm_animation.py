@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RDM Time-Course Animation
+
+Renders the evolution of a representational space (one RDM per time
+point) as a GIF or MP4. A single figure and imshow artist are created per
+worker, and only the image data, colour limits and title are updated for
+each frame. Frames are rendered to memory and streamed straight into the
+video writer, so no intermediate images are written unless requested.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import os
+import math
+import numpy as np
+import imageio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+
+def _setup_figure(n_conditions, labels=None, cmap="viridis", block=None):
+    """Create the figure and the imshow artist reused for all frames."""
+    fig = Figure(figsize=(8, 6))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    im = ax.imshow(
+        np.zeros((n_conditions, n_conditions)),
+        aspect="equal",
+        origin="upper",
+        cmap=cmap,
+    )
+
+    # Add grid lines to separate blocks (e.g. animate/inanimate)
+    if block is not None:
+        ax.axhline(
+            y=block - 0.5,
+            color="white",
+            linewidth=2,
+            linestyle="--",
+            alpha=0.5,
+        )
+        ax.axvline(
+            x=block - 0.5,
+            color="white",
+            linewidth=2,
+            linestyle="--",
+            alpha=0.5,
+        )
+
+    if labels is not None:
+        ax.set_yticks(range(len(labels)))
+        ax.set_yticklabels(labels, fontsize=9)
+        ax.set_xticks(range(len(labels)))
+        ax.set_xticklabels(labels, fontsize=9, rotation=45, ha="right")
+
+    fig.colorbar(im, ax=ax, label="Pairwise Decoding Accuracy")
+    fig.tight_layout()
+
+    return fig, ax, im
+
+
+def _render_frames(rdms, times, options):
+    """Render a block of time points with one reused figure."""
+    fig, ax, im = _setup_figure(
+        rdms.shape[0],
+        labels=options["labels"],
+        cmap=options["cmap"],
+        block=options["block"],
+    )
+
+    frames = []
+    for t, time_value in enumerate(times):
+        rdm = rdms[:, :, t]
+        im.set_data(rdm)
+        im.set_clim(np.percentile(rdm, 5), np.percentile(rdm, 95))
+        ax.set_title(f"Representational Space at t = {time_value} ms")
+
+        fig.canvas.draw()
+        frames.append(np.asarray(fig.canvas.buffer_rgba())[:, :, :3].copy())
+
+        if options["png_pattern"] is not None:
+            fig.savefig(
+                options["png_pattern"].format(time=time_value),
+                dpi=options["png_dpi"],
+                bbox_inches="tight",
+            )
+
+    return frames
+
+
+def render_rdm_animation(
+    rdms,
+    times,
+    out_path,
+    labels=None,
+    block=None,
+    cmap="viridis",
+    fps=10,
+    n_jobs=1,
+    png_pattern=None,
+    png_dpi=300,
+):
+    """
+    Render an RDM time course to a GIF or MP4 file.
+
+    Parameters
+    ----------
+    rdms : np.ndarray
+        RDMs (n_conditions, n_conditions, n_times)
+    times : array-like
+        Time value (ms) of each RDM, shown in the frame titles
+    out_path : str or pathlib.Path
+        Output file; the format follows the extension (.gif or .mp4,
+        the latter requires imageio-ffmpeg)
+    labels : list of str, optional
+        Condition labels for the axes. Default is None.
+    block : int, optional
+        Number of conditions in the first block; a dashed line is drawn
+        after it. Default is None.
+    cmap : str, optional
+        Colour map. Default is 'viridis'.
+    fps : float, optional
+        Frames per second. Default is 10.
+    n_jobs : int, optional
+        Number of worker processes rendering frames (-1 = all cores).
+        Default is 1.
+    png_pattern : str, optional
+        If given, each frame is also saved as a PNG to
+        ``png_pattern.format(time=...)``. Default is None.
+    png_dpi : int, optional
+        Resolution of the exported PNGs. Default is 300.
+
+    Returns
+    -------
+    n_frames : int
+        Number of frames written
+    """
+    times = list(times)
+    n_times = len(times)
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    options = {
+        "labels": labels,
+        "cmap": cmap,
+        "block": block,
+        "png_pattern": png_pattern,
+        "png_dpi": png_dpi,
+    }
+
+    if str(out_path).endswith(".gif"):
+        writer = imageio.get_writer(
+            out_path, mode="I", duration=1000 / fps, loop=0
+        )
+    else:
+        writer = imageio.get_writer(out_path, fps=fps)
+
+    # Contiguous blocks of time points, a few per worker so that frames
+    # can be written while later blocks are still rendering
+    n_blocks = 1 if n_jobs == 1 else min(n_times, n_jobs * 4)
+    size = math.ceil(n_times / n_blocks)
+    blocks = [
+        slice(i, min(i + size, n_times)) for i in range(0, n_times, size)
+    ]
+
+    with writer:
+        if n_jobs == 1:
+            for b in blocks:
+                for frame in _render_frames(rdms[:, :, b], times[b], options):
+                    writer.append_data(frame)
+        else:
+            # Forked workers do not re-run the calling script, which matters
+            # for analysis scripts without a __main__ guard
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context(
+                "fork" if "fork" in methods else None
+            )
+            with ProcessPoolExecutor(
+                max_workers=n_jobs, mp_context=context
+            ) as executor:
+                results = executor.map(
+                    _render_frames,
+                    [rdms[:, :, b] for b in blocks],
+                    [times[b] for b in blocks],
+                    [options] * len(blocks),
+                )
+                for frames in results:
+                    for frame in frames:
+                        writer.append_data(frame)
+
+    return n_times
@@ -0,0 +1,392 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Subject RDM Store
+
+Loads every subject RDM of a group / target / cross-validation scheme
+once, applies the condition reordering and brings the time axis last,
+and persists the result as one stacked (subjects x cond x cond x time)
+array. A running mean and variance over subjects are updated as subjects
+are added, so the RSA stages read group averages without reloading the
+individual .mat files.
+
+Each store consists of a .npy stack, opened memory-mapped, and a small
+.npz file with the subject IDs, source modification times, the
+condition order and time axis used, and the running statistics.
+Subjects whose .mat file changed are reloaded; a store built with a
+different order or time axis is rebuilt.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import os
+import glob
+import time
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+try:
+    from .load_mat_flexible import load_mat_flexible
+except ImportError:
+    from load_mat_flexible import load_mat_flexible
+
+
+def load_subject_rdm(file_path, order=None, time_axis=-1, variable="RDM"):
+    """
+    Load one subject RDM with the time axis last and conditions reordered.
+
+    Parameters
+    ----------
+    file_path : str or pathlib.Path
+        Path to the subject's RDM .mat file
+    order : list of int, optional
+        New condition order (0-based). Default is None (keep order).
+    time_axis : int, optional
+        Axis of the RDM (in MATLAB axis order) that holds time.
+        Default is -1.
+    variable : str, optional
+        Name of the RDM variable in the .mat file. Default is 'RDM'.
+
+    Returns
+    -------
+    rdm : np.ndarray
+        RDM (n_conditions, n_conditions, n_times)
+    """
+    # Lazy mode reads only this variable and returns v7.3 (HDF5) arrays
+    # in MATLAB axis order, like legacy files
+    with load_mat_flexible(file_path, lazy=True) as mat:
+        rdm = np.asarray(mat[variable][()], dtype=float)
+    rdm = np.moveaxis(rdm, time_axis, -1)
+    if order is not None:
+        rdm = rdm[np.ix_(order, order)]
+    return np.ascontiguousarray(rdm)
+
+
+def load_rdms_bulk(
+    files, order=None, time_axis=-1, variable="RDM", n_workers=8, verbose=True
+):
+    """
+    Load many subject RDMs concurrently into one preallocated stack.
+
+    Files are read by a thread pool (h5py and scipy release the GIL
+    during I/O). The first file fixes the expected RDM shape; any file
+    with a different shape raises an error. Progress and throughput are
+    printed so loading can be tuned for the file system.
+
+    Parameters
+    ----------
+    files : str or list of str
+        Glob pattern (e.g. '.../infants_sub-*_RDM_identity_*.mat') or
+        list of RDM .mat file paths
+    order : list of int, optional
+        New condition order (0-based). Default is None.
+    time_axis : int, optional
+        Time axis of the RDMs (see load_subject_rdm). Default is -1.
+    variable : str, optional
+        Name of the RDM variable. Default is 'RDM'.
+    n_workers : int, optional
+        Number of reader threads. Default is 8.
+    verbose : bool, optional
+        Print progress and throughput. Default is True.
+
+    Returns
+    -------
+    rdms : np.ndarray
+        RDMs (n_files, n_conditions, n_conditions, n_times)
+    report : dict
+        Dictionary with keys 'files', 'seconds', 'files_per_s' and
+        'mb_per_s'
+    """
+    if isinstance(files, str):
+        files = sorted(glob.glob(files))
+    files = [str(f) for f in files]
+    if not files:
+        raise FileNotFoundError("No RDM files to load")
+
+    def load(file_path):
+        return load_subject_rdm(file_path, order, time_axis, variable)
+
+    start = time.perf_counter()
+    first = load(files[0])
+    rdms = np.empty((len(files),) + first.shape)
+    rdms[0] = first
+
+    def fill(i):
+        rdm = load(files[i])
+        if rdm.shape != first.shape:
+            raise ValueError(
+                f"RDM shape {rdm.shape} in {files[i]} does not match "
+                f"{first.shape} in {files[0]}"
+            )
+        rdms[i] = rdm
+
+    step = max(1, len(files) // 10)
+    with ThreadPoolExecutor(max_workers=n_workers) as executor:
+        futures = [executor.submit(fill, i) for i in range(1, len(files))]
+        for done, future in enumerate(as_completed(futures), start=2):
+            future.result()
+            if verbose and done % step == 0:
+                print(f"Loaded {done}/{len(files)} RDM files")
+
+    seconds = time.perf_counter() - start
+    megabytes = sum(os.path.getsize(f) for f in files) / 1024**2
+    report = {
+        "files": files,
+        "seconds": seconds,
+        "files_per_s": len(files) / seconds,
+        "mb_per_s": megabytes / seconds,
+    }
+    if verbose:
+        print(
+            f"Loaded {len(files)} RDM files in {seconds:.2f}s "
+            f"({report['files_per_s']:.1f} files/s, "
+            f"{report['mb_per_s']:.1f} MB/s)"
+        )
+
+    return rdms, report
+
+
+def rdm_store_paths(store_dir, name):
+    """
+    Get the file paths of a store.
+
+    Parameters
+    ----------
+    store_dir : str or pathlib.Path
+        Directory holding the stores
+    name : str
+        Store name, e.g. 'infants_RDM_identity_one_rotation_out'
+
+    Returns
+    -------
+    paths : dict
+        Dictionary with keys 'rdms' (.npy) and 'meta' (.npz)
+    """
+    return {
+        "rdms": os.path.join(store_dir, f"{name}_rdms.npy"),
+        "meta": os.path.join(store_dir, f"{name}_meta.npz"),
+    }
+
+
+def load_rdm_store(store_dir, name):
+    """
+    Open an existing store.
+
+    Parameters
+    ----------
+    store_dir : str or pathlib.Path
+        Directory holding the stores
+    name : str
+        Store name
+
+    Returns
+    -------
+    store : dict or None
+        Dictionary with keys:
+        - 'subjects': subject IDs (n_subjects,)
+        - 'rdms': memory-mapped RDMs
+          (n_subjects, n_conditions, n_conditions, n_times)
+        - 'mtimes': modification time of each source file
+        - 'order': condition order (empty if the order was kept)
+        - 'time_axis': time axis of the source RDMs
+        - 'n', 'mean', 'm2': running subject count, mean and sum of
+          squared deviations
+        - 'var': sample variance over subjects (ddof=1)
+        or None if the store does not exist
+    """
+    paths = rdm_store_paths(store_dir, name)
+    if not (os.path.exists(paths["rdms"]) and os.path.exists(paths["meta"])):
+        return None
+
+    with np.load(paths["meta"]) as meta:
+        store = {key: meta[key] for key in meta.files}
+    store["n"] = int(store["n"])
+    if "time_axis" in store:
+        store["time_axis"] = int(store["time_axis"])
+    store["rdms"] = np.load(paths["rdms"], mmap_mode="r")
+    store["var"] = _variance(store["m2"], store["n"])
+    return store
+
+
+def _variance(m2, n):
+    """Sample variance from a running sum of squared deviations."""
+    if n < 2:
+        return np.full_like(m2, np.nan)
+    return m2 / (n - 1)
+
+
+def _save_rdm_store(store_dir, name, store):
+    """Write a store, replacing any previous version in one rename each."""
+    paths = rdm_store_paths(store_dir, name)
+    os.makedirs(store_dir, exist_ok=True)
+
+    with open(paths["rdms"] + ".tmp", "wb") as f:
+        np.save(f, np.ascontiguousarray(store["rdms"]))
+    with open(paths["meta"] + ".tmp", "wb") as f:
+        np.savez(
+            f,
+            subjects=store["subjects"],
+            mtimes=store["mtimes"],
+            order=store["order"],
+            time_axis=store["time_axis"],
+            n=store["n"],
+            mean=store["mean"],
+            m2=store["m2"],
+        )
+
+    os.replace(paths["rdms"] + ".tmp", paths["rdms"])
+    os.replace(paths["meta"] + ".tmp", paths["meta"])
+
+
+def update_rdm_store(
+    store_dir,
+    name,
+    files,
+    order=None,
+    time_axis=-1,
+    n_workers=8,
+    verbose=True,
+):
+    """
+    Add new or changed subjects to a store and return it.
+
+    The missing files are read concurrently with load_rdms_bulk(), then
+    new subjects are folded into the running mean and variance one at a
+    time (Welford's update). If a stored subject's file has changed, it
+    is reloaded and the statistics are recomputed from the stack. A
+    store built with a different ``order`` or ``time_axis`` is rebuilt
+    from all files.
+
+    Parameters
+    ----------
+    store_dir : str or pathlib.Path
+        Directory holding the stores
+    name : str
+        Store name, e.g. 'infants_RDM_identity_one_rotation_out'
+    files : dict
+        Maps subject ID (int) to the path of its RDM .mat file
+    order : list of int, optional
+        New condition order (0-based). Default is None.
+    time_axis : int, optional
+        Time axis of the stored RDMs (see load_subject_rdm). Default is
+        -1.
+    n_workers : int, optional
+        Number of reader threads (see load_rdms_bulk). Default is 8.
+    verbose : bool, optional
+        Print loading progress and throughput. Default is True.
+
+    Returns
+    -------
+    store : dict
+        The updated store (see load_rdm_store)
+    """
+    stored_order = np.asarray([] if order is None else order, dtype=int)
+
+    store = load_rdm_store(store_dir, name)
+    if store is not None and not (
+        np.array_equal(store.get("order"), stored_order)
+        and store.get("time_axis") == time_axis
+    ):
+        print(f"Rebuilding RDM store with a new order or time axis: {name}")
+        store = None
+
+    if store is not None:
+        rdms = list(store["rdms"])
+        subjects = store["subjects"].tolist()
+        mtimes = store["mtimes"].tolist()
+        n, mean, m2 = store["n"], store["mean"].copy(), store["m2"].copy()
+    else:
+        rdms, subjects, mtimes = [], [], []
+        n, mean, m2 = 0, 0.0, 0.0
+
+    # Subjects that are new or whose file changed since it was stored
+    to_load = []
+    for subject, file_path in files.items():
+        mtime = os.path.getmtime(file_path)
+        if subject in subjects and mtimes[subjects.index(subject)] == mtime:
+            continue
+        to_load.append((subject, file_path, mtime))
+
+    if not to_load:
+        return store
+
+    loaded, _ = load_rdms_bulk(
+        [f for _, f, _ in to_load],
+        order,
+        time_axis,
+        n_workers=n_workers,
+        verbose=verbose,
+    )
+
+    recompute = False
+    for (subject, file_path, mtime), rdm in zip(to_load, loaded):
+        if subject in subjects:
+            print(f"Reloaded changed RDM: {file_path}")
+            i = subjects.index(subject)
+            rdms[i] = rdm
+            mtimes[i] = mtime
+            recompute = True
+        else:
+            rdms.append(rdm)
+            subjects.append(subject)
+            mtimes.append(mtime)
+
+            # Welford's running mean and variance
+            n += 1
+            delta = rdm - mean
+            mean = mean + delta / n
+            m2 = m2 + delta * (rdm - mean)
+
+    stack = np.stack(rdms)
+    if recompute:
+        n = len(stack)
+        mean = stack.mean(axis=0)
+        m2 = ((stack - mean) ** 2).sum(axis=0)
+
+    _save_rdm_store(
+        store_dir,
+        name,
+        {
+            "rdms": stack,
+            "subjects": np.array(subjects),
+            "mtimes": np.array(mtimes),
+            "order": stored_order,
+            "time_axis": time_axis,
+            "n": n,
+            "mean": mean,
+            "m2": m2,
+        },
+    )
+    return load_rdm_store(store_dir, name)
+
+
+def select_subjects(store, subjects):
+    """
+    Select subjects from a store by ID.
+
+    Parameters
+    ----------
+    store : dict
+        Store from load_rdm_store() or update_rdm_store()
+    subjects : list of int
+        Subject IDs to select, in the order wanted
+
+    Returns
+    -------
+    rdms : np.ndarray
+        RDMs (n_selected, n_conditions, n_conditions, n_times)
+    mean : np.ndarray
+        Mean RDM over the selected subjects (the stored running mean if
+        all stored subjects are selected)
+    """
+    index = {s: i for i, s in enumerate(store["subjects"].tolist())}
+    missing = [s for s in subjects if s not in index]
+    if missing:
+        raise KeyError(f"Subjects not in RDM store: {missing}")
+
+    rows = [index[s] for s in subjects]
+    rdms = store["rdms"][rows]
+    if sorted(rows) == list(range(store["n"])):
+        return rdms, store["mean"]
+    return rdms, rdms.mean(axis=0)
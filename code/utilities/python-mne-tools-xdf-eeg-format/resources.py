@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Resource Monitoring Helpers
+
+Reports the peak resident memory of the current process so that the
+memory footprint of each subject can be logged. The resource module is
+Unix-only; without it both helpers return None.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import sys
+from pathlib import Path
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def reset_peak_rss():
+    """
+    Reset the peak resident set size of the current process.
+
+    Only supported on Linux (via /proc/self/clear_refs). On other
+    platforms the peak keeps growing over the lifetime of the process.
+
+    Returns
+    -------
+    bool or None
+        True if the peak was reset, False otherwise, or None if the
+        resource module is not available (e.g. Windows)
+    """
+    if resource is None:
+        return None
+    try:
+        Path("/proc/self/clear_refs").write_text("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """
+    Get the peak resident set size of the current process.
+
+    Returns
+    -------
+    float or None
+        Peak resident memory in MB, or None if the resource module is not
+        available (e.g. Windows)
+    """
+    if resource is None:
+        return None
+
+    # VmHWM follows reset_peak_rss(); ru_maxrss is a lifetime maximum
+    status = Path("/proc/self/status")
+    if status.exists():
+        for line in status.read_text().splitlines():
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) / 1024
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    if sys.platform == "darwin":
+        return maxrss / 1024**2
+    return maxrss / 1024
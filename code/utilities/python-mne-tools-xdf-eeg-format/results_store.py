@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Consolidated Results Store
+
+Keeps the per-subject results of all analyses in one chunked, compressed
+HDF5 file instead of many small CSV files. Results are organised as
+/<group>/<analysis>/ with two datasets:
+
+    data      (n_subjects, n_times) or (n_subjects, n_times, n_times)
+    subjects  (n_subjects,) subject IDs
+
+and the time axis and any metadata (chance level, classifier, ...)
+stored as attributes. Writers append or replace one subject at a time;
+readers select subjects by ID and slice the time axes, and group-level
+summaries are array reductions over the subject axis.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import os
+import json
+import time
+import numpy as np
+import h5py
+
+
+def _open_store(store_path, mode, timeout=60.0):
+    """Open the HDF5 file, waiting while another process holds it."""
+    if mode == "r" and not os.path.exists(store_path):
+        raise FileNotFoundError(f"Results store not found: {store_path}")
+
+    start = time.perf_counter()
+    while True:
+        try:
+            return h5py.File(store_path, mode)
+        except (BlockingIOError, OSError):
+            # HDF5 file locking refuses concurrent writers; retry until
+            # the other process (e.g. a parallel subject) is done
+            if time.perf_counter() - start > timeout:
+                raise
+            time.sleep(0.1)
+
+
+def append_result(
+    store_path, group, analysis, subject, values, times=None, attrs=None
+):
+    """
+    Write one subject's result for an analysis.
+
+    The subject's row is appended, or replaced if the subject is already
+    stored.
+
+    Parameters
+    ----------
+    store_path : str or pathlib.Path
+        Path to the HDF5 store (created if missing)
+    group : str
+        Participant group ('adults' or 'infants')
+    analysis : str
+        Analysis name, e.g. 'category_one_rotation_out'
+    subject : int
+        Subject ID
+    values : np.ndarray
+        Result (n_times,) or (n_times, n_times)
+    times : np.ndarray, optional
+        Time points of the result; stored on first write. Default is
+        None.
+    attrs : dict, optional
+        Metadata stored on the analysis (JSON-serialisable values).
+        Default is None.
+    """
+    values = np.asarray(values, dtype=float)
+
+    with _open_store(store_path, "a") as f:
+        node = f.require_group(f"{group}/{analysis}")
+
+        if "data" not in node:
+            node.create_dataset(
+                "data",
+                shape=(0,) + values.shape,
+                maxshape=(None,) + values.shape,
+                chunks=(1,) + values.shape,
+                dtype="f8",
+                compression="gzip",
+                compression_opts=4,
+                shuffle=True,
+            )
+            node.create_dataset(
+                "subjects", shape=(0,), maxshape=(None,), dtype="i8"
+            )
+
+        data = node["data"]
+        subjects = node["subjects"]
+        if data.shape[1:] != values.shape:
+            raise ValueError(
+                f"Result shape {values.shape} does not match stored shape "
+                f"{data.shape[1:]} for {group}/{analysis}"
+            )
+
+        existing = np.flatnonzero(subjects[()] == int(subject))
+        if existing.size:
+            row = int(existing[0])
+        else:
+            row = data.shape[0]
+            data.resize(row + 1, axis=0)
+            subjects.resize(row + 1, axis=0)
+            subjects[row] = int(subject)
+        data[row] = values
+
+        if times is not None:
+            node.attrs["times"] = np.asarray(times, dtype=float)
+        for key, value in (attrs or {}).items():
+            node.attrs[key] = json.dumps(value)
+
+
+def has_result(store_path, group, analysis, subject):
+    """
+    Check whether a subject's result for an analysis is stored.
+
+    Parameters
+    ----------
+    store_path : str or pathlib.Path
+        Path to the HDF5 store
+    group : str
+        Participant group
+    analysis : str
+        Analysis name
+    subject : int
+        Subject ID
+
+    Returns
+    -------
+    bool
+        True if the result exists
+    """
+    try:
+        with _open_store(store_path, "r") as f:
+            key = f"{group}/{analysis}/subjects"
+            return key in f and int(subject) in f[key][()]
+    except FileNotFoundError:
+        return False
+
+
+def read_results(store_path, group, analysis, subjects=None, times=None):
+    """
+    Read the results of one analysis.
+
+    Parameters
+    ----------
+    store_path : str or pathlib.Path
+        Path to the HDF5 store
+    group : str
+        Participant group
+    analysis : str
+        Analysis name
+    subjects : list of int, optional
+        Subject IDs to read, in the order wanted. Default is None (all).
+    times : slice or tuple of slice, optional
+        Slice of the time axis (one per time axis for time x time
+        results). Default is None (all time points).
+
+    Returns
+    -------
+    results : dict
+        Dictionary with keys:
+        - 'data': results (n_subjects, ...)
+        - 'subjects': subject IDs (n_subjects,)
+        - 'times': time points (sliced like the first time axis), or None
+        - 'attrs': metadata dictionary
+    """
+    if times is None:
+        times = ()
+    elif not isinstance(times, tuple):
+        times = (times,)
+
+    with _open_store(store_path, "r") as f:
+        node = f[f"{group}/{analysis}"]
+        stored = node["subjects"][()]
+
+        if subjects is None:
+            rows = np.arange(len(stored))
+        else:
+            index = {s: i for i, s in enumerate(stored.tolist())}
+            missing = [s for s in subjects if s not in index]
+            if missing:
+                raise KeyError(
+                    f"Subjects not in {group}/{analysis}: {missing}"
+                )
+            rows = np.array([index[s] for s in subjects], dtype=int)
+
+        if subjects is None:
+            data = node["data"][(slice(None),) + times]
+        else:
+            # One chunk per subject, so rows are read individually
+            data = np.stack([node["data"][(int(r),) + times] for r in rows])
+
+        t = node.attrs.get("times")
+        if t is not None and times:
+            t = t[times[0]]
+        attrs = {
+            key: json.loads(value)
+            for key, value in node.attrs.items()
+            if key != "times"
+        }
+
+    return {
+        "data": data,
+        "subjects": stored[rows],
+        "times": t,
+        "attrs": attrs,
+    }
+
+
+def list_analyses(store_path):
+    """
+    List the stored analyses.
+
+    Parameters
+    ----------
+    store_path : str or pathlib.Path
+        Path to the HDF5 store
+
+    Returns
+    -------
+    analyses : dict
+        Maps each group to a dict of analysis name -> number of subjects
+    """
+    with _open_store(store_path, "r") as f:
+        return {
+            group: {
+                analysis: f[group][analysis]["subjects"].shape[0]
+                for analysis in f[group]
+            }
+            for group in f
+        }
+
+
+def summarize_results(store_path, group, analysis, subjects=None, times=None):
+    """
+    Compute the group mean and standard error of an analysis.
+
+    Parameters
+    ----------
+    store_path : str or pathlib.Path
+        Path to the HDF5 store
+    group : str
+        Participant group
+    analysis : str
+        Analysis name
+    subjects : list of int, optional
+        Subject IDs to include. Default is None (all).
+    times : slice or tuple of slice, optional
+        Slice of the time axes. Default is None.
+
+    Returns
+    -------
+    summary : dict
+        Dictionary with keys 'mean', 'sem', 'n', 'subjects' and 'times'
+    """
+    results = read_results(store_path, group, analysis, subjects, times)
+    data = results["data"]
+    n = data.shape[0]
+
+    return {
+        "mean": data.mean(axis=0),
+        "sem": data.std(axis=0, ddof=1) / np.sqrt(n) if n > 1 else None,
+        "n": n,
+        "subjects": results["subjects"],
+        "times": results["times"],
+    }
@@ -0,0 +1,260 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RSA Correlation Engine
+
+Correlates time-resolved representational dissimilarity matrices (RDMs)
+with model RDMs. The upper triangles of all time points are extracted
+with one index array, ranked along the pair axis in one call, and
+correlated with the pre-ranked model vectors as a single normalized dot
+product. Time x time correlations between two RDM time courses are
+obtained the same way, with one matrix multiply per subject, and are
+saved per subject as .npy files that are combined by subject ID.
+
+The module only depends on numpy and scipy so that analysis scripts can
+import it directly from the tools directory.
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import os
+import numpy as np
+from scipy.stats import rankdata
+
+
+def rdm_upper_triangle(rdms):
+    """
+    Extract the upper triangle (above the diagonal) of stacked RDMs.
+
+    The pairs are returned in the same order as
+    ``scipy.spatial.distance.squareform``.
+
+    Parameters
+    ----------
+    rdms : np.ndarray
+        RDMs (..., n_conditions, n_conditions, n_times)
+
+    Returns
+    -------
+    vectors : np.ndarray
+        Pairwise dissimilarities (..., n_pairs, n_times)
+    """
+    n_conditions = rdms.shape[-2]
+    rows, cols = np.triu_indices(n_conditions, k=1)
+    return rdms[..., rows, cols, :]
+
+
+def _kendall_pairs(n_pairs, max_pairs=None, seed=0):
+    """Index pairs of RDM entries compared by Kendall's tau."""
+    n_total = n_pairs * (n_pairs - 1) // 2
+    if max_pairs is None or n_total <= max_pairs:
+        return np.triu_indices(n_pairs, k=1)
+
+    # Random comparisons, drawn without enumerating all of them
+    rng = np.random.default_rng(seed)
+    i = rng.integers(0, n_pairs, max_pairs)
+    j = rng.integers(0, n_pairs - 1, max_pairs)
+    j[j >= i] += 1
+    return i, j
+
+
+def _standardize(vectors, method, axis, pairs=None):
+    """
+    Transform vectors so that their dot products are correlations.
+
+    Pearson and Spearman vectors (the latter ranked first) are centred
+    and scaled to unit norm. For Kendall's tau-b, the vectors are replaced
+    by the signs of the differences between the entry pairs in ``pairs``
+    and scaled to unit norm, which turns the dot product into
+    (concordant - discordant) / sqrt(untied_a * untied_b).
+    """
+    vectors = np.asarray(vectors, dtype=float)
+
+    if method == "kendall":
+        i, j = pairs
+        vectors = np.sign(
+            np.take(vectors, i, axis=axis) - np.take(vectors, j, axis=axis)
+        )
+    else:
+        if method == "spearman":
+            vectors = rankdata(vectors, axis=axis)
+        elif method != "pearson":
+            raise ValueError(f"Unknown correlation method: {method}")
+        vectors = vectors - vectors.mean(axis=axis, keepdims=True)
+
+    norm = np.sqrt(np.sum(vectors**2, axis=axis, keepdims=True))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return vectors / norm
+
+
+def correlate_rdms_to_models(
+    rdms, models, method="spearman", max_pairs=100000, seed=0
+):
+    """
+    Correlate subject RDMs with one or more model RDMs at every time point.
+
+    For Kendall's tau-b a random subset of ``max_pairs`` entry
+    comparisons is used when there are more, as in correlate_time_time().
+
+    Parameters
+    ----------
+    rdms : np.ndarray
+        Subject RDMs (n_subjects, n_conditions, n_conditions, n_times),
+        or a single subject (n_conditions, n_conditions, n_times)
+    models : np.ndarray
+        Model RDMs (n_models, n_conditions, n_conditions), or a single
+        model (n_conditions, n_conditions)
+    method : str, optional
+        'spearman', 'pearson' or 'kendall' (tau-b). Default is
+        'spearman'.
+    max_pairs : int or None, optional
+        Largest number of entry comparisons used for Kendall's tau-b.
+        None always computes the exact value. Default is 100000.
+    seed : int, optional
+        Random seed for the Kendall subset. Default is 0.
+
+    Returns
+    -------
+    corr : np.ndarray
+        Correlations (n_subjects, n_models, n_times). Time points at
+        which an RDM is constant are NaN, as with scipy.stats.spearmanr.
+    """
+    rdms = np.asarray(rdms)
+    models = np.asarray(models)
+    if rdms.ndim == 3:
+        rdms = rdms[None]
+    if models.ndim == 2:
+        models = models[None]
+
+    n_conditions = rdms.shape[1]
+    rows, cols = np.triu_indices(n_conditions, k=1)
+
+    pairs = None
+    if method == "kendall":
+        pairs = _kendall_pairs(len(rows), max_pairs, seed)
+
+    # (n_subjects, n_pairs, n_times) and (n_models, n_pairs)
+    data = _standardize(rdm_upper_triangle(rdms), method, 1, pairs)
+    model_vectors = _standardize(models[:, rows, cols], method, 1, pairs)
+
+    return np.einsum("spt,mp->smt", data, model_vectors)
+
+
+def correlate_time_time(
+    reference, rdms, method="spearman", max_pairs=100000, seed=0
+):
+    """
+    Correlate the RDMs of every pair of time points of two time courses.
+
+    Both RDM stacks are ranked and standardized once, after which the
+    full time x time correlation matrix of each subject is a single
+    matrix multiply (batched across subjects if several are given).
+
+    Kendall's tau-b is computed from the signs of all pairwise
+    differences between RDM entries. When there are more than
+    ``max_pairs`` such comparisons (e.g. 112-condition RDMs), a random
+    subset of ``max_pairs`` comparisons is used as a fast approximation.
+
+    Parameters
+    ----------
+    reference : np.ndarray
+        Reference RDMs, e.g. the adult average
+        (n_conditions, n_conditions, n_times_ref)
+    rdms : np.ndarray
+        Subject RDMs (n_conditions, n_conditions, n_times), or a batch
+        of subjects (n_subjects, n_conditions, n_conditions, n_times)
+    method : str, optional
+        'spearman', 'pearson' or 'kendall' (tau-b). Default is
+        'spearman'.
+    max_pairs : int or None, optional
+        Largest number of entry comparisons used for Kendall's tau-b.
+        None always computes the exact value. Default is 100000.
+    seed : int, optional
+        Random seed for the Kendall subset. Default is 0.
+
+    Returns
+    -------
+    ttcorr : np.ndarray
+        Correlations (n_times_ref, n_times), or
+        (n_subjects, n_times_ref, n_times) for a batch
+    """
+    rdms = np.asarray(rdms)
+    batched = rdms.ndim == 4
+    if not batched:
+        rdms = rdms[None]
+
+    ref_vectors = rdm_upper_triangle(np.asarray(reference))
+    pairs = None
+    if method == "kendall":
+        pairs = _kendall_pairs(ref_vectors.shape[0], max_pairs, seed)
+
+    # (n_pairs, n_times_ref) and (n_subjects, n_pairs, n_times)
+    ref_vectors = _standardize(ref_vectors, method, 0, pairs)
+    data = _standardize(rdm_upper_triangle(rdms), method, 1, pairs)
+
+    ttcorr = np.matmul(ref_vectors.T, data)
+
+    return ttcorr if batched else ttcorr[0]
+
+
+def save_ttcorr(file_path, ttcorr):
+    """
+    Save one subject's time x time correlation matrix in binary form.
+
+    Parameters
+    ----------
+    file_path : str or pathlib.Path
+        Output .npy file
+    ttcorr : np.ndarray
+        Correlations (n_times_ref, n_times)
+    """
+    np.save(file_path, np.asarray(ttcorr, dtype=float))
+
+
+def combine_ttcorr(files, subjects, output_path=None):
+    """
+    Stack the time x time correlations of selected subjects.
+
+    Each per-subject .npy file is memory-mapped and copied into one
+    preallocated array, in the order of ``subjects``. Subjects are looked
+    up by ID, so a missing file raises an error instead of shifting the
+    selection to another subject.
+
+    Parameters
+    ----------
+    files : dict
+        Maps subject ID (int) to the path of its ttcorr .npy file
+    subjects : list of int
+        Subject IDs to combine, in the order wanted
+    output_path : str or pathlib.Path, optional
+        If given, the stack is also saved to this .npy file. Default is
+        None.
+
+    Returns
+    -------
+    ttcorr_all : np.ndarray
+        Correlations (n_subjects, n_times_ref, n_times)
+    """
+    missing = [
+        s for s in subjects if s not in files or not os.path.exists(files[s])
+    ]
+    if missing:
+        raise FileNotFoundError(f"No ttcorr file for subjects: {missing}")
+
+    first = np.load(files[subjects[0]], mmap_mode="r")
+    ttcorr_all = np.empty((len(subjects),) + first.shape)
+    for i, subject in enumerate(subjects):
+        ttcorr = np.load(files[subject], mmap_mode="r")
+        if ttcorr.shape != first.shape:
+            raise ValueError(
+                f"ttcorr shape {ttcorr.shape} of subject {subject} does "
+                f"not match {first.shape}"
+            )
+        ttcorr_all[i] = ttcorr
+
+    if output_path is not None:
+        np.save(output_path, ttcorr_all)
+        print(f"Saved combined ttcorr array to: {output_path}")
+
+    return ttcorr_all
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Stimulus Image Statistics
+
+Low-level statistics of the stimulus images (Shannon entropy, mean
+luminance and RMS contrast), as computed one image at a time by
+func/compute_entropy.m and func/compute_luminance.m, and the median
+splits used as the 'entropy' and 'luminance' decoding targets.
+
+Images are decoded in a thread pool (JPEG decoding and numpy release the
+GIL) and reduced to 256-bin grayscale histograms. All statistics follow
+from the (n_images, 256) histogram matrix in a few array operations. The
+histograms can be cached in a JSON file keyed by the SHA-1 hash of each
+image file, so only new or changed images are decoded again.
+
+The splits are generated once with save_stimulus_splits() (the
+'stimulus_splits' step of mne_run_all.py), which writes them to a JSON
+file in the results directory; viewpoint_decoding_config() only reads
+that file.
+
+Stimulus numbers follow the sorted file names (stimulus 1 is the first
+file), which is the order of MATLAB's dir().
+
+Author: Mahdiyeh Khanbagi
+Created: 17/10/2026
+"""
+
+import os
+import io
+import json
+import hashlib
+import tempfile
+import numpy as np
+import pandas as pd
+import imageio.v3 as iio
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+# Weights of MATLAB's rgb2gray()
+RGB_WEIGHTS = np.array(
+    [0.298936021293775, 0.587043074451121, 0.114020904255103]
+)
+
+
+def stimulus_files(stim_dir, pattern="*.jpeg"):
+    """
+    List the stimulus images in stimulus-number order.
+
+    Parameters
+    ----------
+    stim_dir : str or pathlib.Path
+        Stimulus directory
+    pattern : str, optional
+        File pattern. Default is '*.jpeg'.
+
+    Returns
+    -------
+    files : list of pathlib.Path
+        Image files sorted by name, hidden files excluded
+    """
+    return sorted(
+        f for f in Path(stim_dir).glob(pattern) if not f.name.startswith(".")
+    )
+
+
+def _image_histogram(content):
+    """256-bin grayscale histogram of an encoded 8-bit image."""
+    image = iio.imread(io.BytesIO(content))
+    if image.ndim == 3:
+        # Drop an alpha channel, then convert as rgb2gray() does
+        image = image[..., :3] @ RGB_WEIGHTS
+        image = np.clip(np.round(image), 0, 255)
+    elif image.ndim != 2:
+        raise ValueError(f"Unsupported image shape: {image.shape}")
+    return np.bincount(image.astype(np.uint8).ravel(), minlength=256)
+
+
+def _read_file(path):
+    """Read an image file and hash its content."""
+    content = path.read_bytes()
+    return hashlib.sha1(content).hexdigest(), content
+
+
+def image_histograms(files, cache_file=None, n_jobs=-1):
+    """
+    Grayscale histograms of images, reusing cached histograms.
+
+    Parameters
+    ----------
+    files : list of pathlib.Path
+        Image files
+    cache_file : str or pathlib.Path, optional
+        JSON cache of histograms keyed by SHA-1 file hash. Default is None
+        (no cache).
+    n_jobs : int, optional
+        Number of threads; -1 uses all CPUs. Default is -1.
+
+    Returns
+    -------
+    histograms : np.ndarray
+        Pixel counts per gray level (n_images, 256); NaN rows for images
+        that could not be decoded
+    """
+    cache = {}
+    if cache_file is not None and Path(cache_file).exists():
+        with open(cache_file) as f:
+            cache = json.load(f)
+
+    if n_jobs == -1:
+        n_jobs = os.cpu_count() or 1
+
+    histograms = np.full((len(files), 256), np.nan)
+    with ThreadPoolExecutor(max_workers=n_jobs) as executor:
+        hashed = list(executor.map(_read_file, files))
+
+        # Decode only images whose content is not in the cache
+        todo = [i for i, (sha1, _) in enumerate(hashed) if sha1 not in cache]
+        decoded = executor.map(
+            _try_histogram,
+            [files[i] for i in todo],
+            [hashed[i][1] for i in todo],
+        )
+        n_new = 0
+        for i, histogram in zip(todo, decoded):
+            if histogram is not None:
+                cache[hashed[i][0]] = histogram.tolist()
+                n_new += 1
+
+    for i, (sha1, _) in enumerate(hashed):
+        if sha1 in cache:
+            histograms[i] = cache[sha1]
+
+    print(
+        f"Image histograms: {len(files) - len(todo)} cached, "
+        f"{n_new} decoded, {len(todo) - n_new} failed"
+    )
+
+    if cache_file is not None and n_new:
+        _write_json(cache, cache_file)
+
+    return histograms
+
+
+def _write_json(data, path):
+    """Write JSON through a unique temporary file and rename it in place."""
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+
+    # A crash cannot corrupt the file, and concurrent writers never share
+    # a temporary file
+    with tempfile.NamedTemporaryFile(
+        "w", dir=path.parent, suffix=".tmp", delete=False
+    ) as f:
+        json.dump(data, f)
+    os.replace(f.name, path)
+
+
+def _try_histogram(path, content):
+    """Decode an image, returning None (with a warning) on failure."""
+    try:
+        return _image_histogram(content)
+    except Exception as e:
+        print(f"Warning: Error processing {path.name}: {e}")
+        return None
+
+
+def histogram_statistics(histograms):
+    """
+    Entropy, luminance and contrast of 8-bit grayscale histograms.
+
+    Parameters
+    ----------
+    histograms : np.ndarray
+        Pixel counts per gray level (n_images, 256)
+
+    Returns
+    -------
+    stats : dict
+        Dictionary with keys (each (n_images,)):
+        - 'entropy': Shannon entropy in bits, as MATLAB's entropy()
+        - 'luminance': mean gray level scaled to [0, 1]
+        - 'rms_contrast': standard deviation of the scaled gray levels
+    """
+    histograms = np.asarray(histograms, dtype=float)
+    levels = np.arange(256) / 255
+    p = histograms / histograms.sum(axis=1, keepdims=True)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_p = np.where(p > 0, np.log2(p), 0.0)
+    entropy = -(p * log_p).sum(axis=1)
+    # Rows of undecodable images stay NaN
+    entropy[np.isnan(p).any(axis=1)] = np.nan
+
+    luminance = p @ levels
+    variance = p @ levels**2 - luminance**2
+    rms_contrast = np.sqrt(np.maximum(variance, 0.0))
+
+    return {
+        "entropy": entropy,
+        "luminance": luminance,
+        "rms_contrast": rms_contrast,
+    }
+
+
+def median_split(values):
+    """
+    Split stimuli at the median of a statistic.
+
+    As in the MATLAB scripts, stimuli above the median are 'high' and the
+    rest 'low'; stimuli without a value are left out.
+
+    Parameters
+    ----------
+    values : np.ndarray
+        Statistic per stimulus, in stimulus-number order
+
+    Returns
+    -------
+    split : dict
+        Dictionary with keys 'low' and 'high' (1-based stimulus numbers)
+    """
+    values = np.asarray(values, dtype=float)
+    valid = ~np.isnan(values)
+    high = valid & (values > np.median(values[valid]))
+    stimnum = np.arange(1, len(values) + 1)
+    return {
+        "low": stimnum[valid & ~high].tolist(),
+        "high": stimnum[high].tolist(),
+    }
+
+
+def stimulus_statistics(
+    stim_dir, pattern="*.jpeg", cache_file=None, n_jobs=-1, save_path=None
+):
+    """
+    Compute the statistics of all stimulus images.
+
+    Parameters
+    ----------
+    stim_dir : str or pathlib.Path
+        Stimulus directory
+    pattern : str, optional
+        File pattern. Default is '*.jpeg'.
+    cache_file : str or pathlib.Path, optional
+        Histogram cache (see image_histograms). Default is None (no
+        cache).
+    n_jobs : int, optional
+        Number of threads; -1 uses all CPUs. Default is -1.
+    save_path : str or pathlib.Path, optional
+        CSV with one row per stimulus. Default is None (not saved).
+
+    Returns
+    -------
+    stats : pd.DataFrame
+        Columns stimnum, filename, entropy, luminance and rms_contrast
+    """
+    files = stimulus_files(stim_dir, pattern)
+    if not files:
+        raise FileNotFoundError(f"No {pattern} images in: {stim_dir}")
+    histograms = image_histograms(files, cache_file, n_jobs)
+    stats = pd.DataFrame(
+        {
+            "stimnum": np.arange(1, len(files) + 1),
+            "filename": [f.name for f in files],
+            **histogram_statistics(histograms),
+        }
+    )
+
+    if save_path is not None:
+        stats.to_csv(save_path, index=False)
+        print(f"Saved stimulus statistics: {save_path}")
+
+    return stats
+
+
+def stimulus_splits(
+    stim_dir, features=("entropy", "luminance"), n_stimuli=None, **kwargs
+):
+    """
+    Median-split stimulus groups for cfg['stimnum'].
+
+    Parameters
+    ----------
+    stim_dir : str or pathlib.Path
+        Stimulus directory
+    features : tuple of str, optional
+        Statistics to split on. Default is ('entropy', 'luminance').
+    n_stimuli : int, optional
+        Expected number of images; a different count raises a
+        ValueError. Default is None (not checked).
+    **kwargs
+        Passed to stimulus_statistics()
+
+    Returns
+    -------
+    splits : dict
+        Maps each feature to a {'low': [...], 'high': [...]} dict
+    """
+    stats = stimulus_statistics(stim_dir, **kwargs)
+    if n_stimuli is not None and len(stats) != n_stimuli:
+        raise ValueError(
+            f"Found {len(stats)} stimulus images, expected {n_stimuli}"
+        )
+    return {
+        feature: median_split(stats[feature].to_numpy())
+        for feature in features
+    }
+
+
+def save_stimulus_splits(
+    stim_dir,
+    splits_file,
+    features=("entropy", "luminance"),
+    n_stimuli=None,
+    pattern="*.jpeg",
+    cache_file=None,
+    n_jobs=-1,
+):
+    """
+    Compute the median splits once and save them for the config.
+
+    Parameters
+    ----------
+    stim_dir : str or pathlib.Path
+        Stimulus directory
+    splits_file : str or pathlib.Path
+        JSON file to write, read by load_stimulus_splits()
+    features : tuple of str, optional
+        Statistics to split on. Default is ('entropy', 'luminance').
+    n_stimuli : int, optional
+        Expected number of images (see stimulus_splits). Default is None.
+    pattern : str, optional
+        File pattern. Default is '*.jpeg'.
+    cache_file : str or pathlib.Path, optional
+        Histogram cache. Default is None (stimulus_histograms.json next
+        to splits_file).
+    n_jobs : int, optional
+        Number of threads; -1 uses all CPUs. Default is -1.
+
+    Returns
+    -------
+    splits : dict
+        Maps each feature to a {'low': [...], 'high': [...]} dict
+    """
+    if cache_file is None:
+        cache_file = Path(splits_file).with_name("stimulus_histograms.json")
+
+    splits = stimulus_splits(
+        stim_dir,
+        features,
+        n_stimuli,
+        pattern=pattern,
+        cache_file=cache_file,
+        n_jobs=n_jobs,
+    )
+    _write_json(splits, splits_file)
+    print(f"Saved stimulus splits: {splits_file}")
+    return splits
+
+
+def load_stimulus_splits(splits_file):
+    """
+    Read the median splits written by save_stimulus_splits().
+
+    Parameters
+    ----------
+    splits_file : str or pathlib.Path
+        JSON file with the splits
+
+    Returns
+    -------
+    splits : dict
+        Maps each feature to a {'low': [...], 'high': [...]} dict
+    """
+    with open(splits_file) as f:
+        return json.load(f)
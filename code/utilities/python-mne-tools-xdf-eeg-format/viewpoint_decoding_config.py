@@ -27,6 +27,8 @@ from pathlib import Path
 import pandas as pd
 import numpy as np
 
+from .stimulus_stats import load_stimulus_splits
+
 
 def assign_class_labels(stimnum_array, category_dict):
     """
@@ -348,6 +350,20 @@ def viewpoint_decoding_config(project_name="viewpoint"):
         ),
     }
 
+    # Splits computed from the stimulus images replace the lists above
+    # once they have been generated with save_stimulus_splits() (the
+    # 'stimulus_splits' step of mne_run_all.py)
+    cfg["stim_dir"] = cfg["project_path"] / "task" / "stimuli"
+    cfg["stimulus_splits_file"] = cfg["results_dir"] / "stimulus_splits.json"
+    if cfg["stimulus_splits_file"].is_file():
+        cfg["stimnum"].update(
+            load_stimulus_splits(cfg["stimulus_splits_file"])
+        )
+        print(
+            "[CONFIG] Entropy/luminance splits from: "
+            f"{cfg['stimulus_splits_file']}"
+        )
+
     # ===================================================================
     # DATA PROCESSING CONFIGURATION
     # ===================================================================
@@ -355,6 +371,23 @@ def viewpoint_decoding_config(project_name="viewpoint"):
         "blocks"  # How to organize data: 'trials' or 'blocks'
     )
 
+    # Conditions included in pairwise (RDM) decoding per target class,
+    # 1-based condition numbers; a two-row entry compares the first set
+    # with the second. Identity conditions are objects in stimulus-number
+    # order (1 = chair, 2 = deer, ...), i.e. ceil(stimnumber / 8);
+    # stimulus conditions are stimulus numbers
+    cfg["pw_mode"] = {
+        "identity": {
+            "animate_only": [2, 3, 4, 5, 7, 8, 9],
+            "inanimate_only": [1, 6, 10, 11, 12, 13, 14],
+            "hetero": [[2, 3, 4, 5, 7, 8, 9], [1, 6, 10, 11, 12, 13, 14]],
+            "all": list(range(1, 15)),
+        },
+        "stimulus": {
+            "all": list(range(1, 113)),
+        },
+    }
+
     # ===================================================================
     # DECODING ANALYSIS CONFIGURATIONS
     # ===================================================================
@@ -455,9 +488,35 @@ def viewpoint_decoding_config(project_name="viewpoint"):
     # ===================================================================
     # CLASSIFIER CONFIGURATION
     # ===================================================================
-    cfg["classifier"] = "lda"  # Linear Discriminant Analysis
+    cfg["classifier"] = "lda"  # 'lda', 'batch_lda', 'logreg' or 'svm'
+    cfg["lda_shrinkage"] = None  # Covariance shrinkage for 'batch_lda' (0-1)
     cfg["scoring"] = "balanced_accuracy"
     cfg["n_jobs"] = -1
+    cfg["data_dtype"] = None  # e.g. 'float32' to halve decoding memory
+    cfg["cache_data"] = True  # Reuse decoding data (per data_dtype)
+    cfg["parallel_level"] = (
+        "auto"  # Parallelize 'folds', 'time', 'both' or 'auto'
+    )
+
+    # Pairwise decoding (RDMs), see pairwise.py
+    cfg["rdm"] = {
+        "target_class": ["identity"],  # 'identity' (14) or 'stimulus' (112)
+        "pw_mode": "all",  # Key of cfg['pw_mode'][target_class]
+        "save_rdm": True,
+        "rdm_dir": cfg["project_path"] / "derivatives",
+    }
+
+    # Label-permutation testing, see permutation.py
+    cfg["permutation"] = {
+        "n_permutations": 100,
+        "save_null": True,
+    }
+
+    cfg["temporal_decoding"] = {
+        "method": "sliding",  # 'sliding' or 'generalizing'
+        "verbose": False,
+        "band": None,  # batch_lda: only score |t_train - t_test| <= band
+    }
 
     # ===================================================================
     # PARTICIPANT INFORMATION
@@ -565,6 +624,10 @@ def viewpoint_decoding_config(project_name="viewpoint"):
     # ===================================================================
     cfg["plot_results"] = True
     cfg["savefile"] = True
+    cfg["results_store"] = (
+        cfg["results_dir"] / "decoding_results.h5"
+    )  # Consolidated HDF5 store; None to disable
+    cfg["results_csv"] = True  # Per-subject CSVs (read by the R scripts)
     cfg["overwrite"] = True
 
     return cfg